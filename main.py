@@ -1,43 +1,63 @@
 import os
 import time
-import utime
-import gc
-import ujson
-import machine
 import uasyncio as asyncio
-from src.services.utils import logging, load_config, update_config
-from src.services.wifi import test_wifi_connections
+from src.services.boottime import BootTimer
+
+# 尽早开始计时，启动报告包含后续模块的导入时间
+BOOT = BootTimer()
+
+from src.services.utils import logging, load_config
+from src.services.config import get_store, DEFAULT_CONFIG_PATH
+from src.services.wifi import WiFiManager
 from src.services.ntptime import sync_ntp
 from src.services.mqtt import MQTTPublish
-from src.services.ap import WiFiAP
-from src.services.yolo import initialize_pipeline, initialize_yolo, process_frame
+from src.services.yolo import initialize_pipeline, initialize_yolo
+from src.services.pipeline import DetectionPipeline
+from src.services.journal import Journal
+from src.services.control import ControlHandler
+from src.services.multimodel import ModelScheduler, ModelSlot
 
 LOGNAME = "main"
 
 
-async def main_task():
+async def main_task(config_path: str = DEFAULT_CONFIG_PATH):
     """
     主函数初始化并运行带有MQTT通信的YOLO模型。
 
     此函数执行以下步骤：
     1. 加载配置。
     2. 检查所需的配置（WiFi、YOLO、MQTT）是否存在并启用。
-    3. 测试WiFi连接。
-    4. 如果启用了NTP时间同步，则同步时间。
+    3. 连接WiFi（优先直接连接上次成功的网络），关联期间同时初始化显示管道和YOLO模型
+       （可配置多个，共用同一帧）；之后在后台监测链路并重连。
+    4. 如果启用了NTP时间同步，则同步时间（启动时未联网则在链路连接后同步）。
     5. 初始化MQTT客户端并连接到MQTT代理。
-    6. 初始化YOLO模型和处理管道。
-    7. 每秒处理帧，进行目标检测，并将结果发送到MQTT代理。
-    8. 处理异常并确保资源的正确清理。
+    6. 启动检测流水线，推理与MQTT发布在各自的协程中运行，第一帧完成后输出启动各阶段耗时。
+    7. 处理异常并确保资源的正确清理。
+
+    参数:
+        config_path: 配置文件路径
 
     返回:
         None
     """
+    BOOT.mark("imports")
+
     # 获取配置
-    success, config = load_config()
+    success, config = load_config(config_path)
     if not success:
         logging("Failed to load config, exiting...", log_name=LOGNAME)
         return
 
+    # 配置修改在后台合并写入，避免短时间内反复写SD卡
+    config_store = get_store(config_path)
+    asyncio.create_task(config_store.run_saver())
+
+    # 日志配置：级别、限速缓冲与批量写出
+    log_config = config.get("log", {})
+    logging.configure(log_config)
+    if log_config.get("buffer_size", 0) > 0:
+        asyncio.create_task(logging.run_flusher())
+
     wifi_config = config.get("wifi", {})
     yolo_config = config.get("yolo", {})
     mqtt_config = config.get("mqtt", {})
@@ -47,91 +67,165 @@ async def main_task():
     if not yolo_config:
         logging("YOLO config missing, exiting...", log_name=LOGNAME)
         return
+    BOOT.mark("config")
 
     if wifi_config.get("enabled", False):
+        mqtt_client = None
+        journal = None
+        pl = None
+        models = []
         try:
-            # 测试WiFi连接
-            if test_wifi_connections(wifi_config):
+            # 先直接连接上次成功的网络，失败后扫描一次，按信号强度和连接历史依次尝试；
+            # 之后在后台监测链路并重连，启动时未能联网也继续运行，MQTT在链路恢复后重连
+            wifi = WiFiManager(wifi_config, config_store)
+            wifi_task = asyncio.create_task(wifi.connect(wifi_config.get("boot_timeout_ms", 0)))
+            # 让WiFi任务先发出连接请求，关联和DHCP在无线模块中进行，期间初始化模型
+            await asyncio.sleep_ms(0)
+
+            # 初始化共享的显示管道
+            pl = initialize_pipeline(yolo_config)
+
+            # models 为空时只运行 yolo 配置中的模型；否则每一项在 yolo 配置的基础上覆盖，
+            # 各模型共用同一帧，结果发布到以模型名称命名的子主题
+            models_config = config.get("models", [])
+            prefixes = [f"models.{i}" for i in range(len(models_config))] or ["yolo"]
+            model_configs = []
+            for i in range(len(prefixes)):
+                model_config = dict(yolo_config)
+                if models_config:
+                    model_config.update(models_config[i])
+                model_configs.append(model_config)
+                models.append(initialize_yolo(model_config))
+            BOOT.mark("models")
+
+            ntp_enabled = ntptime_config.get("enabled", False)
+            ntp_synced = False
+            if await wifi_task:
                 logging("WiFi connection successful", log_name=LOGNAME)
+                BOOT.mark("wifi")
 
                 # 同步NTP时间
-                if ntptime_config.get("enabled", False):
-                    sync_ntp()
+                if ntp_enabled:
+                    ntp_synced = sync_ntp() is not False
                     logging("NTP time synced", log_name=LOGNAME)
+                    BOOT.mark("ntp")
+            else:
+                logging("WiFi unavailable, starting offline", log_name=LOGNAME)
+                BOOT.mark("wifi")
+
+            def on_wifi(up, ip_address):
+                nonlocal ntp_synced
+                if up and ntp_enabled and not ntp_synced:
+                    ntp_synced = sync_ntp() is not False
 
-                # 初始化MQTT客户端
-                mqtt_client = None
-                if mqtt_config.get("enabled", False):
-                    mqtt_client = MQTTPublish(mqtt_config)
-                    ret = mqtt_client.connect()
-                    if ret is False:
-                        logging("Failed to connect to MQTT broker", log_name=LOGNAME)
+            wifi.add_listener(on_wifi)
+            asyncio.create_task(wifi.supervise())
+
+            # 断网期间的消息写入SD卡上的日志，恢复连接后重放
+            journal_config = config.get("journal", {})
+            if journal_config.get("enabled", False):
+                journal = Journal(journal_config)
+
+            # 初始化MQTT客户端
+            topic_detection = mqtt_config.get("topic_detection", "")
+            mqtt_client_id = mqtt_config.get("client_id", "")
+            if mqtt_config.get("enabled", False):
+                mqtt_client = MQTTPublish(mqtt_config)
+                ret = mqtt_client.connect() if wifi.is_connected else False
+                if ret is False:
+                    logging("Failed to connect to MQTT broker", log_name=LOGNAME)
+                    # 异步发布模式或开启日志时会在后台重连，其他模式放弃发布
+                    if not mqtt_client.async_publish and journal is None:
                         mqtt_client = None
-                    else:
-                        topic_detection = mqtt_config.get("topic_detection", "")
-                        mqtt_client_id = mqtt_config.get("client_id", "")
+                if mqtt_client:
+                    # WiFi断开时立即标记MQTT断线，恢复时唤醒重连
+                    wifi.add_listener(mqtt_client.on_network)
+                    mqtt_client.link_up = wifi.is_connected
+                    if log_config.get("topic"):
+                        logging.set_mqtt(
+                            mqtt_client, f"{log_config['topic']}/{mqtt_client_id}"
+                        )
+            BOOT.mark("mqtt")
 
-                # 初始化YOLO模型和处理管道
-                pl = initialize_pipeline(yolo_config)
-                yolo = initialize_yolo(yolo_config)
+            topic_control = mqtt_config.get("topic_control", "")
+            topic_response = mqtt_config.get("topic_response", f"{topic_control}/response")
+            slots = []
+            for i in range(len(prefixes)):
+                model_config = model_configs[i]
+                model = models[i]
+                name = model_config.get("name", "")
+                suffix = f"/{name}" if models_config else ""
 
-                last_time = utime.ticks_ms()
-                while True:
-                    await asyncio.sleep_ms(100)  # 允许事件循环运行
-                    current_time = utime.ticks_ms()
-                    if (
-                        utime.ticks_diff(current_time, last_time) >= 1000
-                    ):  # 每秒处理一帧
-                        last_time = current_time
-                        res, fps, frame = process_frame(
-                            yolo, pl, yolo_config
-                        )  # 获取当前帧
-
-                        # 处理推理结果，准备发送到MQTT
-                        detection_data = []
-                        if res and len(res) > 0:
-                            for item in res:
-                                obj = {
-                                    "label": item.get("label", ""),
-                                    "confidence": item.get("confidence", 0.0),
-                                    "bbox": item.get("bbox", []),
-                                    "fps": float(fps),
-                                }
-                                detection_data.append(obj)
-                            logging(
-                                f"Detection data: {detection_data}", log_name=LOGNAME
-                            )
-
-                            if mqtt_client and mqtt_client.is_connected():
-                                # 发送检测数据到MQTT
-                                str_data = ujson.dumps(
-                                    {
-                                        "data": detection_data,
-                                        "client_id": mqtt_client_id,
-                                    }
-                                )
-                                topic = f"{topic_detection}/{mqtt_client_id}"
-                                logging(
-                                    f"Sending topic {topic} data: {str_data}",
-                                    log_name=LOGNAME,
-                                )
-                                mqtt_client.publish(topic, str_data)
-                            else:
-                                logging("MQTT client not connected", log_name=LOGNAME)
-
-                    # 定期收集垃圾
-                    gc.collect()
+                # 检测流水线：推理与MQTT发布解耦
+                pipeline = DetectionPipeline(
+                    pl,
+                    model,
+                    model_config,
+                    mqtt_client=mqtt_client,
+                    topic=f"{topic_detection}/{mqtt_client_id}{suffix}",
+                    client_id=mqtt_client_id,
+                    payload_format=mqtt_config.get("payload_format", "json"),
+                    confidence_digits=mqtt_config.get("confidence_digits", 3),
+                    config=config.get("pipeline", {}),
+                    gc_config=config.get("gc", {}),
+                    tracker_config=config.get("tracker", {}),
+                    aggregate_config=config.get("aggregate", {}),
+                    metrics_config=config.get("metrics", {}),
+                    filter_config=model_config.get("filter", config.get("filter", {})),
+                    motion_config=config.get("motion", {}),
+                    snapshot_config=model_config.get("snapshot", config.get("snapshot", {})),
+                    journal=journal,
+                    name=name if models_config else "",
+                )
+                slots.append(ModelSlot(name, pipeline, model_config.get("priority", 0)))
+
+                # 通过MQTT控制主题热更新阈值和帧率
+                if mqtt_client and topic_control:
+                    control = ControlHandler(
+                        mqtt_client,
+                        config_store,
+                        model,
+                        pipeline.scheduler,
+                        topic=f"{topic_control}/{mqtt_client_id}{suffix}",
+                        response_topic=f"{topic_response}/{mqtt_client_id}{suffix}",
+                        max_boxes_limit=model_config["max_boxes_num"],
+                        config_prefix=prefixes[i],
+                    )
+                    control.start()
+
+            BOOT.mark("pipelines")
+            asyncio.create_task(
+                BOOT.report_on_first_frame([slot.pipeline for slot in slots])
+            )
+
+            # 接收任务同时负责同步发布模式下的重连
+            if mqtt_client and (topic_control or journal is not None):
+                asyncio.create_task(mqtt_client.run_receiver())
+
+            if len(slots) == 1:
+                await slots[0].pipeline.run()
+            else:
+                scheduler = ModelScheduler(
+                    pl, slots, config.get("model_scheduler", {}), config.get("gc", {})
+                )
+                await scheduler.run()
 
         except KeyboardInterrupt as e:
             print("用户停止: ", e)
         except BaseException as e:
             print(f"异常: {e}")
         finally:
+            config_store.flush()
+            logging.flush()
+            if journal:
+                journal.flush()
             if mqtt_client:
                 mqtt_client.disconnect()  # 断开MQTT连接
                 logging("MQTT client disconnected", log_name=LOGNAME)
-            yolo.deinit()  # 销毁YOLO模型
-            pl.destroy()  # 销毁显示管道
+            for model in models:
+                model.deinit()  # 销毁YOLO模型
+            if pl:
+                pl.destroy()  # 销毁显示管道
             logging("YOLO model and pipeline destroyed", log_name=LOGNAME)
             os.exitpoint(os.EXITPOINT_ENABLE_SLEEP)  # 使能休眠
             time.sleep_ms(100)
@@ -139,13 +233,19 @@ async def main_task():
             return  # 添加缺少的 return 语句
 
     else:
+        ap = None
         try:
             logging(
                 "No WiFi configurations enabled. Starting AP mode...", log_name=LOGNAME
             )
-            ap = WiFiAP()
-            asyncio.run(ap.start())
-            asyncio.run(ap.start_server())
+            # 配网模块只在进入AP模式时加载
+            from src.services.ap import WiFiAP
+
+            portal_config = config.get("portal", {})
+            ap = WiFiAP(config_path=config_path, scan_config=portal_config.get("scan", {}))
+            await ap.start(portal_config.get("dns", {}))
+            # HTTP服务器和DNS服务器在后台协程中处理请求，不阻塞事件循环
+            await ap.start_server(portal_config)
 
             # 创建一个无限循环任务以保持事件循环运行
             async def keep_alive():
@@ -161,6 +261,7 @@ async def main_task():
         except BaseException as e:
             print(f"异常: {e}")
         finally:
+            config_store.flush()
             if ap:
                 ap.stop()
                 logging("AP mode stopped", log_name=LOGNAME)
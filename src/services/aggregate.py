@@ -0,0 +1,177 @@
+from array import array
+
+# 窗口类型
+WINDOW_TUMBLING = "tumbling"  # 窗口不重叠，每满一个窗口输出一次
+WINDOW_SLIDING = "sliding"  # 窗口重叠，每隔 slide 帧输出一次
+
+
+class WindowAggregator:
+    def __init__(self, config: dict, labels: list, max_boxes_num: int = 100):
+        """
+        流式窗口聚合器，按窗口输出检测结果摘要
+
+        每帧的各标签数量和置信度写入环形缓冲区，窗口内的累计值随帧进出增量更新，
+        每个标签的更新都是O(1)，不需要重新遍历历史数据。
+
+        Args:
+            config (dict): 聚合配置，包含以下键：
+                - window: 窗口大小（帧数），默认30
+                - mode: "tumbling" 或 "sliding"，默认"tumbling"
+                - slide: sliding模式下的输出间隔帧数，默认等于window的一半
+            labels (list): 标签名称列表
+            max_boxes_num (int): 单帧最多的检测框数量，用于统计总数的众数
+        """
+        self.window = max(1, config.get("window", 30))
+        self.mode = config.get("mode", WINDOW_TUMBLING)
+        if self.mode not in (WINDOW_TUMBLING, WINDOW_SLIDING):
+            raise ValueError(f"Unknown window mode: {self.mode}")
+        if self.mode == WINDOW_TUMBLING:
+            self.slide = self.window
+        else:
+            self.slide = max(1, config.get("slide", self.window // 2))
+        self.labels = labels
+        self.max_boxes_num = max_boxes_num
+
+        n = len(labels)
+        # 环形缓冲区：每帧每个标签的数量和置信度之和（乘以1000取整，避免浮点累计误差）
+        self._counts = array("H", [0] * (self.window * n))
+        self._conf = array("I", [0] * (self.window * n))
+        self._totals = array("H", [0] * self.window)
+        # 窗口内的累计值
+        self.count_sum = array("I", [0] * n)
+        self.conf_sum = array("I", [0] * n)
+        self.present = array("H", [0] * n)  # 出现过该标签的帧数
+        self.total_hist = array("H", [0] * (max_boxes_num + 1))  # 每帧总数的直方图
+
+        self._pos = 0
+        self.frames = 0  # 窗口内的帧数
+        self._since_emit = 0
+        self._start_ts = 0
+
+    def _evict(self, row: int) -> None:
+        """
+        移出环形缓冲区中最旧的一帧
+        """
+        n = len(self.labels)
+        base = row * n
+        for label_id in range(n):
+            c = self._counts[base + label_id]
+            if c:
+                self.count_sum[label_id] -= c
+                self.conf_sum[label_id] -= self._conf[base + label_id]
+                self.present[label_id] -= 1
+                self._counts[base + label_id] = 0
+                self._conf[base + label_id] = 0
+        self.total_hist[self._totals[row]] -= 1
+        self.frames -= 1
+
+    def add(self, detections, timestamp: int = 0):
+        """
+        加入一帧检测结果
+
+        Args:
+            detections (DetectionBuffer): 本帧检测结果
+            timestamp (int): 本帧时间戳
+
+        Returns:
+            dict | None: 窗口需要输出时返回摘要，否则返回None
+        """
+        row = self._pos
+        if self.frames == self.window:
+            self._evict(row)
+        if self.frames == 0:
+            self._start_ts = timestamp
+
+        n = len(self.labels)
+        base = row * n
+        label_ids = detections.label_ids
+        confidences = detections.confidences
+        for i in range(detections.count):
+            label_id = label_ids[i]
+            if label_id >= n:
+                continue
+            if self._counts[base + label_id] == 0:
+                self.present[label_id] += 1
+            self._counts[base + label_id] += 1
+            conf = int(confidences[i] * 1000)
+            self._conf[base + label_id] += conf
+            self.count_sum[label_id] += 1
+            self.conf_sum[label_id] += conf
+
+        total = min(detections.count, self.max_boxes_num)
+        self._totals[row] = total
+        self.total_hist[total] += 1
+        self.frames += 1
+        self._pos = (row + 1) % self.window
+
+        self._since_emit += 1
+        if self.frames < self.window or self._since_emit < self.slide:
+            return None
+        self._since_emit = 0
+        summary = self.summary(timestamp)
+        if self.mode == WINDOW_TUMBLING:
+            self.reset()
+        return summary
+
+    def count_mode(self) -> int:
+        """
+        窗口内每帧物体总数的众数，与 calculate_cycle_result 相当；众数相同时取最小的总数
+
+        Returns:
+            int: 众数，窗口为空时返回0
+        """
+        best = 0
+        best_count = 0
+        hist = self.total_hist
+        for total in range(len(hist)):
+            if hist[total] > best_count:
+                best = total
+                best_count = hist[total]
+        return best
+
+    def summary(self, timestamp: int = 0) -> dict:
+        """
+        生成当前窗口的摘要
+
+        Args:
+            timestamp (int): 窗口结束时间戳
+
+        Returns:
+            dict: 包含窗口帧数、起止时间、总数众数，以及每个出现过的标签的
+                平均数量、平均置信度和出现占比
+        """
+        frames = self.frames
+        labels = {}
+        for label_id in range(len(self.labels)):
+            count = self.count_sum[label_id]
+            if not count:
+                continue
+            labels[self.labels[label_id]] = {
+                "count_mean": count / frames,
+                "confidence_mean": self.conf_sum[label_id] / count / 1000,
+                "occupancy": self.present[label_id] / frames,
+            }
+        return {
+            "window": frames,
+            "start": self._start_ts,
+            "end": timestamp,
+            "count_mode": self.count_mode(),
+            "labels": labels,
+        }
+
+    def reset(self) -> None:
+        """
+        清空窗口
+        """
+        for i in range(len(self._counts)):
+            self._counts[i] = 0
+            self._conf[i] = 0
+        for i in range(len(self.labels)):
+            self.count_sum[i] = 0
+            self.conf_sum[i] = 0
+            self.present[i] = 0
+        for i in range(len(self.total_hist)):
+            self.total_hist[i] = 0
+        self._pos = 0
+        self.frames = 0
+        self._since_emit = 0
@@ -1,89 +1,72 @@
 import network
-import socket
 import urandom
 import uasyncio as asyncio
 import machine
-import json
 
-# from .dns import DNSServer
+from .dns import DNSServer
 from .utils import (
+    logging,
     remove_wifi_network,
     modify_wifi_network,
     get_wifi_network,
+    apply_wifi_network_ops,
 )
+from .config import DEFAULT_CONFIG_PATH, get_store
+from .httpserver import HTTPServer, HTTPError, Request, Response, Router, json_response
+from .static import StaticFiles
+from .wifiscan import ScanService
+
+LOGNAME = "ap"
 
 
 class WiFiAP:
-    def __init__(self, ssid: str = None, password: str = None):
+    def __init__(
+        self,
+        ssid: str = None,
+        password: str = None,
+        config_path: str = DEFAULT_CONFIG_PATH,
+        static_dir: str = "/sdcard/src/static",
+        scan_config: dict | None = None,
+    ):
         """
         初始化WiFi AP类，管理SSID和密码设置
 
         Args:
-            ssid (str): 要设置的无线网络名称，如果未提供将自动生成一个唯一的ssid
+            ssid (str): 要设置的无线网络名称，如果未提供将自动生成一个随机的ssid
             password (str): 要设置的无线网络密码，如果未提供将使用默认密码"12345678"
+            config_path (str): 配置文件路径，配网接口修改其中的 WiFi 网络
+            static_dir (str): 配网页面所在目录
+            scan_config (dict, optional): 扫描服务配置，见 ScanService
         """
         self.sta = network.WLAN(network.STA_IF)
-        # 初始化WiFi AP类，设置SSID和密码
-        existing_ssids = self.scan_networks()
+        # 初始化WiFi AP类，设置SSID和密码；不在这里扫描，AP启动后由扫描服务在后台扫描
         if ssid is None:
-            while True:
-                ssid = "AP_" + "".join(
-                    urandom.choice("ABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789")
-                    for _ in range(6)
-                )
-                if ssid not in existing_ssids:
-                    break
+            ssid = "AP_" + "".join(
+                urandom.choice("ABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789") for _ in range(6)
+            )
         if password is None:
             password = "12345678"
         # self.ssid = ssid
         self.ssid = "test"
         self.password = password
-        self.existing_ssids = existing_ssids
+        self.scanner = ScanService(self.sta, scan_config)
+        self._scan_task = None
+        self.config_path = config_path
+        self.static_dir = static_dir
+        self.static = None
+        self.server = None
+        self.dns_server = None
+        self._dns_task = None
         self.sta.active(False)
         self.ap = network.WLAN(network.AP_IF)
 
-    def scan_networks(self) -> list[str]:
-        """
-        扫描并获取可用的WiFi网络列表
-
-        Returns:
-            list[str]: 可用网络SSID列表，不包括隐藏网络
-        """
-        # 忽略设置活动状态的步骤
-        try:
-            self.sta.active(True)
-        except AttributeError:
-            print("网络堆栈不支持设置活动状态，跳过。")
-
-        # 扫描 WiFi 网络
-        try:
-            networks = self.sta.scan()
-        except Exception as e:
-            print("扫描失败:", str(e))
-            return []
-
-        # 解析扫描结果
-        ssids = []
-        for net in networks:
-            if hasattr(net, "ssid"):  # 确保每项是字典
-                ssid = (
-                    getattr(net, "ssid", b"").decode("utf-8")
-                    if isinstance(getattr(net, "ssid", b""), bytes)
-                    else getattr(net, "ssid", "")
-                )
-                if ssid:  # 确保 SSID 不为空
-                    ssids.append(ssid)
-                else:
-                    print("跳过隐藏或无效网络:", net)
-            else:
-                print("扫描结果格式不符:", net)
-
-        return ssids
-
-    async def start(self) -> None:
+    async def start(self, dns_config: dict | None = None) -> None:
         """
         启动AP模式并配置SSID和密码
 
+        Args:
+            dns_config (dict, optional): DNS服务器配置，见 DNSServer；enabled 为False时不启动
+
         Returns:
             None
         """
@@ -106,11 +89,17 @@ class WiFiAP:
 
         # 设置固定的IP地址
         # self.ap.ifconfig(("192.168.4.1", "255.255.255.0", "192.168.4.1", "8.8.8.8"))
-        print("AP IP address:", self.ap.ifconfig()[0])
+        ip = self.ap.ifconfig()[0]
+        print("AP IP address:", ip)
+
+        # 启动DNS服务器：所有域名解析到本机，手机连接后自动弹出配网页面
+        dns_config = dns_config or {}
+        if dns_config.get("enabled", True):
+            self.dns_server = DNSServer(ip, config=dns_config)
+            self._dns_task = asyncio.create_task(self.dns_server.start())
 
-        # 启动DNS服务器
-        # self.dns_server = DNSServer("192.168.4.1")
-        # await asyncio.create_task(self.dns_server.start())  # 异步启动DNS服务器
+        # 后台扫描周边网络，配网页面直接读取缓存
+        self._scan_task = asyncio.create_task(self.scanner.run())
 
     def stop(self) -> None:
         """
@@ -119,176 +108,150 @@ class WiFiAP:
         Returns:
             None
         """
+        if self.server is not None:
+            self.server.stop()
+            self.server = None
+        if self._scan_task is not None:
+            self._scan_task.cancel()
+            self._scan_task = None
+        if self.dns_server is not None:
+            self._dns_task.cancel()
+            self.dns_server.stop()
+            self.dns_server = None
         self.ap.active(False)
         print("AP stopped")
 
-    async def handle_client_async(self, conn: socket.socket) -> None:
+    def routes(self) -> Router:
         """
-        异步处理客户端HTTP请求
-
-        Args:
-            conn (socket.socket): 客户端连接对象
+        配网页面和接口的路由表
 
         Returns:
-            None
+            Router: 路由
+        """
+        router = Router()
+        router.add("GET", "/api/scanned_networks", self.api_scanned_networks)
+        router.add("GET", "/api/config_file_networks", self.api_config_file_networks)
+        router.add("POST", "/api/add_update", self.api_add_update)
+        # 页面按路径传 SSID，旧的客户端在请求体中传 {"ssid": ...}
+        router.add("DELETE", "/api/delete", self.api_delete)
+        router.add("DELETE", "/api/delete/<ssid>", self.api_delete)
+        router.add("POST", "/api/networks/batch", self.api_networks_batch)
+        router.add("POST", "/api/reset", self.api_reset)
+        router.add("POST", "/reset", self.api_reset)
+        router.add("GET", "/static/<name>", self.static_file)
+        # 强制门户：其他 GET 请求都返回配网页面
+        router.fallback = self.index
+        return router
+
+    async def api_scanned_networks(self, request: Request) -> Response:
+        """
+        扫描到的 WiFi 网络，直接返回缓存；查询参数 refresh=1 时先扫描一次，
+        detail=1 时返回每个 BSSID 的信号强度、信道和加密方式，否则只返回 SSID 列表
+        """
+        if request.query.get("refresh") == "1":
+            await self.scanner.refresh()
+        return Response(
+            self.scanner.snapshot(request.query.get("detail") == "1"),
+            content_type="application/json",
+        )
+
+    async def api_config_file_networks(self, request: Request) -> Response:
         """
+        配置文件中的 WiFi 网络
+        """
+        return json_response(get_wifi_network(self.config_path))
+
+    async def api_add_update(self, request: Request) -> Response:
+        """
+        添加或修改一个 WiFi 网络，请求体为 {"ssid", "password", "enabled"}
+        """
+        data = request.json()
+        if not isinstance(data, dict) or not data.get("ssid"):
+            raise HTTPError(400, "SSID is required!")
+        ok = modify_wifi_network(
+            ssid=data["ssid"],
+            new_password=data.get("password"),
+            enabled=data.get("enabled", True),
+            config_path=self.config_path,
+        )
+        if not ok:
+            return Response("Failed to save WiFi config!", 500)
+        return Response("WiFi 配置已添加或修改!")
+
+    async def api_delete(self, request: Request) -> Response:
+        """
+        删除一个 WiFi 网络，SSID 在路径中或请求体中
+        """
+        ssid = request.params.get("ssid")
+        if ssid is None and request.body:
+            data = request.json()
+            ssid = data.get("ssid") if isinstance(data, dict) else None
+        if not ssid:
+            raise HTTPError(400, "SSID is required!")
+        if not remove_wifi_network(ssid, self.config_path):
+            return Response("Failed to save WiFi config!", 500)
+        return Response("WiFi 配置已删除!")
+
+    async def api_networks_batch(self, request: Request) -> Response:
+        """
+        在一个事务中批量添加、修改、删除和排序 WiFi 网络，请求体为 {"ops": [...]}，
+        操作格式见 apply_wifi_network_ops；任何一个操作无效时返回400且不做修改
+        """
+        data = request.json()
+        if not isinstance(data, dict):
+            raise HTTPError(400, "Body must be an object with ops!")
         try:
-            request = conn.recv(1024)
-            if not request:
-                conn.close()
-                return
-
-            print("Request:", request)
-
-            if "GET /api/scanned_networks" in request:
-                # 获取扫描到的 WiFi 配置信息
-                wifi_config = self.existing_ssids
-                response = (
-                    "HTTP/1.1 200 OK\nContent-Type: application/json\n\n"
-                    + json.dumps(wifi_config)
-                )
-                conn.sendall(response)
-                conn.close()
-                return
-
-            if "GET /api/config_file_networks" in request:
-                # 获取配置文件中的 WiFi 配置信息
-                config_file_networks = get_wifi_network()
-                response = (
-                    "HTTP/1.1 200 OK\nContent-Type: application/json\n\n"
-                    + json.dumps(config_file_networks)
-                )
-                conn.sendall(response)
-                conn.close()
-                return
-
-            # 处理 POST 请求 /api/add_update
-            if "POST /api/add_update" in request:
-                # 提取请求体部分
-                body_start = request.find(b"\r\n\r\n") + 4  # 定位到请求体的开始
-                body = request[body_start:]  # 获取请求体内容
-                print("Request body:", body)
-
-                try:
-                    # 解析 JSON 请求体
-                    data = json.loads(body)
-                    ssid = data.get("ssid")
-                    password = data.get("password")
-                    enabled = data.get("enabled")
-
-                    print("Received SSID:", ssid)
-                    print("Received Password:", password)
-                    print("Enabled:", enabled)
-
-                    # 添加或更新 WiFi 配置
-                    modify_wifi_network(
-                        ssid=ssid, new_password=password, enabled=enabled
-                    )
-
-                    # 返回响应
-                    response = "HTTP/1.1 200 OK\n\nWiFi 配置已添加或修改!"
-                    conn.sendall(response.encode())  # 发送字节响应
-                    conn.close()
-                    return
-
-                except Exception as e:
-                    # JSON 解析失败时返回错误
-                    print(e)
-                    response = "HTTP/1.1 400 Bad Request\n\nInvalid JSON format!"
-                    conn.sendall(response.encode())  # 发送字节响应
-                    conn.close()
-                    return
-
-            if "DELETE /api/delete" in request:
-                # 提取请求体部分
-                body_start = request.find(b"\r\n\r\n") + 4  # 定位到请求体的开始
-                body = request[body_start:]  # 获取请求体内容
-                print("Request body:", body)
-
-                try:
-                    # 解析 JSON 请求体
-                    data = json.loads(body)
-                    ssid = data.get("ssid")
-
-                    if ssid:
-                        print("Received SSID to remove:", ssid)
-
-                        # 删除WiFi网络配置
-                        remove_wifi_network(ssid)
-
-                        # 返回响应
-                        response = "HTTP/1.1 200 OK\n\nWiFi 配置已删除!"
-                        conn.sendall(response.encode())  # 发送字节响应
-                    else:
-                        # 如果没有提供 SSID，返回错误响应
-                        response = "HTTP/1.1 400 Bad Request\n\nSSID is required!"
-                        conn.sendall(response.encode())  # 发送字节响应
-
-                    conn.close()
-                    return
-
-                except Exception as e:
-                    # JSON 解析失败时返回错误
-                    response = "HTTP/1.1 400 Bad Request\n\nInvalid JSON format!"
-                    conn.sendall(response.encode())  # 发送字节响应
-                    conn.close()
-                    return
-
-            if "POST /reset" in request:
-                print("Received reset request")
-                response = "HTTP/1.1 200 OK\n\nSystem will reset!"
-                conn.sendall(response.encode())
-                conn.close()
-                machine.reset()  # 重置系统
-                return
-
-            # 读取 /sdcard/src/static/index.html 文件并返回
-            try:
-                with open("/sdcard/src/static/index.html", "r") as html_file:
-                    html_content = html_file.read()
-                response = "HTTP/1.1 200 OK\nContent-Type: text/html\n\n" + html_content
-            except Exception as e:
-                response = f"HTTP/1.1 500 Internal Server Error\n\nFailed to read HTML file: {str(e)}"
-
-            conn.sendall(response)
-            conn.close()
+            saved, networks = apply_wifi_network_ops(data.get("ops"), self.config_path)
+        except ValueError as e:
+            raise HTTPError(400, str(e))
+        if not saved:
+            return Response("Failed to save WiFi config!", 500)
+        return json_response({"applied": len(data["ops"]), "networks": networks})
+
+    async def api_reset(self, request: Request) -> Response:
+        """
+        响应发送后重启设备
+        """
+        logging("Received reset request", log_name=LOGNAME)
+        asyncio.create_task(self._reset_later())
+        return Response("System will reset!")
+
+    async def _reset_later(self, delay_ms: int = 500) -> None:
+        await asyncio.sleep_ms(delay_ms)
+        # 后台保存任务可能还没有写入刚才的修改
+        get_store(self.config_path).flush()
+        self.stop()
+        machine.reset()  # 重置系统
+
+    async def index(self, request: Request) -> Response:
+        """
+        配网页面
+        """
+        return self.static.serve(request, "index.html")
 
-        except Exception as e:
-            print("Error handling client:", e)
-            conn.close()
+    async def static_file(self, request: Request) -> Response:
+        """
+        静态目录中的其他文件
+        """
+        return self.static.serve(request, request.params["name"])
 
-    async def start_server(self) -> None:
+    async def start_server(self, config: dict | None = None) -> HTTPServer:
         """
-        启动HTTP服务器
+        启动HTTP服务器，立即返回，连接在后台协程中处理
+
+        Args:
+            config (dict, optional): 服务器配置，见 HTTPServer；其中的 static 项见 StaticFiles
 
         Returns:
-            None
+            HTTPServer: 服务器
         """
-        s = socket.socket()
-        ai = socket.getaddrinfo("0.0.0.0", 80)
-        addr = ai[0][-1]
-        s.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-        s.bind(addr)
-        s.listen(5)
-        print("Listening on", addr)
-
-        while True:
-            try:
-                res = s.accept()
-                client_sock = res[0]
-                client_addr = res[1]
-                client_sock.setblocking(True)  # 设置阻塞模式
-                print("Client connected from", client_addr)
-
-                # 创建一个任务来处理客户端请求
-                asyncio.create_task(self.handle_client_async(client_sock))
-            except OSError as e:
-                print("Error accepting connection:", e)
-            except Exception as e:
-                print("Client:", str(e))
+        self.static = StaticFiles(self.static_dir, (config or {}).get("static", {}))
+        self.server = HTTPServer(self.routes(), config)
+        await self.server.start()
+        return self.server
 
 
 # Example usage:
 # ap = WiFiAP('MyAP', 'password123')
-# ap.start()
-# asyncio.run(ap.start_server())
+# await ap.start()
+# await ap.start_server()
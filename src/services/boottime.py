@@ -0,0 +1,70 @@
+import utime
+import uasyncio as asyncio
+from src.services.logger import logging
+from src.services.metrics import REGISTRY
+
+LOGNAME = "boot"
+
+
+class BootTimer:
+    def __init__(self):
+        """
+        启动阶段计时：依次记录每个阶段结束的时刻，启动完成后输出各阶段耗时
+
+        并发执行的阶段（例如模型初始化期间WiFi在后台关联）按结束顺序记录，
+        后一个阶段的耗时只包含前一个阶段结束之后仍需等待的时间。
+        """
+        self.start_ms = utime.ticks_ms()
+        self._last_ms = self.start_ms
+        self.phases = []  # (阶段名称, 耗时毫秒)
+        self.reported = False
+
+    def mark(self, name: str) -> int:
+        """
+        记录一个阶段结束
+
+        Args:
+            name (str): 阶段名称
+
+        Returns:
+            int: 该阶段的耗时（毫秒）
+        """
+        now = utime.ticks_ms()
+        elapsed = utime.ticks_diff(now, self._last_ms)
+        self._last_ms = now
+        self.phases.append((name, elapsed))
+        return elapsed
+
+    def total_ms(self) -> int:
+        return utime.ticks_diff(self._last_ms, self.start_ms)
+
+    def report(self) -> None:
+        """
+        输出各阶段耗时和总耗时，并写入指标 boot_<阶段>_ms、boot_total_ms
+        """
+        if self.reported:
+            return
+        self.reported = True
+        total = self.total_ms()
+        for name, elapsed in self.phases:
+            REGISTRY.gauge(f"boot_{name}_ms").set(elapsed)
+        REGISTRY.gauge("boot_total_ms").set(total)
+        logging(
+            "Boot phases: %s, total %d ms",
+            ", ".join(f"{name} {elapsed} ms" for name, elapsed in self.phases),
+            total,
+            log_name=LOGNAME,
+        )
+
+    async def report_on_first_frame(self, pipelines: list, poll_ms: int = 20) -> None:
+        """
+        等到任一流水线处理完第一帧时记录 first_frame 阶段并输出报告
+
+        Args:
+            pipelines (list): DetectionPipeline 列表
+            poll_ms (int): 检查间隔
+        """
+        while not any(pipeline.frames_captured for pipeline in pipelines):
+            await asyncio.sleep_ms(poll_ms)
+        self.mark("first_frame")
+        self.report()
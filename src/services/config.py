@@ -0,0 +1,260 @@
+import os
+import json
+import utime
+import uasyncio as asyncio
+from src.services.logger import logging
+
+LOGNAME = "config"
+
+DEFAULT_CONFIG_PATH = "/sdcard/.config.json"
+
+
+def _split(path: str) -> list:
+    return [int(key) if key.isdigit() else key for key in path.split(".")] if path else []
+
+
+class ConfigStore:
+    def __init__(self, path: str = DEFAULT_CONFIG_PATH, debounce_ms: int = 1000):
+        """
+        配置存储，只在第一次访问时读取配置文件，之后的读取都从内存返回
+
+        修改后标记为脏数据：后台保存任务运行时，一段时间内的多次修改合并为一次写入；
+        没有后台任务时立即写入。写入先写临时文件再重命名，掉电时不会损坏原文件。
+
+        Args:
+            path (str): 配置文件路径
+            debounce_ms (int): 最后一次修改之后等待多久再写入
+        """
+        self.path = path
+        self.tmp_path = path + ".tmp"
+        self.debounce_ms = debounce_ms
+        self.data = None
+        self.dirty = False
+        self._changed_ms = 0
+        self._saver_running = False
+        self._event = asyncio.Event()
+        self._subscribers = []
+
+        # 统计信息
+        self.loads = 0
+        self.saves = 0
+
+    def load(self, reload: bool = False) -> bool:
+        """
+        读取配置文件，已经读取过时直接返回
+
+        Args:
+            reload (bool): 是否强制重新读取
+
+        Returns:
+            bool: True表示配置可用
+        """
+        if self.data is not None and not reload:
+            return True
+        try:
+            with open(self.path) as f:
+                self.data = json.load(f)
+        except Exception as e:
+            logging.error(f"Error loading config from {self.path}: {e}", log_name=LOGNAME)
+            # 上次重命名之前掉电时，临时文件中是完整的新配置
+            try:
+                with open(self.tmp_path) as f:
+                    self.data = json.load(f)
+                logging.info(f"Config recovered from {self.tmp_path}", log_name=LOGNAME)
+            except Exception:
+                return False
+        self.loads += 1
+        self.dirty = False
+        return True
+
+    def get(self, path: str = "", default=None):
+        """
+        按点分路径读取配置，例如 "yolo.conf_thresh"、"wifi.networks.0.ssid"
+
+        Args:
+            path (str): 点分路径，空字符串表示整个配置
+            default: 路径不存在时的返回值
+
+        Returns:
+            配置值；返回的是内存中的对象，调用方不应直接修改
+        """
+        if not self.load():
+            return default
+        node = self.data
+        for key in _split(path):
+            try:
+                node = node[key]
+            except (KeyError, IndexError, TypeError):
+                return default
+        return node
+
+    def set(self, path: str, value, notify: bool = True) -> bool:
+        """
+        按点分路径写入配置，中间缺失的字典会自动创建
+
+        Args:
+            path (str): 点分路径
+            value: 新值
+            notify (bool): 是否通知订阅者
+
+        Returns:
+            bool: False表示配置不可用、路径无效或写入失败
+        """
+        if not self.load():
+            return False
+        keys = _split(path)
+        if not keys:
+            return False
+        node = self.data
+        try:
+            for key in keys[:-1]:
+                child = node[key] if isinstance(key, int) else node.get(key)
+                if child is None:
+                    child = node[key] = {}
+                node = child
+            node[keys[-1]] = value
+        except (KeyError, IndexError, TypeError, AttributeError) as e:
+            logging.error(f"Invalid config path {path}: {e}", log_name=LOGNAME)
+            return False
+        saved = self.mark_dirty()
+        if notify:
+            self._notify(path, value)
+        return saved
+
+    def update(self, new_config: dict) -> bool:
+        """
+        合并顶层配置项
+
+        Args:
+            new_config (dict): 要合并的配置
+
+        Returns:
+            bool: False表示配置不可用或写入失败
+        """
+        if not self.load():
+            return False
+        self.data.update(new_config)
+        saved = self.mark_dirty()
+        for key, value in new_config.items():
+            self._notify(key, value)
+        return saved
+
+    def subscribe(self, prefix: str, callback) -> None:
+        """
+        订阅配置变化
+
+        Args:
+            prefix (str): 点分路径前缀，例如 "yolo" 会收到 "yolo.conf_thresh" 的变化；
+                空字符串表示全部变化
+            callback (callable): callback(path, value)
+        """
+        self._subscribers.append((prefix, callback))
+
+    def unsubscribe(self, callback) -> None:
+        self._subscribers = [s for s in self._subscribers if s[1] is not callback]
+
+    def _notify(self, path: str, value) -> None:
+        for prefix, callback in self._subscribers:
+            # 修改的路径位于订阅前缀之下，或者整体替换了订阅前缀的上级
+            if (
+                not prefix
+                or path == prefix
+                or path.startswith(prefix + ".")
+                or prefix.startswith(path + ".")
+            ):
+                try:
+                    callback(path, value)
+                except Exception as e:
+                    logging.error(f"Error in config subscriber for {path}: {e}", log_name=LOGNAME)
+
+    def mark_dirty(self) -> bool:
+        """
+        标记配置已修改，由后台任务合并写入；没有后台任务时立即写入
+
+        Returns:
+            bool: 立即写入时返回写入结果，交给后台任务时返回True
+        """
+        self.dirty = True
+        self._changed_ms = utime.ticks_ms()
+        if self._saver_running:
+            self._event.set()
+            return True
+        return self.save()
+
+    def save(self) -> bool:
+        """
+        立即把内存中的配置原子地写入文件
+
+        Returns:
+            bool: True表示写入成功
+        """
+        if self.data is None:
+            return False
+        try:
+            with open(self.tmp_path, "w") as f:
+                json.dump(self.data, f)
+            try:
+                os.rename(self.tmp_path, self.path)
+            except OSError:
+                # 部分文件系统（如FAT）不允许重命名覆盖已有文件
+                os.remove(self.path)
+                os.rename(self.tmp_path, self.path)
+            self.dirty = False
+            self.saves += 1
+            logging.info(f"Config saved to {self.path}", log_name=LOGNAME)
+            return True
+        except Exception as e:
+            logging.error(f"Error saving config to {self.path}: {e}", log_name=LOGNAME)
+            return False
+
+    def flush(self) -> bool:
+        """
+        有未写入的修改时立即写入
+
+        Returns:
+            bool: False表示写入失败
+        """
+        return self.save() if self.dirty else True
+
+    async def run_saver(self) -> None:
+        """
+        后台任务：最后一次修改之后 debounce_ms 内没有新修改时写入一次
+        """
+        self._saver_running = True
+        try:
+            while True:
+                await self._event.wait()
+                self._event.clear()
+                while self.dirty:
+                    wait = self.debounce_ms - utime.ticks_diff(utime.ticks_ms(), self._changed_ms)
+                    if wait > 0:
+                        await asyncio.sleep_ms(wait)
+                        continue
+                    if not self.save():
+                        # 写入失败时稍后重试
+                        self._changed_ms = utime.ticks_ms()
+        finally:
+            self._saver_running = False
+            self.flush()
+
+    def stats(self) -> dict:
+        return {"loads": self.loads, "saves": self.saves, "dirty": self.dirty}
+
+
+_stores = {}
+
+
+def get_store(path: str = DEFAULT_CONFIG_PATH) -> ConfigStore:
+    """
+    获取配置文件对应的共享配置存储
+
+    Args:
+        path (str): 配置文件路径
+
+    Returns:
+        ConfigStore: 同一路径总是返回同一个对象
+    """
+    store = _stores.get(path)
+    if store is None:
+        store = _stores[path] = ConfigStore(path)
+    return store
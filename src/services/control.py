@@ -0,0 +1,191 @@
+import json
+from src.services.utils import logging
+
+LOGNAME = "control"
+
+# 可热更新的YOLO参数：名称 -> (类型, 最小值, 最大值)
+# max_boxes_num 的上限为启动时的值，检测结果缓冲区按该容量预先分配
+PARAMS = {
+    "conf_thresh": (float, 0.0, 1.0),
+    "nms_thresh": (float, 0.0, 1.0),
+    "max_boxes_num": (int, 1, None),
+    "target_fps": (float, 0.01, 60.0),
+}
+
+
+class ControlHandler:
+    def __init__(
+        self,
+        mqtt_client,
+        store,
+        yolo,
+        scheduler,
+        topic: str,
+        response_topic: str,
+        max_boxes_limit: int,
+        config_prefix: str = "yolo",
+    ):
+        """
+        MQTT控制命令处理器，在不重新初始化模型的情况下热更新YOLO参数和帧率
+
+        命令为JSON，例如 {"id": "1", "set": {"conf_thresh": 0.4, "target_fps": 5}}；
+        也可以用 {"id": "2", "get": ["conf_thresh"]} 查询当前值。
+        一条命令中的参数全部校验通过才会生效，结果发布到响应主题。
+        参数写入配置存储后由订阅回调应用到运行中的模型和调度器，并随配置一起持久化。
+
+        Args:
+            mqtt_client (MQTTPublish): MQTT客户端
+            store (ConfigStore): 配置存储
+            yolo (YOLOv8): 运行中的YOLO模型
+            scheduler (FrameScheduler): 帧调度器
+            topic (str): 控制主题
+            response_topic (str): 响应主题
+            max_boxes_limit (int): max_boxes_num 允许的最大值
+            config_prefix (str): 模型参数在配置存储中的路径，多模型时为 "models.<序号>"
+        """
+        self.mqtt_client = mqtt_client
+        self.store = store
+        self.yolo = yolo
+        self.scheduler = scheduler
+        self.topic = topic
+        self.response_topic = response_topic
+        self.max_boxes_limit = max_boxes_limit
+        self.config_prefix = config_prefix
+
+        # 统计信息
+        self.commands = 0
+        self.rejected = 0
+
+    def start(self) -> None:
+        """
+        订阅配置变化和控制主题
+        """
+        self.store.subscribe(self.config_prefix, self._on_config)
+        self.mqtt_client.add_handler(self.topic, self.on_command)
+
+    def _on_config(self, path: str, value) -> None:
+        """
+        配置存储的变化回调，把模型参数应用到运行中的对象
+        """
+        prefix = self.config_prefix
+        if path == prefix or prefix.startswith(path + "."):
+            # 整个模型配置（或其上级）被替换
+            node = self.store.get(prefix, {})
+            for key in PARAMS:
+                if key in node:
+                    self._on_config(f"{prefix}.{key}", node[key])
+            return
+        key = path[len(prefix) + 1 :]
+        if key == "target_fps":
+            self.scheduler.set_target_fps(value)
+        elif key in PARAMS:
+            setattr(self.yolo, key, value)
+        else:
+            return
+        logging(f"Applied {key} = {value}", log_name=LOGNAME)
+
+    def validate(self, key: str, value):
+        """
+        校验一个参数
+
+        Args:
+            key (str): 参数名
+            value: 参数值
+
+        Returns:
+            tuple: (转换后的值, 错误信息)，校验通过时错误信息为None
+        """
+        spec = PARAMS.get(key)
+        if spec is None:
+            return None, "unknown parameter"
+        kind, low, high = spec
+        if key == "max_boxes_num":
+            high = self.max_boxes_limit
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            return None, "not a number"
+        if kind is int and value != int(value):
+            return None, "not an integer"
+        value = kind(value)
+        if value < low or (high is not None and value > high):
+            return None, f"out of range [{low}, {high}]"
+        return value, None
+
+    def current(self) -> dict:
+        """
+        获取运行中的参数值
+
+        Returns:
+            dict: 参数名 -> 当前值
+        """
+        values = {key: getattr(self.yolo, key, None) for key in PARAMS if key != "target_fps"}
+        values["target_fps"] = self.scheduler.target_fps
+        return values
+
+    def handle(self, command: dict) -> dict:
+        """
+        执行一条控制命令
+
+        Args:
+            command (dict): 命令
+
+        Returns:
+            dict: 响应，包含 id、ok、applied 或 values，失败时包含 errors
+        """
+        response = {"id": command.get("id")}
+        changes = command.get("set")
+        if changes is not None:
+            if not isinstance(changes, dict):
+                response["ok"] = False
+                response["errors"] = {"set": "expected an object"}
+                return response
+            values = {}
+            errors = {}
+            for key, value in changes.items():
+                value, error = self.validate(key, value)
+                if error:
+                    errors[key] = error
+                else:
+                    values[key] = value
+            if errors:
+                response["ok"] = False
+                response["errors"] = errors
+                return response
+            for key, value in values.items():
+                self.store.set(f"{self.config_prefix}.{key}", value)
+            response["ok"] = True
+            response["applied"] = values
+            return response
+
+        current = self.current()
+        keys = command.get("get") or list(current)
+        response["ok"] = True
+        response["values"] = {key: current[key] for key in keys if key in current}
+        return response
+
+    def on_command(self, topic: str, msg: bytes) -> None:
+        """
+        控制主题的消息处理函数
+        """
+        self.commands += 1
+        try:
+            command = json.loads(msg)
+            if not isinstance(command, dict):
+                raise ValueError("expected an object")
+        except ValueError as e:
+            response = {"id": None, "ok": False, "errors": {"command": str(e)}}
+        else:
+            response = self.handle(command)
+        if not response["ok"]:
+            self.rejected += 1
+            logging.warning(f"Rejected command: {response['errors']}", log_name=LOGNAME)
+        self.respond(response)
+
+    def respond(self, response: dict) -> None:
+        payload = json.dumps(response)
+        if self.mqtt_client.async_publish:
+            self.mqtt_client.enqueue(self.response_topic, payload)
+        else:
+            self.mqtt_client.publish(self.response_topic, payload)
+
+    def stats(self) -> dict:
+        return {"commands": self.commands, "rejected": self.rejected}
@@ -0,0 +1,146 @@
+from array import array
+
+
+class DetectionView:
+    def __init__(self, buffer, index: int):
+        """
+        单个检测结果的惰性字典视图，只在访问字段时才读取缓冲区
+
+        Args:
+            buffer (DetectionBuffer): 所属的检测结果缓冲区
+            index (int): 检测结果在缓冲区中的下标
+        """
+        self._buffer = buffer
+        self._index = index
+
+    def __getitem__(self, key: str):
+        buf = self._buffer
+        i = self._index
+        if key == "label":
+            return buf.labels[buf.label_ids[i]]
+        if key == "label_id":
+            return buf.label_ids[i]
+        if key == "confidence":
+            return buf.confidences[i]
+        if key == "bbox":
+            j = i * 4
+            return list(buf.bboxes[j : j + 4])
+        raise KeyError(key)
+
+    def get(self, key: str, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def keys(self) -> tuple:
+        return ("label", "label_id", "confidence", "bbox")
+
+    def to_dict(self) -> dict:
+        """
+        转换为与 parse_result 相同格式的字典
+
+        Returns:
+            dict: 包含 label、label_id、confidence、bbox 的字典
+        """
+        return {key: self[key] for key in self.keys()}
+
+
+class DetectionBuffer:
+    def __init__(self, capacity: int, labels: list):
+        """
+        预分配的紧凑检测结果缓冲区，跨帧复用
+
+        检测框按列存放在定长数组中，填充时不会为每个框创建字典或列表。
+
+        Args:
+            capacity (int): 最多存放的检测框数量，通常为 max_boxes_num
+            labels (list): 标签名称列表
+        """
+        self.capacity = capacity
+        self.labels = labels
+        self.label_ids = array("H", [0] * capacity)
+        self.confidences = array("f", [0.0] * capacity)
+        self.bboxes = array("f", [0.0] * (capacity * 4))
+        self.count = 0
+
+    def __len__(self) -> int:
+        return self.count
+
+    def __getitem__(self, index: int) -> DetectionView:
+        if index < 0 or index >= self.count:
+            raise IndexError(index)
+        return DetectionView(self, index)
+
+    def __iter__(self):
+        for i in range(self.count):
+            yield DetectionView(self, i)
+
+    def fill(self, result) -> int:
+        """
+        用 yolo.run 的原始结果覆盖缓冲区内容
+
+        Args:
+            result: yolo.run 返回的结果，每项为 [x, y, w, h, score, label_id]
+
+        Returns:
+            int: 写入的检测框数量，超出容量的部分会被忽略
+        """
+        label_ids = self.label_ids
+        confidences = self.confidences
+        bboxes = self.bboxes
+        count = 0
+        for item in result:
+            if count == self.capacity:
+                break
+            label_ids[count] = int(item[5])
+            confidences[count] = item[4]
+            j = count * 4
+            bboxes[j] = item[0]
+            bboxes[j + 1] = item[1]
+            bboxes[j + 2] = item[2]
+            bboxes[j + 3] = item[3]
+            count += 1
+        self.count = count
+        return count
+
+    def clear(self) -> None:
+        self.count = 0
+
+    def to_dicts(self) -> list:
+        """
+        转换为字典列表，供仍然需要字典的调用方使用
+
+        Returns:
+            list: 与 parse_result 相同格式的检测结果列表
+        """
+        return [view.to_dict() for view in self]
+
+
+class DetectionPool:
+    def __init__(self, size: int, capacity: int, labels: list):
+        """
+        检测结果缓冲区池，按轮转方式复用缓冲区
+
+        流水线中同时在途的缓冲区数量不会超过队列容量加上正在处理的一个，
+        因此池的大小取队列容量加2即可保证缓冲区不会在被读取前被覆盖。
+
+        Args:
+            size (int): 缓冲区数量
+            capacity (int): 每个缓冲区的检测框容量
+            labels (list): 标签名称列表
+        """
+        self._buffers = [DetectionBuffer(capacity, labels) for _ in range(max(1, size))]
+        self._next = 0
+
+    def acquire(self) -> DetectionBuffer:
+        """
+        取出下一个可复用的缓冲区
+
+        Returns:
+            DetectionBuffer: 已清空的缓冲区
+        """
+        buf = self._buffers[self._next]
+        self._next = (self._next + 1) % len(self._buffers)
+        buf.clear()
+        return buf
@@ -1,76 +1,205 @@
 import socket
+import struct
 import uasyncio as asyncio
+from src.services.utils import logging
+
+LOGNAME = "dns"
+
+QTYPE_A = 1
+QTYPE_AAAA = 28
+
+# 响应头的标志位：QR、AA、RD、RA；NXDOMAIN 额外带 RCODE=3
+FLAGS_ANSWER = 0x8580
+FLAGS_NXDOMAIN = 0x8583
+
+
+if hasattr(asyncio, "core"):
+    # MicroPython：协程就是生成器，把 socket 交给事件循环的 IO 队列，可读时再恢复
+    async def _wait_readable(sock):
+        yield asyncio.core._io_queue.queue_read(sock)
+
+else:
+    # CPython（主机上的替身）：用事件循环的 add_reader
+    async def _wait_readable(sock):
+        loop = asyncio.get_event_loop()
+        future = loop.create_future()
+        loop.add_reader(sock, lambda: future.done() or future.set_result(None))
+        try:
+            await future
+        finally:
+            loop.remove_reader(sock)
+
+
+def parse_question(data) -> tuple | None:
+    """
+    解析DNS查询的第一个问题
+
+    参数：
+        data: 收到的UDP数据
+    返回：
+        tuple | None: (域名小写字符串, 查询类型, 问题结束的偏移)，不是标准查询或格式错误时返回None
+    """
+    if len(data) < 12:
+        return None
+    flags, qdcount = struct.unpack_from("!HH", data, 2)
+    # 只处理 QR=0、OPCODE=0 的标准查询
+    if flags & 0xF800 or qdcount < 1:
+        return None
+    labels = []
+    offset = 12
+    while True:
+        if offset >= len(data):
+            return None
+        length = data[offset]
+        offset += 1
+        if length == 0:
+            break
+        # 问题中不应出现压缩指针，标签最长63字节
+        if length > 63 or offset + length > len(data):
+            return None
+        try:
+            labels.append(data[offset : offset + length].decode().lower())
+        except ValueError:
+            return None
+        offset += length
+    if offset + 4 > len(data):
+        return None
+    qtype = struct.unpack_from("!H", data, offset)[0]
+    return ".".join(labels), qtype, offset + 4
 
 
 class DNSServer:
-    def __init__(self, host_ip: str, domain: str = "ap.net"):
+    def __init__(self, host_ip: str, domain: str = "ap.net", config: dict | None = None):
         """初始化DNS服务器
 
         Args:
             host_ip: 要映射的主机IP地址字符串
             domain: 要处理的自定义域名，默认为"ap.net"
+            config: 服务器配置，包含以下键：
+                - host: 监听地址，默认"0.0.0.0"
+                - port: 监听端口，默认53
+                - wildcard: 强制门户模式，所有域名都解析到 host_ip，默认True；
+                  为False时只解析 domain，其他域名返回NXDOMAIN
+                - ttl: 应答的TTL（秒），默认60
         """
+        config = config or {}
         self.host_ip = host_ip
-        self.domain = domain
+        self.domain = domain.lower()
+        self.host = config.get("host", "0.0.0.0")
+        self.port = config.get("port", 53)
+        self.wildcard = config.get("wildcard", True)
+        self.ttl = config.get("ttl", 60)
+        self._sock = None
+        self._running = False
+        # 查询类型 -> (标志和计数, 应答记录)，只有 ID 和问题部分随查询变化
+        self._templates = {}
+        self._templates[QTYPE_A] = self._build_template(QTYPE_A)
+        self._nxdomain = struct.pack("!HHHHH", FLAGS_NXDOMAIN, 1, 0, 0, 0)
 
-    async def start(self) -> asyncio.Future:
-        """启动DNS服务器，监听和处理DNS请求
+        # 统计信息
+        self.queries = 0
+        self.answered = 0
+        self.nxdomain = 0
+        self.malformed = 0
+        self.errors = 0
 
-        Returns:
-            asyncio.Future 对象，用于异步操作管理
+    def _build_template(self, qtype: int) -> tuple:
+        if qtype == QTYPE_A:
+            answer = struct.pack("!HHHIH", 0xC00C, QTYPE_A, 1, self.ttl, 4) + bytes(
+                int(part) for part in self.host_ip.split(".")
+            )
+            return struct.pack("!HHHHH", FLAGS_ANSWER, 1, 1, 0, 0), answer
+        # 其他类型（例如AAAA）返回没有记录的应答，客户端立即改用A记录
+        return struct.pack("!HHHHH", FLAGS_ANSWER, 1, 0, 0, 0), b""
+
+    def _template(self, qtype: int) -> tuple:
+        template = self._templates.get(qtype)
+        if template is None:
+            template = self._build_template(qtype)
+            # 类型由客户端决定，限制缓存的数量
+            if len(self._templates) < 8:
+                self._templates[qtype] = template
+        return template
+
+    def resolve(self, data) -> bytes | None:
         """
-        addr = socket.getaddrinfo("0.0.0.0", 53)[0][-1]
-        s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-        s.bind(addr)
-        print("DNS server listening on", addr)
-
-        while True:
-            try:
-                data = self._recvfrom_nonblocking(s)
-                if data:
-                    addr = data[1]
-                    data = data[0]
-                    print(f"Received data: {data}")  # 打印接收到的数据进行调试
-
-                    # 解析DNS请求
-                    domain = data[12 : data.find(b"\x00", 12)].decode("utf-8")
-                    print("DNS request for:", domain)
-                    if domain == self.domain:
-                        # 构建DNS响应
-                        response = (
-                            data[:2]
-                            + b"\x81\x80"
-                            + data[4:6]
-                            + b"\x00\x01\x00\x00\x00\x00"
-                            + data[12 : data.find(b"\x00", 12) + 5]
-                            + b"\xc0\x0c\x00\x01\x00\x01\x00\x00\x00\x3c\x00\x04"
-                            + socket.inet_aton(self.host_ip)
-                        )
-                        s.sendto(response, addr)
-            except Exception as e:
-                print(f"Error handling DNS request: {e}")
-                await asyncio.sleep(1)
-
-    def _recvfrom_nonblocking(self, sock, buffer_size: int = 512) -> tuple | None:
-        """非阻塞方式接收数据包
+        为一个查询构建响应
 
         Args:
-            sock: 要监听的socket对象
-            buffer_size: 接收缓冲区大小，默认512字节
+            data: 收到的UDP数据
 
         Returns:
-            成功接收返回(data, addr)元组，失败或无数据返回None
+            bytes | None: 响应，不需要回复时返回None
         """
-        try:
-            # 设置 socket 为非阻塞模式
-            sock.setblocking(False)
-            data = sock.recvfrom(buffer_size)
-            return data
-        except OSError:
-            # 如果没有数据接收到，返回 None
+        question = parse_question(data)
+        if question is None:
+            self.malformed += 1
             return None
+        name, qtype, end = question
+        # 只回显第一个问题，丢弃附加记录（例如EDNS的OPT）
+        if self.wildcard or name == self.domain:
+            head, answer = self._template(qtype)
+            self.answered += 1
+        else:
+            head, answer = self._nxdomain, b""
+            self.nxdomain += 1
+        logging.debug("Query %s type %d", name, qtype, log_name=LOGNAME, every_ms=1000)
+        return data[:2] + head + data[12:end] + answer
+
+    async def start(self) -> None:
+        """启动DNS服务器，等待socket可读时处理到达的所有请求，空闲时不占用CPU
+
+        Returns:
+            None
+        """
+        addr = socket.getaddrinfo(self.host, self.port)[0][-1]
+        self._sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self._sock.setblocking(False)
+        self._sock.bind(addr)
+        self._running = True
+        logging(f"DNS server listening on port {self.port}", log_name=LOGNAME)
+
+        sock = self._sock
+        while self._running:
+            await _wait_readable(sock)
+            while self._running:
+                try:
+                    data, client = sock.recvfrom(512)
+                except OSError:
+                    # 没有更多数据
+                    break
+                self.queries += 1
+                try:
+                    response = self.resolve(data)
+                    if response is not None:
+                        sock.sendto(response, client)
+                except Exception as e:
+                    self.errors += 1
+                    logging.warning(
+                        "Error handling DNS request: %s", e, log_name=LOGNAME, every_ms=10000
+                    )
+
+    def stop(self) -> None:
+        self._running = False
+        if self._sock is not None:
+            self._sock.close()
+            self._sock = None
+
+    def stats(self) -> dict:
+        """获取统计信息
+
+        Returns:
+            dict: 包含查询数、应答数、NXDOMAIN数、格式错误和处理错误的次数
+        """
+        return {
+            "queries": self.queries,
+            "answered": self.answered,
+            "nxdomain": self.nxdomain,
+            "malformed": self.malformed,
+            "errors": self.errors,
+        }
 
 
 # Example usage:
 # dns_server = DNSServer("192.168.4.1")
-# asyncio.run(dns_server.start())
+# asyncio.create_task(dns_server.start())
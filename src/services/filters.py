@@ -0,0 +1,190 @@
+from array import array
+
+# ROI判定所用的检测框参考点
+ANCHOR_CENTER = "center"  # 框中心
+ANCHOR_BOTTOM = "bottom"  # 框底边中点，适合判断行人、车辆所在的地面区域
+
+MAX_ROIS = 8  # 网格每个格子用一个字节的位掩码记录所属的ROI
+
+
+def point_in_polygon(x: float, y: float, points: list) -> bool:
+    """
+    射线法判断点是否在多边形内
+
+    参数：
+        x: 点的x坐标
+        y: 点的y坐标
+        points: 多边形顶点列表 [[x, y], ...]
+    返回：
+        点在多边形内时返回True
+    """
+    inside = False
+    j = len(points) - 1
+    for i in range(len(points)):
+        xi, yi = points[i][0], points[i][1]
+        xj, yj = points[j][0], points[j][1]
+        if (yi > y) != (yj > y) and x < (xj - xi) * (y - yi) / (yj - yi) + xi:
+            inside = not inside
+        j = i
+    return inside
+
+
+class DetectionFilter:
+    def __init__(self, config: dict, labels: list, frame_size: list):
+        """
+        检测框过滤器，在 yolo.run 之后直接处理原始结果，被过滤的框不会生成字典或JSON
+
+        标签的允许/拒绝列表与每个标签的置信度阈值合并为一张按标签ID索引的阈值表，
+        被拒绝的标签阈值高于1；多边形ROI预先栅格化为网格位图，
+        每个框只需一次查表即可判断是否位于ROI内。
+
+        Args:
+            config (dict): 过滤配置，包含以下键：
+                - allow: 只保留这些标签，空列表表示全部保留，默认[]
+                - deny: 丢弃这些标签，默认[]
+                - min_confidence: 每个标签的最低置信度，例如 {"person": 0.6}，默认{}
+                - min_area: 最小框面积（像素），默认0
+                - max_area: 最大框面积（像素），0表示不限制，默认0
+                - rois: 多边形ROI列表，每项包含 points（[[x, y], ...]）和可选的 labels
+                  （只对这些标签生效，默认全部标签）；配置ROI后，有适用ROI的标签只保留
+                  位于适用ROI内的框，没有任何适用ROI的标签不做ROI判定
+                - anchor: ROI判定的参考点，"center" 或 "bottom"，默认"bottom"
+                - grid: ROI网格的列数和行数，默认[64, 36]
+            labels (list): 标签名称列表
+            frame_size (list): yolo.run 结果所在的坐标系大小 [宽, 高]，即 rgb888p_size
+        """
+        n = len(labels)
+        allow = config.get("allow", [])
+        deny = config.get("deny", [])
+        min_confidence = config.get("min_confidence", {})
+        for name in list(allow) + list(deny) + list(min_confidence) + [
+            name for roi in config.get("rois", []) for name in roi.get("labels", [])
+        ]:
+            if name not in labels:
+                raise ValueError(f"Unknown label in filter config: {name}")
+
+        # 每个标签的置信度阈值，被拒绝的标签阈值为2，任何框都无法通过
+        self.min_conf = array("f", [0.0] * n)
+        for label_id in range(n):
+            name = labels[label_id]
+            if (allow and name not in allow) or name in deny:
+                self.min_conf[label_id] = 2.0
+            else:
+                self.min_conf[label_id] = min_confidence.get(name, 0.0)
+
+        self.min_area = config.get("min_area", 0)
+        self.max_area = config.get("max_area", 0)
+
+        self.anchor = config.get("anchor", ANCHOR_BOTTOM)
+        if self.anchor not in (ANCHOR_CENTER, ANCHOR_BOTTOM):
+            raise ValueError(f"Unknown anchor: {self.anchor}")
+        rois = config.get("rois", [])
+        if len(rois) > MAX_ROIS:
+            raise ValueError(f"At most {MAX_ROIS} rois are supported")
+        self.rois = len(rois)
+        self.cols, self.rows = config.get("grid", [64, 36])
+        self.x_scale = self.cols / frame_size[0]
+        self.y_scale = self.rows / frame_size[1]
+        self.grid = None
+        self.label_mask = None
+        if rois:
+            self._build_grid(rois, labels, frame_size)
+
+        # 统计信息
+        self.boxes_in = 0
+        self.boxes_out = 0
+
+    def _build_grid(self, rois: list, labels: list, frame_size: list) -> None:
+        """
+        预先计算每个网格格子中心属于哪些ROI，以及每个标签适用哪些ROI；
+        标签掩码为0表示没有适用的ROI，这类标签跳过网格判定
+        """
+        self.grid = bytearray(self.cols * self.rows)
+        self.label_mask = bytearray(len(labels))
+        cell_w = frame_size[0] / self.cols
+        cell_h = frame_size[1] / self.rows
+        for bit in range(len(rois)):
+            roi = rois[bit]
+            points = roi["points"]
+            if len(points) < 3:
+                raise ValueError(f"ROI needs at least 3 points: {roi}")
+            flag = 1 << bit
+            for row in range(self.rows):
+                y = (row + 0.5) * cell_h
+                for col in range(self.cols):
+                    if point_in_polygon((col + 0.5) * cell_w, y, points):
+                        self.grid[row * self.cols + col] |= flag
+            roi_labels = roi.get("labels")
+            for label_id in range(len(labels)):
+                if not roi_labels or labels[label_id] in roi_labels:
+                    self.label_mask[label_id] |= flag
+
+    def accept(self, box) -> bool:
+        """
+        判断一个原始检测框是否保留
+
+        Args:
+            box: [x, y, w, h, score, label_id]
+
+        Returns:
+            bool: True表示保留
+        """
+        label_id = int(box[5])
+        if label_id >= len(self.min_conf) or box[4] < self.min_conf[label_id]:
+            return False
+        w = box[2]
+        h = box[3]
+        area = w * h
+        if area < self.min_area or (self.max_area and area > self.max_area):
+            return False
+        if self.grid is not None and self.label_mask[label_id]:
+            x = box[0] + w / 2
+            y = box[1] + h if self.anchor == ANCHOR_BOTTOM else box[1] + h / 2
+            col = int(x * self.x_scale)
+            row = int(y * self.y_scale)
+            if col < 0:
+                col = 0
+            elif col >= self.cols:
+                col = self.cols - 1
+            if row < 0:
+                row = 0
+            elif row >= self.rows:
+                row = self.rows - 1
+            if not self.grid[row * self.cols + col] & self.label_mask[label_id]:
+                return False
+        return True
+
+    def apply(self, result):
+        """
+        过滤 yolo.run 的原始结果
+
+        Args:
+            result: yolo.run 返回的结果
+
+        Returns:
+            保留的检测框；没有框被过滤时直接返回原结果，不分配新列表
+        """
+        kept = None
+        i = 0
+        for box in result:
+            if not self.accept(box):
+                if kept is None:
+                    kept = list(result[:i])
+            elif kept is not None:
+                kept.append(box)
+            i += 1
+        self.boxes_in += i
+        if kept is None:
+            self.boxes_out += i
+            return result
+        self.boxes_out += len(kept)
+        return kept
+
+    def stats(self) -> dict:
+        """
+        获取过滤统计信息
+
+        Returns:
+            dict: 包含输入框数、保留框数和ROI数量
+        """
+        return {"boxes_in": self.boxes_in, "boxes_out": self.boxes_out, "rois": self.rois}
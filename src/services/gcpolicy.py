@@ -0,0 +1,109 @@
+import gc
+import utime
+from src.services.utils import logging
+from src.services.metrics import REGISTRY
+
+LOGNAME = "gc"
+
+# 垃圾回收模式
+GC_FRAMES = "frames"  # 每处理N帧回收一次
+GC_THRESHOLD = "threshold"  # 空闲堆内存低于阈值时回收
+GC_IDLE = "idle"  # 在下一帧截止时间之前的空闲时段回收
+
+GC_MODES = (GC_FRAMES, GC_THRESHOLD, GC_IDLE)
+
+
+class GCPolicy:
+    def __init__(self, config: dict | None = None):
+        """
+        按内存预算决定何时执行 gc.collect()
+
+        Args:
+            config (dict, optional): GC配置，包含以下键：
+                - mode: "frames"、"threshold" 或 "idle"，默认"frames"
+                - every_frames: frames模式下的回收间隔帧数，默认10
+                - min_free: threshold模式下触发回收的空闲堆内存字节数，默认65536
+                - min_idle_ms: idle模式下执行回收所需的最小空闲时间，默认20
+        """
+        config = config or {}
+        self.mode = config.get("mode", GC_FRAMES)
+        if self.mode not in GC_MODES:
+            raise ValueError(f"Unknown gc mode: {self.mode}")
+        self.every_frames = max(1, config.get("every_frames", 10))
+        self.min_free = config.get("min_free", 65536)
+        self.min_idle_ms = config.get("min_idle_ms", 20)
+
+        # 部分移植版本（如CPython）没有 gc.mem_free
+        self._mem_free = getattr(gc, "mem_free", None)
+        if self.mode == GC_THRESHOLD and self._mem_free is None:
+            logging("gc.mem_free unavailable, threshold mode disabled", log_name=LOGNAME)
+
+        self._frames_since = 0
+
+        # 统计信息：每种模式的回收次数与耗时
+        self.collections = {mode: 0 for mode in GC_MODES}
+        self.time_us = {mode: 0 for mode in GC_MODES}
+        self.last_free = -1
+        self._hist = REGISTRY.histogram("gc_us")
+
+    def _collect(self, mode: str) -> None:
+        start = utime.ticks_us()
+        gc.collect()
+        self.time_us[mode] += self._hist.time_since(start)
+        self.collections[mode] += 1
+        self._frames_since = 0
+        if self._mem_free is not None:
+            self.last_free = self._mem_free()
+
+    def after_frame(self) -> bool:
+        """
+        每处理完一帧后调用
+
+        Returns:
+            bool: True表示执行了回收
+        """
+        self._frames_since += 1
+        if self.mode == GC_FRAMES:
+            if self._frames_since >= self.every_frames:
+                self._collect(GC_FRAMES)
+                return True
+        elif self.mode == GC_THRESHOLD and self._mem_free is not None:
+            if self._mem_free() < self.min_free:
+                self._collect(GC_THRESHOLD)
+                return True
+        return False
+
+    def on_idle(self, slack_ms: int) -> bool:
+        """
+        在等待下一帧之前调用，idle模式下利用空闲时间回收
+
+        Args:
+            slack_ms (int): 距离下一帧截止时间的毫秒数
+
+        Returns:
+            bool: True表示执行了回收
+        """
+        if self.mode != GC_IDLE or self._frames_since == 0:
+            return False
+        if slack_ms >= self.min_idle_ms:
+            self._collect(GC_IDLE)
+            return True
+        # 长期没有空闲时间时退化为按帧回收，避免堆内存耗尽
+        if self._frames_since >= self.every_frames:
+            self._collect(GC_IDLE)
+            return True
+        return False
+
+    def stats(self) -> dict:
+        """
+        获取GC统计信息
+
+        Returns:
+            dict: 包含当前模式、各模式的回收次数与耗时，以及最近一次回收后的空闲内存
+        """
+        return {
+            "mode": self.mode,
+            "collections": self.collections,
+            "time_us": self.time_us,
+            "free": self.last_free,
+        }
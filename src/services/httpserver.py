@@ -0,0 +1,539 @@
+import json
+import uasyncio as asyncio
+from src.services.utils import logging
+
+LOGNAME = "http"
+
+STATUS_TEXT = {
+    200: "OK",
+    204: "No Content",
+    304: "Not Modified",
+    400: "Bad Request",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    408: "Request Timeout",
+    411: "Length Required",
+    413: "Payload Too Large",
+    431: "Request Header Fields Too Large",
+    500: "Internal Server Error",
+    501: "Not Implemented",
+    503: "Service Unavailable",
+}
+
+
+class HTTPError(Exception):
+    def __init__(self, status: int, message: str = ""):
+        """
+        处理请求时抛出，由服务器转换为对应状态码的响应
+
+        Args:
+            status (int): HTTP状态码
+            message (str): 响应内容
+        """
+        super().__init__(message)
+        self.status = status
+        self.message = message or STATUS_TEXT.get(status, "")
+
+
+def unquote(value: str) -> str:
+    """
+    解码URL中的 %XX 转义和 "+"
+
+    Args:
+        value (str): 编码后的字符串
+
+    Returns:
+        str: 解码后的字符串
+    """
+    if "%" not in value and "+" not in value:
+        return value
+    value = value.replace("+", " ")
+    parts = value.split("%")
+    out = bytearray(parts[0].encode())
+    for part in parts[1:]:
+        try:
+            out.append(int(part[:2], 16))
+            out.extend(part[2:].encode())
+        except ValueError:
+            out.extend(b"%" + part.encode())
+    return out.decode()
+
+
+class Request:
+    def __init__(self, method: str, target: str, version: str, headers: dict, body: bytes):
+        """
+        解析后的HTTP请求
+
+        Args:
+            method (str): 请求方法
+            target (str): 请求目标，包含路径和查询字符串
+            version (str): 协议版本，例如 "HTTP/1.1"
+            headers (dict): 请求头，键为小写
+            body (bytes): 请求体
+        """
+        self.method = method
+        self.version = version
+        self.headers = headers
+        self.body = body
+        self.params = {}  # 路由中的路径参数
+        path, _, query = target.partition("?")
+        self.path = unquote(path)
+        self.query = {}
+        if query:
+            for pair in query.split("&"):
+                key, _, value = pair.partition("=")
+                self.query[unquote(key)] = unquote(value)
+
+    @property
+    def keep_alive(self) -> bool:
+        connection = self.headers.get("connection", "").lower()
+        if self.version == "HTTP/1.0":
+            return connection == "keep-alive"
+        return connection != "close"
+
+    def json(self):
+        """
+        按JSON解析请求体
+
+        Returns:
+            解析结果
+
+        Raises:
+            HTTPError: 请求体不是合法的JSON
+        """
+        try:
+            return json.loads(self.body)
+        except ValueError:
+            raise HTTPError(400, "Invalid JSON format!")
+
+
+class Response:
+    def __init__(
+        self,
+        body=b"",
+        status: int = 200,
+        content_type: str = "text/plain; charset=utf-8",
+        headers: dict | None = None,
+        stream=None,
+        length: int = 0,
+    ):
+        """
+        HTTP响应
+
+        Args:
+            body (str | bytes): 响应内容
+            status (int): 状态码
+            content_type (str): Content-Type
+            headers (dict, optional): 额外的响应头
+            stream (callable, optional): async stream(writer)，发送响应头之后调用，
+                用于分块发送较大的内容，此时 body 被忽略
+            length (int): stream 发送的总字节数，作为 Content-Length
+        """
+        self.body = body.encode() if isinstance(body, str) else body
+        self.status = status
+        self.content_type = content_type
+        self.headers = headers or {}
+        self.stream = stream
+        self.length = length
+
+
+def json_response(data, status: int = 200) -> Response:
+    """
+    构建JSON响应
+
+    参数：
+        data: 可以序列化为JSON的对象
+        status: 状态码
+    返回：
+        Response: 响应
+    """
+    return Response(json.dumps(data), status, "application/json")
+
+
+class Router:
+    def __init__(self):
+        """
+        表驱动的路由：精确路径用字典查找，以 "<name>" 结尾的路径按前缀匹配，
+        匹配到的剩余部分作为路径参数 name
+        """
+        self._exact = {}  # path -> {method: handler}
+        self._prefix = []  # (prefix, name, {method: handler})
+        self.fallback = None  # 未匹配的 GET 请求，例如配网页面
+
+    def add(self, method: str, path: str, handler) -> None:
+        """
+        注册路由
+
+        Args:
+            method (str): 请求方法
+            path (str): 路径，例如 "/api/networks" 或 "/api/delete/<ssid>"
+            handler (callable): async handler(request) -> Response
+        """
+        if path.endswith(">") and "<" in path:
+            prefix, _, name = path[:-1].rpartition("<")
+            for entry in self._prefix:
+                if entry[0] == prefix and entry[1] == name:
+                    entry[2][method] = handler
+                    return
+            self._prefix.append((prefix, name, {method: handler}))
+            # 长前缀优先
+            self._prefix.sort(key=lambda entry: -len(entry[0]))
+        else:
+            self._exact.setdefault(path, {})[method] = handler
+
+    def resolve(self, request: Request):
+        """
+        查找请求对应的处理函数，并填充路径参数
+
+        Args:
+            request (Request): 请求
+
+        Returns:
+            callable: 处理函数
+
+        Raises:
+            HTTPError: 路径不存在（404）或方法不允许（405）
+        """
+        methods = self._exact.get(request.path)
+        if methods is None:
+            for prefix, name, handlers in self._prefix:
+                if request.path.startswith(prefix) and len(request.path) > len(prefix):
+                    request.params[name] = request.path[len(prefix) :]
+                    methods = handlers
+                    break
+        if methods is None:
+            if request.method == "GET" and self.fallback is not None:
+                return self.fallback
+            raise HTTPError(404)
+        handler = methods.get(request.method)
+        if handler is None:
+            raise HTTPError(405)
+        return handler
+
+
+class LineReader:
+    def __init__(self, reader, chunk_size: int = 256):
+        """
+        按行读取请求，每行的长度有上限，超长的行不会整行读入内存；
+        MicroPython 的 Stream.readline 不支持长度限制，因此按块读取并自行切分
+
+        一个连接上的多个请求共用同一个实例，多读的数据留给下一个请求；
+        门户服务器和指标接口共用
+
+        Args:
+            reader: asyncio.StreamReader
+            chunk_size (int): 每次读取的字节数
+        """
+        self.reader = reader
+        self.chunk_size = chunk_size
+        self.buffer = b""
+
+    async def readline(self, limit: int, status: int, message: str = "") -> bytes:
+        """
+        读取一行，包含行尾的换行符；连接关闭时返回剩余的数据
+
+        Args:
+            limit (int): 一行的最大字节数
+            status (int): 超出上限时的HTTP状态码
+            message (str): 超出上限时的响应内容
+
+        Raises:
+            HTTPError: 超出上限，不等待这一行读完
+        """
+        while True:
+            end = self.buffer.find(b"\n")
+            if end >= 0:
+                if end + 1 > limit:
+                    raise HTTPError(status, message)
+                line = self.buffer[: end + 1]
+                self.buffer = self.buffer[end + 1 :]
+                return line
+            if len(self.buffer) >= limit:
+                raise HTTPError(status, message)
+            data = await self.reader.read(self.chunk_size)
+            if not data:
+                line = self.buffer
+                self.buffer = b""
+                return line
+            self.buffer += data
+
+    async def readexactly(self, n: int) -> bytes:
+        """
+        读取 n 字节，先使用已缓冲的数据
+        """
+        data = self.buffer[:n]
+        self.buffer = self.buffer[n:]
+        if len(data) < n:
+            data += await self.reader.readexactly(n - len(data))
+        return data
+
+
+class _TimedWriter:
+    def __init__(self, writer, timeout_ms: int):
+        """
+        给 drain 加上超时的写入器，客户端停止读取时不会一直占用连接；
+        流式响应每写一块调用一次 drain，超时按块计算
+
+        Args:
+            writer: asyncio.StreamWriter
+            timeout_ms (int): 每次 drain 的超时
+        """
+        self.writer = writer
+        self.timeout_ms = timeout_ms
+
+    def write(self, data) -> None:
+        self.writer.write(data)
+
+    async def drain(self) -> None:
+        await asyncio.wait_for_ms(self.writer.drain(), self.timeout_ms)
+
+
+class HTTPServer:
+    def __init__(self, router: Router, config: dict | None = None):
+        """
+        基于 asyncio.start_server 的HTTP/1.1服务器，每个连接在独立的协程中处理，
+        慢速客户端不会阻塞事件循环和其他客户端
+
+        Args:
+            router (Router): 路由
+            config (dict, optional): 服务器配置，包含以下键：
+                - host: 监听地址，默认"0.0.0.0"
+                - port: 监听端口，默认80
+                - max_connections: 同时处理的最大连接数，超出时返回503，默认4
+                - request_timeout_ms: 读取请求行、请求头和请求体的超时，默认5000
+                - keepalive_timeout_ms: 保持连接时等待下一个请求的超时，默认5000
+                - write_timeout_ms: 发送响应时每次等待客户端接收的超时，默认5000
+                - max_requests: 每个连接最多处理的请求数，默认100
+                - max_request_line_bytes: 请求行的最大字节数，超出时返回400，默认1024
+                - max_header_bytes: 请求头的最大字节数，超出时返回431，默认2048
+                - max_body_bytes: 请求体的最大字节数，默认16384
+        """
+        config = config or {}
+        self.router = router
+        self.host = config.get("host", "0.0.0.0")
+        self.port = config.get("port", 80)
+        self.max_connections = config.get("max_connections", 4)
+        self.request_timeout_ms = config.get("request_timeout_ms", 5000)
+        self.keepalive_timeout_ms = config.get("keepalive_timeout_ms", 5000)
+        self.write_timeout_ms = config.get("write_timeout_ms", 5000)
+        self.max_requests = config.get("max_requests", 100)
+        self.max_request_line_bytes = config.get("max_request_line_bytes", 1024)
+        self.max_header_bytes = config.get("max_header_bytes", 2048)
+        self.max_body_bytes = config.get("max_body_bytes", 16384)
+        self._server = None
+        self._writers = []  # 正在处理的连接，停止时关闭
+
+        # 统计信息
+        self.active = 0
+        self.max_active = 0
+        self.connections = 0
+        self.requests = 0
+        self.rejected = 0
+        self.timeouts = 0
+        self.errors = 0
+
+    async def start(self):
+        """
+        开始监听，立即返回
+
+        Returns:
+            asyncio.Server: 服务器对象
+        """
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        logging(f"HTTP server listening on port {self.port}", log_name=LOGNAME)
+        return self._server
+
+    def stop(self) -> None:
+        """
+        停止监听并关闭正在处理的连接，等待中的读取随之结束
+        """
+        if self._server is not None:
+            self._server.close()
+            self._server = None
+        for writer in self._writers:
+            try:
+                writer.close()
+            except Exception:
+                pass
+
+    async def _read_request(self, reader) -> Request | None:
+        """
+        读取并解析一个请求
+
+        Args:
+            reader (LineReader): 连接的按行读取器
+
+        Returns:
+            Request | None: 连接已关闭时返回None
+
+        Raises:
+            HTTPError: 请求格式错误或超出大小限制
+        """
+        line_limit = self.max_request_line_bytes
+        line = await reader.readline(line_limit, 400, "Request line too long")
+        if not line:
+            return None
+        if line == b"\r\n":
+            # 上一个请求之后多余的空行
+            line = await reader.readline(line_limit, 400, "Request line too long")
+            if not line:
+                return None
+        try:
+            method, target, version = line.decode().split()
+        except ValueError:
+            raise HTTPError(400, "Malformed request line")
+
+        headers = {}
+        size = 0
+        while True:
+            # 每行的上限为请求头剩余的预算，超长的行读到上限即返回431
+            line = await reader.readline(max(self.max_header_bytes - size, 2), 431)
+            if not line or line == b"\r\n" or line == b"\n":
+                break
+            size += len(line)
+            if size > self.max_header_bytes:
+                raise HTTPError(431)
+            try:
+                key, sep, value = line.decode().partition(":")
+            except ValueError:
+                raise HTTPError(400, "Malformed header")
+            if sep:
+                headers[key.strip().lower()] = value.strip()
+
+        body = b""
+        if "transfer-encoding" in headers:
+            raise HTTPError(501, "Chunked request bodies are not supported")
+        length = headers.get("content-length")
+        if length:
+            try:
+                length = int(length)
+            except ValueError:
+                raise HTTPError(400, "Invalid Content-Length")
+            if length > self.max_body_bytes:
+                raise HTTPError(413)
+            if length > 0:
+                body = await reader.readexactly(length)
+        try:
+            return Request(method, target, version, headers, body)
+        except ValueError:
+            raise HTTPError(400, "Malformed request target")
+
+    async def _write_response(self, writer, response: Response, keep_alive: bool) -> None:
+        head = [
+            f"HTTP/1.1 {response.status} {STATUS_TEXT.get(response.status, '')}",
+            f"Content-Type: {response.content_type}",
+            f"Content-Length: {response.length if response.stream else len(response.body)}",
+            f"Connection: {'keep-alive' if keep_alive else 'close'}",
+        ]
+        for key, value in response.headers.items():
+            head.append(f"{key}: {value}")
+        writer.write(("\r\n".join(head) + "\r\n\r\n").encode())
+        if response.stream:
+            await response.stream(writer)
+        elif response.body:
+            writer.write(response.body)
+        await writer.drain()
+
+    async def _dispatch(self, request: Request) -> Response:
+        try:
+            handler = self.router.resolve(request)
+            return await handler(request)
+        except HTTPError as e:
+            return Response(e.message, e.status)
+        except Exception as e:
+            self.errors += 1
+            logging.error(
+                "Error handling %s %s: %s", request.method, request.path, e, log_name=LOGNAME
+            )
+            return Response("Internal Server Error", 500)
+
+    async def _handle(self, reader, writer) -> None:
+        """
+        处理一个连接，支持在同一连接上处理多个请求
+        """
+        self.connections += 1
+        if self.active >= self.max_connections:
+            self.rejected += 1
+            try:
+                await self._write_response(
+                    _TimedWriter(writer, self.write_timeout_ms),
+                    Response("Busy", 503, headers={"Retry-After": "1"}),
+                    False,
+                )
+            except Exception:
+                pass
+            await self._close(writer)
+            return
+
+        self.active += 1
+        if self.active > self.max_active:
+            self.max_active = self.active
+        self._writers.append(writer)
+        reader = LineReader(reader)
+        timed_writer = _TimedWriter(writer, self.write_timeout_ms)
+        try:
+            for served in range(self.max_requests):
+                # 第一个请求使用请求超时，之后等待下一个请求使用保持连接超时
+                timeout = self.request_timeout_ms if served == 0 else self.keepalive_timeout_ms
+                try:
+                    request = await asyncio.wait_for_ms(self._read_request(reader), timeout)
+                except asyncio.TimeoutError:
+                    if served == 0:
+                        self.timeouts += 1
+                        await self._write_response(
+                            timed_writer, Response("Request Timeout", 408), False
+                        )
+                    break
+                except HTTPError as e:
+                    await self._write_response(
+                        timed_writer, Response(e.message, e.status), False
+                    )
+                    break
+                if request is None:
+                    break
+                self.requests += 1
+                keep_alive = request.keep_alive and served + 1 < self.max_requests
+                response = await self._dispatch(request)
+                await self._write_response(timed_writer, response, keep_alive)
+                if not keep_alive:
+                    break
+        except asyncio.CancelledError:
+            # 关闭连接后继续传递取消
+            self.active -= 1
+            self._writers.remove(writer)
+            writer.close()
+            raise
+        except asyncio.TimeoutError:
+            # 客户端停止接收响应
+            self.timeouts += 1
+        except Exception as e:
+            # 客户端提前断开等
+            logging.debug("Connection error: %s", e, log_name=LOGNAME)
+        self.active -= 1
+        self._writers.remove(writer)
+        await self._close(writer)
+
+    async def _close(self, writer) -> None:
+        try:
+            writer.close()
+            # 客户端不接收时未发送的数据无法写出，关闭也要有超时
+            await asyncio.wait_for_ms(writer.wait_closed(), self.write_timeout_ms)
+        except Exception:
+            pass
+
+    def stats(self) -> dict:
+        """
+        获取服务器统计信息
+
+        Returns:
+            dict: 包含当前和最大并发连接数、连接数、请求数、拒绝、超时和错误次数
+        """
+        return {
+            "active": self.active,
+            "max_active": self.max_active,
+            "connections": self.connections,
+            "requests": self.requests,
+            "rejected": self.rejected,
+            "timeouts": self.timeouts,
+            "errors": self.errors,
+        }
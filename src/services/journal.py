@@ -0,0 +1,374 @@
+import os
+import struct
+import utime
+import uasyncio as asyncio
+from src.services.utils import logging
+from src.services.metrics import REGISTRY
+
+LOGNAME = "journal"
+
+# 记录头：flags(B) 主题长度(H) 消息长度(I)，其后为主题和消息
+RECORD_HEADER_FORMAT = "<BHI"
+RECORD_HEADER_SIZE = struct.calcsize(RECORD_HEADER_FORMAT)
+FLAG_TEXT = 0x01  # 消息原本是字符串
+
+SEGMENT_PREFIX = "seg_"
+SEGMENT_SUFFIX = ".log"
+CURSOR_FILE = "cursor"
+
+
+def _segment_name(segment_id: int) -> str:
+    return f"{SEGMENT_PREFIX}{segment_id:08d}{SEGMENT_SUFFIX}"
+
+
+def _file_size(path: str) -> int:
+    try:
+        return os.stat(path)[6]
+    except OSError:
+        return 0
+
+
+class Journal:
+    def __init__(self, config: dict):
+        """
+        断网期间的消息日志：追加写入SD卡上的分段文件，恢复连接后按限定速率重放
+
+        消息先写入内存缓冲区，达到 flush_bytes 或每隔 flush_interval_ms 批量写入当前分段，
+        减少对SD卡的小块写入；分段达到 segment_bytes 后新建分段，分段数超过 max_segments 时
+        删除最旧的分段。重放位置保存在 cursor 文件中，重启后从该位置继续，
+        因此最后一批已发送但未保存位置的消息可能重复发送一次。
+        断电可能在分段末尾留下不完整的记录，重启时最后一个分段末尾不完整的话写入新的分段，
+        不在损坏的记录后面追加。
+
+        Args:
+            config (dict): 日志配置，包含以下键：
+                - directory: 分段文件所在目录，默认"/sdcard/journal"
+                - segment_bytes: 每个分段的大小，默认65536
+                - max_segments: 最多保留的分段数，默认16
+                - flush_bytes: 缓冲区达到该大小时立即写入，默认4096
+                - flush_interval_ms: 缓冲区定时写入间隔，默认2000
+                - replay_rate: 每秒最多重放的消息数，默认10
+                - replay_idle_depth: MQTT发送队列深度不超过该值时才重放，默认0
+        """
+        self.directory = config.get("directory", "/sdcard/journal")
+        self.segment_bytes = config.get("segment_bytes", 65536)
+        self.max_segments = max(2, config.get("max_segments", 16))
+        self.flush_bytes = config.get("flush_bytes", 4096)
+        self.flush_interval_ms = config.get("flush_interval_ms", 2000)
+        self.replay_interval_ms = int(1000 / max(0.1, config.get("replay_rate", 10)))
+        self.replay_idle_depth = config.get("replay_idle_depth", 0)
+
+        self._buffer = bytearray()
+        self._buffered = 0  # 缓冲区中的消息数
+        self._segments = []  # 磁盘上的分段ID，按从旧到新排序
+        self._write_size = 0  # 当前写入分段的大小
+        self._read_offset = 0  # 最旧分段中的重放位置
+
+        # 统计信息
+        self.appended = 0
+        self.replayed = 0
+        self.flushes = 0
+        self.evicted_segments = 0
+        self.corrupt_records = 0
+        self.errors = 0
+        self._pending_gauge = REGISTRY.gauge("journal_segments")
+
+        self.open()
+
+    def _path(self, name: str) -> str:
+        return f"{self.directory}/{name}"
+
+    def open(self) -> None:
+        """
+        打开目录并恢复分段列表和重放位置，目录不存在时创建；
+        最后一个分段末尾有不完整的记录时新建写入分段，不完整的记录在重放时丢弃
+        """
+        try:
+            os.mkdir(self.directory)
+        except OSError:
+            pass
+        segments = []
+        for name in os.listdir(self.directory):
+            if name.startswith(SEGMENT_PREFIX) and name.endswith(SEGMENT_SUFFIX):
+                try:
+                    segments.append(int(name[len(SEGMENT_PREFIX) : -len(SEGMENT_SUFFIX)]))
+                except ValueError:
+                    pass
+        segments.sort()
+        self._segments = segments or [1]
+        self._write_size = _file_size(self._path(_segment_name(self._segments[-1])))
+        self._read_offset = 0
+        try:
+            with open(self._path(CURSOR_FILE)) as f:
+                segment_id, offset = f.read().split()
+            if int(segment_id) == self._segments[0]:
+                self._read_offset = int(offset)
+        except (OSError, ValueError):
+            pass
+        if self._complete_size(self._segments[-1]) < self._write_size:
+            logging.warning("Journal segment has a torn tail", log_name=LOGNAME)
+            self._roll()
+        self._pending_gauge.set(len(self._segments))
+        if self.pending_bytes():
+            logging(
+                "Recovered %d segments, %d bytes to replay",
+                len(self._segments),
+                self.pending_bytes(),
+                log_name=LOGNAME,
+            )
+
+    def _complete_size(self, segment_id: int) -> int:
+        """
+        按记录头逐条跳过，返回分段中完整记录的总长度
+        """
+        path = self._path(_segment_name(segment_id))
+        size = _file_size(path)
+        end = 0
+        try:
+            with open(path, "rb") as f:
+                while True:
+                    header = f.read(RECORD_HEADER_SIZE)
+                    if len(header) < RECORD_HEADER_SIZE:
+                        break
+                    _, topic_len, message_len = struct.unpack(RECORD_HEADER_FORMAT, header)
+                    next_end = end + RECORD_HEADER_SIZE + topic_len + message_len
+                    if next_end > size:
+                        break
+                    end = next_end
+                    f.seek(end)
+        except OSError:
+            pass
+        return end
+
+    def pending_bytes(self) -> int:
+        """
+        获取尚未重放的字节数（含未写入的缓冲区）
+
+        Returns:
+            int: 字节数
+        """
+        total = len(self._buffer) - self._read_offset
+        for segment_id in self._segments[:-1]:
+            total += _file_size(self._path(_segment_name(segment_id)))
+        return total + self._write_size
+
+    def __len__(self) -> int:
+        return self.pending_bytes()
+
+    def append(self, topic: str, message) -> None:
+        """
+        追加一条消息，只写入内存缓冲区，达到 flush_bytes 时批量写入SD卡
+
+        Args:
+            topic (str): 消息的主题
+            message (str | bytes): 消息内容
+        """
+        flags = 0
+        if isinstance(message, str):
+            flags |= FLAG_TEXT
+            message = message.encode()
+        topic_bytes = topic.encode()
+        self._buffer.extend(
+            struct.pack(RECORD_HEADER_FORMAT, flags, len(topic_bytes), len(message))
+        )
+        self._buffer.extend(topic_bytes)
+        self._buffer.extend(message)
+        self._buffered += 1
+        self.appended += 1
+        if len(self._buffer) >= self.flush_bytes:
+            self.flush()
+
+    def flush(self) -> bool:
+        """
+        把缓冲区写入当前分段，分段写满时新建分段
+
+        Returns:
+            bool: True表示写入成功或缓冲区为空
+        """
+        if not self._buffer:
+            return True
+        if self._write_size >= self.segment_bytes:
+            self._roll()
+        try:
+            with open(self._path(_segment_name(self._segments[-1])), "ab") as f:
+                f.write(self._buffer)
+        except OSError as e:
+            # SD卡不可用时保留缓冲区，下次再试
+            self.errors += 1
+            logging.error("Error writing journal: %s", e, log_name=LOGNAME, every_ms=10000)
+            return False
+        self._write_size += len(self._buffer)
+        self._buffer = bytearray()
+        self._buffered = 0
+        self.flushes += 1
+        return True
+
+    def _roll(self) -> None:
+        """
+        新建写入分段，超出 max_segments 时删除最旧的分段
+        """
+        self._segments.append(self._segments[-1] + 1)
+        self._write_size = 0
+        while len(self._segments) > self.max_segments:
+            self._drop_oldest()
+            self.evicted_segments += 1
+            logging.warning(
+                "Journal full, oldest segment evicted", log_name=LOGNAME, every_ms=10000
+            )
+        self._pending_gauge.set(len(self._segments))
+
+    def _drop_oldest(self) -> None:
+        segment_id = self._segments.pop(0)
+        try:
+            os.remove(self._path(_segment_name(segment_id)))
+        except OSError:
+            pass
+        self._read_offset = 0
+        self._save_cursor()
+
+    def _save_cursor(self) -> None:
+        try:
+            with open(self._path(CURSOR_FILE), "w") as f:
+                f.write(f"{self._segments[0] if self._segments else 0} {self._read_offset}")
+        except OSError as e:
+            self.errors += 1
+            logging.error("Error saving journal cursor: %s", e, log_name=LOGNAME, every_ms=10000)
+
+    def read_batch(self, max_records: int = 16) -> tuple:
+        """
+        从最旧的分段读取一批待重放的消息，不移动重放位置
+
+        正在写入的分段有数据时先把它封存，写入转到新分段。
+
+        Args:
+            max_records (int): 最多读取的消息数
+
+        Returns:
+            tuple: ((topic, message) 列表, 读完这批消息后的位置)；读取出错时
+                列表可能为空，分段保留到下次调用
+        """
+        if len(self._segments) == 1:
+            if not self.flush() or self._write_size <= self._read_offset:
+                return [], self._read_offset
+            self._roll()
+        path = self._path(_segment_name(self._segments[0]))
+        records = []
+        offset = self._read_offset
+        size = _file_size(path)
+        try:
+            with open(path, "rb") as f:
+                f.seek(offset)
+                while len(records) < max_records:
+                    header = f.read(RECORD_HEADER_SIZE)
+                    if len(header) < RECORD_HEADER_SIZE:
+                        break
+                    flags, topic_len, message_len = struct.unpack(RECORD_HEADER_FORMAT, header)
+                    end = offset + RECORD_HEADER_SIZE + topic_len + message_len
+                    if end > size:
+                        # 断电导致的不完整记录（长度字段也可能已损坏），丢弃分段剩余部分
+                        break
+                    topic = f.read(topic_len)
+                    message = f.read(message_len)
+                    try:
+                        if flags & FLAG_TEXT:
+                            message = message.decode()
+                        topic = topic.decode()
+                    except (UnicodeError, ValueError):
+                        # 记录内容损坏，丢弃分段剩余部分
+                        self.corrupt_records += 1
+                        logging.warning(
+                            "Corrupt journal record in %s, skipping segment",
+                            path,
+                            log_name=LOGNAME,
+                            every_ms=10000,
+                        )
+                        break
+                    records.append((topic, message))
+                    offset = end
+        except OSError as e:
+            # SD卡暂时读取失败时保留分段，已读出的完整记录照常返回，下次轮询再重试
+            self.errors += 1
+            logging.error("Error reading journal: %s", e, log_name=LOGNAME, every_ms=10000)
+            return records, offset
+        if not records:
+            # 分段已读完或只剩不完整、损坏的记录，删除后继续下一个
+            self._drop_oldest()
+            self._pending_gauge.set(len(self._segments))
+            if not self._segments:
+                self._segments = [1]
+                self._write_size = 0
+        return records, offset
+
+    def commit(self, offset: int) -> None:
+        """
+        确认一批消息已发送，保存重放位置
+
+        Args:
+            offset (int): read_batch 返回的位置
+        """
+        self._read_offset = offset
+        self._save_cursor()
+
+    async def run_flusher(self) -> None:
+        """
+        定时把缓冲区写入SD卡
+        """
+        while True:
+            await asyncio.sleep_ms(self.flush_interval_ms)
+            self.flush()
+
+    async def run_replayer(self, mqtt_client, batch_size: int = 16) -> None:
+        """
+        恢复连接后重放日志中的消息
+
+        每条消息之间间隔 1/replay_rate 秒；异步发布模式下只在发送队列深度
+        不超过 replay_idle_depth 时发送，实时消息优先。
+
+        Args:
+            mqtt_client (MQTTPublish): MQTT客户端
+            batch_size (int): 每批读取的消息数，每批发送完毕后保存一次重放位置
+        """
+        while True:
+            if not mqtt_client.is_connected or self.pending_bytes() <= 0:
+                await asyncio.sleep_ms(1000)
+                continue
+            errors = self.errors
+            records, offset = self.read_batch(batch_size)
+            if not records:
+                # 读取出错时等待下一次轮询，分段读完时立即读下一个分段
+                await asyncio.sleep_ms(1000 if self.errors != errors else 0)
+                continue
+            sent = 0
+            for topic, message in records:
+                while mqtt_client.async_publish and len(mqtt_client.outbound) > self.replay_idle_depth:
+                    await asyncio.sleep_ms(self.replay_interval_ms)
+                if not mqtt_client.publish(topic, message):
+                    break
+                sent += 1
+                await asyncio.sleep_ms(self.replay_interval_ms)
+            if sent == len(records):
+                self.commit(offset)
+                self.replayed += sent
+            else:
+                # 中途断线，整批在重连后重新发送
+                await asyncio.sleep_ms(1000)
+
+    def stats(self) -> dict:
+        """
+        获取日志统计信息
+
+        Returns:
+            dict: 包含分段数、待重放字节数、追加与重放的消息数、写入次数、淘汰的分段数
+                和损坏的记录数
+        """
+        return {
+            "segments": len(self._segments),
+            "pending_bytes": self.pending_bytes(),
+            "buffered": self._buffered,
+            "appended": self.appended,
+            "replayed": self.replayed,
+            "flushes": self.flushes,
+            "evicted_segments": self.evicted_segments,
+            "corrupt_records": self.corrupt_records,
+            "errors": self.errors,
+        }
@@ -0,0 +1,226 @@
+import os
+import utime
+import uasyncio as asyncio
+from machine import RTC
+
+# 日志级别
+DEBUG = 10
+INFO = 20
+WARNING = 30
+ERROR = 40
+
+LEVELS = {"debug": DEBUG, "info": INFO, "warning": WARNING, "error": ERROR}
+LEVEL_NAMES = {DEBUG: "DEBUG", INFO: "INFO", WARNING: "WARNING", ERROR: "ERROR"}
+
+
+# 格式化时间函数，将RTC返回的时间元组格式化为字符串
+def format_time(current_time) -> str:
+    return f"{current_time[0]}-{current_time[1]:02d}-{current_time[2]:02d} {current_time[3]:02d}:{current_time[4]:02d}:{current_time[5]:02d}"
+
+
+class Logger:
+    def __init__(self):
+        """
+        分级日志记录器
+
+        - 低于当前级别的日志直接返回，带参数的消息只在需要输出时才格式化；
+        - 时间戳字符串最多每秒刷新一次，不会每次调用都读取RTC；
+        - 可按调用点限速，限速期间被抑制的条数会在下一次输出时附带；
+        - 可选地写入内存环形缓冲区，由后台任务批量写到文件或MQTT主题。
+
+        兼容旧接口：logging(message, log_name=...) 等同于 logging.info(...)。
+        """
+        self.level = INFO
+        self.console = True
+        self._rtc = None
+        self._timestamp = ""
+        self._timestamp_ms = None
+        self._sites = {}  # (log_name, message) -> [上次输出时间, 被抑制条数]
+
+        # 环形缓冲区
+        self._buffer = None
+        self._head = 0
+        self._count = 0
+        self.dropped = 0
+        self.flush_interval_ms = 5000
+        self.file = None
+        self.max_file_size = 65536
+        self._mqtt = None
+        self._topic = None
+
+    def configure(self, config: dict) -> None:
+        """
+        按配置调整日志行为
+
+        Args:
+            config (dict): 日志配置，包含以下键：
+                - level: "debug"、"info"、"warning" 或 "error"，默认"info"
+                - console: 是否输出到串口控制台，默认True
+                - buffer_size: 内存缓冲区的行数，0表示不缓冲，默认0
+                - flush_interval_ms: 缓冲区批量写出的间隔，默认5000
+                - file: 写出的日志文件路径，例如"/sdcard/logs/app.log"，默认不写文件
+                - max_file_size: 日志文件超过该字节数时轮转为 ".1"，默认65536
+        """
+        self.level = LEVELS.get(config.get("level", "info"), INFO)
+        self.console = config.get("console", True)
+        buffer_size = config.get("buffer_size", 0)
+        self._buffer = [None] * buffer_size if buffer_size > 0 else None
+        self._head = 0
+        self._count = 0
+        self.flush_interval_ms = config.get("flush_interval_ms", 5000)
+        self.file = config.get("file", None)
+        self.max_file_size = config.get("max_file_size", 65536)
+
+    def set_mqtt(self, mqtt_client, topic: str) -> None:
+        """
+        设置批量写出日志的MQTT客户端与主题
+
+        Args:
+            mqtt_client (MQTTPublish): MQTT客户端
+            topic (str): 日志主题
+        """
+        self._mqtt = mqtt_client
+        self._topic = topic
+
+    def _now(self) -> str:
+        now = utime.ticks_ms()
+        if self._timestamp_ms is None or utime.ticks_diff(now, self._timestamp_ms) >= 1000:
+            if self._rtc is None:
+                self._rtc = RTC()
+            self._timestamp = format_time(self._rtc.datetime())
+            self._timestamp_ms = now
+        return self._timestamp
+
+    def log(
+        self, level: int, message: str, *args, log_name: str = "log", every_ms: int = 0
+    ) -> None:
+        """
+        输出一条日志
+
+        Args:
+            level (int): 日志级别
+            message (str): 消息，带 args 时作为 % 格式化模板
+            *args: 格式化参数，只有在日志需要输出时才会格式化
+            log_name (str): 日志名称，通常为模块的 LOGNAME
+            every_ms (int): 同一调用点的最小输出间隔，0表示不限速
+        """
+        if level < self.level:
+            return
+        try:
+            suppressed = 0
+            if every_ms:
+                key = (log_name, message)
+                now = utime.ticks_ms()
+                site = self._sites.get(key)
+                if site is None:
+                    self._sites[key] = [now, 0]
+                elif utime.ticks_diff(now, site[0]) < every_ms:
+                    site[1] += 1
+                    return
+                else:
+                    suppressed = site[1]
+                    site[0] = now
+                    site[1] = 0
+
+            text = message % args if args else message
+            if suppressed:
+                text = f"{text} (suppressed {suppressed})"
+            if level == INFO:
+                line = f"[{self._now()}] {log_name}: {text}"
+            else:
+                line = f"[{self._now()}] {log_name} {LEVEL_NAMES.get(level, level)}: {text}"
+
+            if self.console:
+                print(line)
+            if self._buffer is not None:
+                self._append(line)
+        except Exception as e:
+            print(f"Error writing to log: {e}")
+
+    def __call__(self, message: str, *args, log_name: str = "log", every_ms: int = 0):
+        self.log(INFO, message, *args, log_name=log_name, every_ms=every_ms)
+
+    def debug(self, message: str, *args, log_name: str = "log", every_ms: int = 0):
+        self.log(DEBUG, message, *args, log_name=log_name, every_ms=every_ms)
+
+    def info(self, message: str, *args, log_name: str = "log", every_ms: int = 0):
+        self.log(INFO, message, *args, log_name=log_name, every_ms=every_ms)
+
+    def warning(self, message: str, *args, log_name: str = "log", every_ms: int = 0):
+        self.log(WARNING, message, *args, log_name=log_name, every_ms=every_ms)
+
+    def error(self, message: str, *args, log_name: str = "log", every_ms: int = 0):
+        self.log(ERROR, message, *args, log_name=log_name, every_ms=every_ms)
+
+    def is_enabled_for(self, level: int) -> bool:
+        return level >= self.level
+
+    def _append(self, line: str) -> None:
+        size = len(self._buffer)
+        if self._count == size:
+            # 缓冲区满时覆盖最旧的一行
+            self._head = (self._head + 1) % size
+            self._count -= 1
+            self.dropped += 1
+        self._buffer[(self._head + self._count) % size] = line
+        self._count += 1
+
+    def _drain(self) -> list:
+        lines = []
+        size = len(self._buffer)
+        while self._count:
+            lines.append(self._buffer[self._head])
+            self._buffer[self._head] = None
+            self._head = (self._head + 1) % size
+            self._count -= 1
+        return lines
+
+    def _rotate(self) -> None:
+        try:
+            if os.stat(self.file)[6] < self.max_file_size:
+                return
+        except OSError:
+            return
+        backup = self.file + ".1"
+        try:
+            os.remove(backup)
+        except OSError:
+            pass
+        os.rename(self.file, backup)
+
+    def flush(self) -> int:
+        """
+        把缓冲区中的日志一次性写到文件和MQTT主题
+
+        Returns:
+            int: 写出的行数
+        """
+        if not self._buffer or not self._count:
+            return 0
+        lines = self._drain()
+        text = "\n".join(lines) + "\n"
+        if self.file:
+            try:
+                self._rotate()
+                with open(self.file, "a") as f:
+                    f.write(text)
+            except Exception as e:
+                print(f"Error writing log file {self.file}: {e}")
+        if self._mqtt and self._topic:
+            if self._mqtt.async_publish:
+                self._mqtt.enqueue(self._topic, text)
+            else:
+                self._mqtt.publish(self._topic, text)
+        return len(lines)
+
+    async def run_flusher(self) -> None:
+        """
+        后台任务：按 flush_interval_ms 批量写出缓冲区
+        """
+        while True:
+            await asyncio.sleep_ms(self.flush_interval_ms)
+            self.flush()
+
+
+# 全局日志记录器
+logging = Logger()
@@ -0,0 +1,217 @@
+import json
+import utime
+import uasyncio as asyncio
+from array import array
+from src.services.utils import logging
+from src.services.httpserver import HTTPError, LineReader, STATUS_TEXT
+
+LOGNAME = "metrics"
+
+# 默认的延迟分桶上限（微秒）
+DEFAULT_BUCKETS_US = (500, 1000, 2000, 5000, 10000, 20000, 50000, 100000, 200000, 500000)
+
+
+class Counter:
+    def __init__(self):
+        """单调递增的计数器"""
+        self.value = 0
+
+    def inc(self, n: int = 1) -> None:
+        self.value += n
+
+
+class Gauge:
+    def __init__(self):
+        """记录最新值的仪表"""
+        self.value = 0
+
+    def set(self, value) -> None:
+        self.value = value
+
+
+class Histogram:
+    def __init__(self, buckets: tuple = DEFAULT_BUCKETS_US):
+        """
+        固定分桶的直方图，记录次数不会分配内存
+
+        Args:
+            buckets (tuple): 递增的分桶上限，最后额外有一个溢出桶
+        """
+        self.buckets = buckets
+        self.counts = array("I", [0] * (len(buckets) + 1))
+        self.count = 0
+        self.total = 0
+        self.max = 0
+
+    def observe(self, value) -> None:
+        """
+        记录一个观测值
+
+        Args:
+            value: 观测值，延迟类指标单位为微秒
+        """
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+        buckets = self.buckets
+        for i in range(len(buckets)):
+            if value <= buckets[i]:
+                self.counts[i] += 1
+                return
+        self.counts[len(buckets)] += 1
+
+    def time_since(self, start_us: int) -> int:
+        """
+        记录从 start_us 到现在经过的微秒数
+
+        Args:
+            start_us (int): utime.ticks_us() 的起始值
+
+        Returns:
+            int: 经过的微秒数
+        """
+        elapsed = utime.ticks_diff(utime.ticks_us(), start_us)
+        self.observe(elapsed)
+        return elapsed
+
+    def snapshot(self) -> dict:
+        return {
+            "buckets": list(self.buckets),
+            "counts": list(self.counts),
+            "count": self.count,
+            "sum": self.total,
+            "max": self.max,
+        }
+
+
+class MetricsRegistry:
+    def __init__(self):
+        """
+        指标注册表，按名称管理计数器、仪表和直方图
+
+        多个组件共用时各自在名称前加前缀；仪表由组件注册的刷新函数在生成快照前更新
+        """
+        self.counters = {}
+        self.gauges = {}
+        self.histograms = {}
+        self._collectors = []
+        self._start_ms = utime.ticks_ms()
+
+    def add_collector(self, func) -> None:
+        """
+        注册生成快照前调用的仪表刷新函数
+
+        Args:
+            func (callable): 无参数的函数，移除时需传入同一个对象
+        """
+        if func not in self._collectors:
+            self._collectors.append(func)
+
+    def remove_collector(self, func) -> None:
+        if func in self._collectors:
+            self._collectors.remove(func)
+
+    def counter(self, name: str) -> Counter:
+        metric = self.counters.get(name)
+        if metric is None:
+            metric = self.counters[name] = Counter()
+        return metric
+
+    def gauge(self, name: str) -> Gauge:
+        metric = self.gauges.get(name)
+        if metric is None:
+            metric = self.gauges[name] = Gauge()
+        return metric
+
+    def histogram(self, name: str, buckets: tuple = DEFAULT_BUCKETS_US) -> Histogram:
+        metric = self.histograms.get(name)
+        if metric is None:
+            metric = self.histograms[name] = Histogram(buckets)
+        return metric
+
+    def snapshot(self) -> dict:
+        """
+        生成全部指标的快照
+
+        Returns:
+            dict: 包含 uptime_ms、counters、gauges、histograms 的字典
+        """
+        for func in self._collectors:
+            func()
+        return {
+            "uptime_ms": utime.ticks_diff(utime.ticks_ms(), self._start_ms),
+            "counters": {name: m.value for name, m in self.counters.items()},
+            "gauges": {name: m.value for name, m in self.gauges.items()},
+            "histograms": {name: m.snapshot() for name, m in self.histograms.items()},
+        }
+
+
+# 全局注册表
+REGISTRY = MetricsRegistry()
+
+
+async def _read_head(reader: LineReader) -> None:
+    # 只需要读完请求头，请求行和请求头的长度上限与门户服务器的默认值相同
+    await reader.readline(1024, 400, "Request line too long")
+    size = 0
+    while True:
+        line = await reader.readline(max(2048 - size, 2), 431)
+        if not line or line == b"\r\n" or line == b"\n":
+            break
+        size += len(line)
+        if size > 2048:
+            raise HTTPError(431)
+
+
+async def serve_metrics(
+    registry: MetricsRegistry, port: int = 8080, before=None, timeout_ms: int = 5000
+) -> None:
+    """
+    启动HTTP服务，GET 任意路径都返回指标快照的JSON
+
+    请求按有长度上限的行读取，读取请求和发送响应都有超时，
+    空闲或过慢的客户端不会一直占用协程
+
+    Args:
+        registry (MetricsRegistry): 指标注册表
+        port (int): 监听端口
+        before (callable, optional): 生成快照前调用，用于刷新仪表
+        timeout_ms (int): 读取请求和发送响应的超时
+    """
+
+    async def handle(reader, writer):
+        try:
+            try:
+                await asyncio.wait_for_ms(_read_head(LineReader(reader)), timeout_ms)
+                status = 200
+                if before:
+                    before()
+                body = json.dumps(registry.snapshot()).encode()
+                content_type = "application/json"
+            except HTTPError as e:
+                status = e.status
+                body = e.message.encode()
+                content_type = "text/plain"
+            writer.write(
+                (
+                    f"HTTP/1.1 {status} {STATUS_TEXT.get(status, '')}\r\n"
+                    f"Content-Type: {content_type}\r\n"
+                    f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n"
+                ).encode()
+            )
+            writer.write(body)
+            await asyncio.wait_for_ms(writer.drain(), timeout_ms)
+        except asyncio.TimeoutError:
+            logging.debug("Metrics client timed out", log_name=LOGNAME)
+        except Exception as e:
+            logging(f"Error serving metrics: {e}", log_name=LOGNAME)
+        finally:
+            try:
+                writer.close()
+                await writer.wait_closed()
+            except Exception:
+                pass
+
+    await asyncio.start_server(handle, "0.0.0.0", port)
+    logging(f"Metrics endpoint listening on port {port}", log_name=LOGNAME)
@@ -0,0 +1,151 @@
+from src.services.metrics import REGISTRY
+
+# 画面变化的度量方式
+MOTION_DIFF = "diff"  # 降采样亮度的平均绝对差
+MOTION_HIST = "hist"  # 降采样亮度直方图的差异占比
+
+HIST_BINS = 16
+HIST_SHIFT = 4  # 256级亮度压缩为16个桶
+
+
+class MotionGate:
+    def __init__(self, config: dict, frame_size: list, metrics_prefix: str = ""):
+        """
+        推理前的画面变化门控，场景没有变化时跳过 yolo.run 并复用上一次的结果
+
+        从 pl.get_frame() 返回的 CHW 图像中按网格降采样G通道（近似亮度）作为签名，
+        与最近一次推理时的签名比较：比较对象不是上一帧，缓慢的变化也会累积到阈值。
+        无论画面是否变化，每隔 refresh_frames 帧都会强制推理一次。
+
+        Args:
+            config (dict): 门控配置，包含以下键：
+                - mode: "diff" 或 "hist"，默认"diff"
+                - grid: 降采样网格的列数和行数，默认[32, 24]
+                - diff_thresh: diff模式下触发推理的平均绝对差（0-255），默认6
+                - hist_thresh: hist模式下触发推理的直方图差异占比（0-1），默认0.05
+                - refresh_frames: 强制推理的间隔帧数，默认30
+            frame_size (list): 图像大小 [宽, 高]，即 rgb888p_size
+            metrics_prefix (str): 指标名称前缀，多个模型各自使用门控时区分指标
+        """
+        self.mode = config.get("mode", MOTION_DIFF)
+        if self.mode not in (MOTION_DIFF, MOTION_HIST):
+            raise ValueError(f"Unknown motion mode: {self.mode}")
+        cols, rows = config.get("grid", [32, 24])
+        self.step_x = max(1, frame_size[0] // cols)
+        self.step_y = max(1, frame_size[1] // rows)
+        self.diff_thresh = config.get("diff_thresh", 6)
+        self.hist_thresh = config.get("hist_thresh", 0.05)
+        self.refresh_frames = max(1, config.get("refresh_frames", 30))
+
+        self._reference = None  # 最近一次推理时的签名
+        self._hist = [0] * HIST_BINS
+        self._reference_hist = [0] * HIST_BINS
+        self._since_refresh = 0
+
+        # 最近一次推理的结果，跳过推理时复用
+        self.result = None
+        self.fps = 0
+
+        # 统计信息
+        self.frames = 0
+        self.skipped = 0
+        self._skipped_counter = REGISTRY.counter(f"{metrics_prefix}motion_skipped")
+        self._ratio_gauge = REGISTRY.gauge(f"{metrics_prefix}motion_skip_ratio")
+
+    def signature(self, img) -> bytearray:
+        """
+        计算图像的降采样签名
+
+        Args:
+            img: CHW 排列的图像（ulab ndarray）
+
+        Returns:
+            bytearray: 网格上每个采样点的G通道值
+        """
+        return bytearray(img[1, :: self.step_y, :: self.step_x].flatten())
+
+    def _diff_changed(self, current: bytearray, reference: bytearray) -> bool:
+        # 累计差值超过阈值就提前结束，有变化的帧不必遍历完
+        limit = self.diff_thresh * len(current)
+        total = 0
+        for i in range(len(current)):
+            d = current[i] - reference[i]
+            total += d if d > 0 else -d
+            if total > limit:
+                return True
+        return False
+
+    def _histogram(self, signature: bytearray, hist: list) -> None:
+        for i in range(HIST_BINS):
+            hist[i] = 0
+        for value in signature:
+            hist[value >> HIST_SHIFT] += 1
+
+    def _hist_changed(self, current: bytearray) -> bool:
+        self._histogram(current, self._hist)
+        moved = 0
+        for i in range(HIST_BINS):
+            d = self._hist[i] - self._reference_hist[i]
+            moved += d if d > 0 else -d
+        # 每个移动的像素会在两个桶里各计一次
+        return moved / 2 > self.hist_thresh * len(current)
+
+    def check(self, img) -> bool:
+        """
+        判断本帧是否需要推理
+
+        Args:
+            img: pl.get_frame() 返回的图像
+
+        Returns:
+            bool: True表示需要执行 yolo.run，False表示可以复用 self.result
+        """
+        self.frames += 1
+        current = self.signature(img)
+        self._since_refresh += 1
+        run = (
+            self.result is None
+            or self._reference is None
+            or len(current) != len(self._reference)
+            or self._since_refresh >= self.refresh_frames
+        )
+        if not run:
+            if self.mode == MOTION_DIFF:
+                run = self._diff_changed(current, self._reference)
+            else:
+                run = self._hist_changed(current)
+
+        if run:
+            self._reference = current
+            if self.mode == MOTION_HIST:
+                self._histogram(current, self._reference_hist)
+            self._since_refresh = 0
+        else:
+            self.skipped += 1
+            self._skipped_counter.inc()
+        self._ratio_gauge.set(self.skipped / self.frames)
+        return run
+
+    def remember(self, result, fps: float) -> None:
+        """
+        记录本次推理的结果，供之后跳过推理的帧复用
+
+        Args:
+            result: yolo.run 的结果（经过过滤）
+            fps (float): 推理帧率
+        """
+        self.result = result
+        self.fps = fps
+
+    def stats(self) -> dict:
+        """
+        获取门控统计信息
+
+        Returns:
+            dict: 包含处理帧数、跳过帧数和跳过比例
+        """
+        return {
+            "frames": self.frames,
+            "skipped": self.skipped,
+            "skip_ratio": self.skipped / self.frames if self.frames else 0,
+        }
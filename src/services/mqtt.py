@@ -1,6 +1,9 @@
 import json
+import utime
+import uasyncio as asyncio
 from libs.umqtt.simple import MQTTClient
 from src.services.utils import logging
+from src.services.ringbuffer import BoundedQueue, DROP_OLDEST
 
 LOGNAME = "mqtt"
 
@@ -18,6 +21,14 @@ class MQTTPublish:
                 - client_id (optional): 客户端ID，默认为"yolo_client"
                 - username (optional): 用户名，可选
                 - password (optional): 密码，可选
+                - async_publish (optional): 是否启用异步发布模式，默认False
+                - queue_size (optional): 异步模式下发送队列的容量，默认32
+                - drop_policy (optional): 发送队列满时的策略，默认"drop_oldest"
+                - batch_max (optional): 合并为一条消息的最大帧数，默认1（不合并），
+                  只有以 coalesce=True 入队的检测结果会被合并
+                - batch_interval_ms (optional): 合并消息的等待时间，默认0
+                - reconnect_min_ms (optional): 重连退避的初始间隔，默认1000
+                - reconnect_max_ms (optional): 重连退避的最大间隔，默认60000
         """
         self.broker = config["broker"]
         self.port = config["port"]
@@ -29,15 +40,41 @@ class MQTTPublish:
         # 初始化 MQTTClient
         self.client = MQTTClient(self.client_id, self.broker, port=self.port)
 
+        # 收到的消息按主题分发给已注册的处理函数
+        self.client.set_callback(self.on_message)
+        self._handlers = {}
+        self._subscriptions = []
+
         # 如果提供了用户名和密码，设置它们
         if self.username and self.password:
-            self.client.set_callback(self.on_message)
             self.client.set_last_will(
                 topic=self.topic_detection, msg="Disconnected", retain=True
             )
 
         # 初始化连接状态
         self.is_connected = False
+        self.link_up = True  # WiFi链路状态，由 on_network 更新
+        self._link_event = asyncio.Event()
+
+        # 异步发布模式
+        self.async_publish = config.get("async_publish", False)
+        self.batch_max = max(1, config.get("batch_max", 1))
+        self.batch_interval_ms = config.get("batch_interval_ms", 0)
+        self.reconnect_min_ms = config.get("reconnect_min_ms", 1000)
+        self.reconnect_max_ms = config.get("reconnect_max_ms", 60000)
+        self.outbound = BoundedQueue(
+            config.get("queue_size", 32),
+            config.get("drop_policy", DROP_OLDEST),
+            "mqtt",
+        )
+        self._pending = None  # 发送失败、等待重连后重放的批次
+
+        # 统计信息
+        self.published = 0
+        self.failed = 0
+        self.reconnects = 0
+        self.latency_total_ms = 0
+        self.latency_max_ms = 0
 
     def connect(self) -> bool:
         """
@@ -51,31 +88,184 @@ class MQTTPublish:
             self.client.connect()
             self.is_connected = True
             logging(f"Connected to MQTT broker: {self.broker}", log_name=LOGNAME)
+            # 使用clean session连接，重连后需要重新订阅
+            for topic in self._subscriptions:
+                self.client.subscribe(topic)
             return True
         except Exception as e:
             logging(f"Error connecting to MQTT broker: {e}", log_name=LOGNAME)
             return False
 
-    def publish(self, topic: str, message: bytes):
+    def publish(self, topic: str, message: bytes) -> bool:
         """
         发布消息到指定的主题
 
         Args:
             topic (str): 要发布的主题
             message (bytes): 要发布的内容，必须是字节格式
+
+        Returns:
+            bool: True表示发布成功
         """
         if not self.is_connected:
             # logging(
             #     f"MQTT not connected. Unable to publish to {topic}", log_name=LOGNAME
             # )
-            return
+            return False
 
         try:
             # 发布消息，umqtt.simple 采用的是 publish(topic, msg)
             self.client.publish(topic, message)
-            logging(f"Message published to {topic}", log_name=LOGNAME)
+            logging.debug("Message published to %s", topic, log_name=LOGNAME)
+            return True
         except Exception as e:
-            logging(f"Error publishing message to {topic}: {e}", log_name=LOGNAME)
+            # 发布失败通常意味着连接已断开，交给重连逻辑处理
+            self.is_connected = False
+            logging.error(f"Error publishing message to {topic}: {e}", log_name=LOGNAME)
+            return False
+
+    def enqueue(self, topic: str, message, coalesce: bool = False) -> bool:
+        """
+        异步模式下将消息放入发送队列，立即返回
+
+        断线期间消息保留在队列中，重连后按顺序重放；
+        队列满时按 drop_policy 丢弃。
+
+        Args:
+            topic (str): 要发布的主题
+            message (str | bytes): 要发布的内容
+            coalesce (bool): 是否允许与同一主题相邻的消息合并发送（见 _coalesce），
+                只用于检测结果；日志、控制响应、截图等消息总是单独发送
+
+        Returns:
+            bool: True表示已入队，False表示被丢弃
+        """
+        return self.outbound.put_nowait((topic, message, utime.ticks_ms(), coalesce))
+
+    def _next_batch(self) -> list:
+        """
+        从发送队列取出同一主题、都允许合并的一批消息
+
+        Returns:
+            list: (topic, message, enqueue_ms, coalesce) 元组列表
+        """
+        first = self.outbound.get_nowait()
+        batch = [first]
+        while first[3] and len(batch) < self.batch_max:
+            item = self.outbound.peek()
+            if item is None or item[0] != first[0] or not item[3]:
+                break
+            batch.append(self.outbound.get_nowait())
+        return batch
+
+    @staticmethod
+    def _coalesce(batch: list):
+        """
+        将一批检测结果合并为一条
+
+        只有一条时原样发送，即单帧的JSON对象或二进制帧；多条时文本（json、json_compact）
+        合并为JSON数组 "[帧1,帧2,...]"，二进制帧首尾相接，每帧头部自带目标数，
+        接收端用 tools/payload_decoder.py 的 decode_batch 拆分。
+
+        Args:
+            batch (list): (topic, message, enqueue_ms, coalesce) 元组列表
+
+        Returns:
+            str | bytes: 合并后的消息内容
+        """
+        if len(batch) == 1:
+            return batch[0][1]
+        if isinstance(batch[0][1], str):
+            return "[" + ",".join(item[1] for item in batch) + "]"
+        return b"".join(item[1] for item in batch)
+
+    async def _reconnect(self) -> None:
+        """
+        按指数退避重连，直到成功
+        """
+        delay = self.reconnect_min_ms
+        while not self.is_connected:
+            if self.link_up:
+                try:
+                    self.client.disconnect()
+                except Exception:
+                    pass
+                if self.connect():
+                    self.reconnects += 1
+                    return
+                logging.warning("Reconnect failed, retry in %d ms", delay, log_name=LOGNAME)
+            # WiFi链路恢复时立即重试，不必等完退避间隔
+            self._link_event.clear()
+            try:
+                await asyncio.wait_for_ms(self._link_event.wait(), delay)
+                delay = self.reconnect_min_ms
+            except asyncio.TimeoutError:
+                delay = min(delay * 2, self.reconnect_max_ms)
+
+    def on_network(self, up: bool, ip_address: str = None) -> None:
+        """
+        WiFi链路变化的回调：断开时立即标记为未连接，恢复时唤醒重连
+
+        Args:
+            up (bool): True表示链路已连接
+            ip_address (str): 获取到的IP地址
+        """
+        self.link_up = up
+        if up:
+            self._link_event.set()
+        elif self.is_connected:
+            # 不等发送超时，断线期间的消息直接进入发送队列或日志
+            self.is_connected = False
+            logging.warning("WiFi down, MQTT marked disconnected", log_name=LOGNAME)
+
+    async def run_publisher(self) -> None:
+        """
+        异步发布任务：合并队列中的消息并发送，断线时重连并重放
+        """
+        while True:
+            if not self.is_connected:
+                await self._reconnect()
+
+            if self._pending is None:
+                await self.outbound.wait_not_empty()
+                if self.batch_interval_ms and len(self.outbound) < self.batch_max:
+                    # 等待更多帧到达，以便合并发送
+                    await asyncio.sleep_ms(self.batch_interval_ms)
+                self._pending = self._next_batch()
+
+            batch = self._pending
+            if self.publish(batch[0][0], self._coalesce(batch)):
+                self._pending = None
+                now = utime.ticks_ms()
+                for item in batch:
+                    latency = utime.ticks_diff(now, item[2])
+                    self.latency_total_ms += latency
+                    if latency > self.latency_max_ms:
+                        self.latency_max_ms = latency
+                self.published += len(batch)
+            else:
+                self.failed += 1
+            await asyncio.sleep_ms(0)
+
+    def stats(self) -> dict:
+        """
+        获取发布统计信息
+
+        Returns:
+            dict: 包含队列深度、丢弃数、已发布消息数、失败与重连次数以及排队延迟
+        """
+        return {
+            "connected": self.is_connected,
+            "depth": len(self.outbound) + (len(self._pending) if self._pending else 0),
+            "dropped": self.outbound.dropped,
+            "published": self.published,
+            "failed": self.failed,
+            "reconnects": self.reconnects,
+            "latency_avg_ms": (
+                self.latency_total_ms / self.published if self.published else 0
+            ),
+            "latency_max_ms": self.latency_max_ms,
+        }
 
     def subscribe(self, topic: str) -> bool:
         """
@@ -91,14 +281,18 @@ class MQTTPublish:
             logging(
                 f"MQTT not connected. Unable to subscribe to {topic}", log_name=LOGNAME
             )
-            return
+            return False
 
         try:
             # 订阅主题，umqtt.simple 采用的是 subscribe(topic)
             self.client.subscribe(topic)
+            if topic not in self._subscriptions:
+                self._subscriptions.append(topic)
             logging(f"Subscribed to topic: {topic}", log_name=LOGNAME)
+            return True
         except Exception as e:
             logging(f"Error subscribing to {topic}: {e}", log_name=LOGNAME)
+            return False
 
     def unsubscribe(self, topic: str) -> bool:
         """
@@ -120,6 +314,8 @@ class MQTTPublish:
         try:
             # 取消订阅主题，umqtt.simple 采用的是 unsubscribe(topic)
             self.client.unsubscribe(topic)
+            if topic in self._subscriptions:
+                self._subscriptions.remove(topic)
             logging(f"Unsubscribed from topic: {topic}", log_name=LOGNAME)
         except Exception as e:
             logging(f"Error unsubscribing from {topic}: {e}", log_name=LOGNAME)
@@ -144,12 +340,59 @@ class MQTTPublish:
         except Exception as e:
             logging(f"Error in MQTT loop: {e}", log_name=LOGNAME)
 
-    def on_message(self, topic: str, msg: bytes):
+    def add_handler(self, topic: str, handler) -> bool:
         """
-        收到消息时的回调函数
+        订阅主题并注册消息处理函数
 
         Args:
-            topic (str): 消息所属的主题
+            topic (str): 要订阅的主题
+            handler (callable): handler(topic, msg)，topic 为字符串，msg 为字节
+
+        Returns:
+            bool: True表示已订阅，False表示尚未连接或订阅失败，下次连接成功后订阅
+        """
+        self._handlers[topic] = handler
+        if not self.is_connected:
+            if topic not in self._subscriptions:
+                self._subscriptions.append(topic)
+            return False
+        return self.subscribe(topic)
+
+    async def run_receiver(self, interval_ms: int = 100) -> None:
+        """
+        接收任务：定期以非阻塞方式检查订阅主题的消息
+
+        异步发布模式下断线由发布任务重连，否则由本任务重连。
+
+        Args:
+            interval_ms (int): 检查间隔
+        """
+        while True:
+            if self.is_connected:
+                try:
+                    self.client.check_msg()
+                except Exception as e:
+                    self.is_connected = False
+                    logging.error(f"Error receiving message: {e}", log_name=LOGNAME)
+            elif not self.async_publish:
+                await self._reconnect()
+            await asyncio.sleep_ms(interval_ms)
+
+    def on_message(self, topic, msg: bytes):
+        """
+        收到消息时的回调函数，按主题分发给已注册的处理函数
+
+        Args:
+            topic (bytes | str): 消息所属的主题
             msg (bytes): 接收到的消息内容
         """
-        logging(f"Received message: {msg} on topic: {topic}", log_name=LOGNAME)
+        if isinstance(topic, bytes):
+            topic = topic.decode()
+        handler = self._handlers.get(topic)
+        if handler is None:
+            logging(f"Received message: {msg} on topic: {topic}", log_name=LOGNAME)
+            return
+        try:
+            handler(topic, msg)
+        except Exception as e:
+            logging.error(f"Error handling message on {topic}: {e}", log_name=LOGNAME)
@@ -0,0 +1,191 @@
+import utime
+import uasyncio as asyncio
+from src.services.utils import logging
+from src.services.gcpolicy import GCPolicy
+
+LOGNAME = "multimodel"
+
+
+class ModelSlot:
+    def __init__(self, name: str, pipeline, priority: int = 0):
+        """
+        多模型调度中的一个模型
+
+        Args:
+            name (str): 模型名称，也是发布的子主题
+            pipeline (DetectionPipeline): 该模型的流水线，推理节奏由其 scheduler 的帧率决定
+            priority (int): 优先级，数值越大越先执行，帧预算不足时优先级低的模型顺延
+        """
+        self.name = name
+        self.pipeline = pipeline
+        self.scheduler = pipeline.scheduler
+        self.priority = priority
+
+        self.waiting = 0  # 连续被顺延的次数，每次顺延相当于优先级加1
+
+        # 统计信息
+        self.runs = 0
+        self.deferred = 0
+
+
+class ModelScheduler:
+    def __init__(self, pl, slots: list, config: dict | None = None, gc_config: dict | None = None):
+        """
+        多模型调度器：多个模型共用一个 PipeLine，每帧只采集一次
+
+        每个模型按各自的帧率计算截止时间；到期的模型按优先级（同优先级按迟到时间）
+        在同一帧上依次执行。设置了帧预算时，按推理耗时的移动平均预计会超出预算的模型
+        顺延到下一帧，每帧至少执行一个模型；每次顺延都会提高该模型的有效优先级，
+        低优先级模型不会被一直饿死。
+
+        Args:
+            pl: PipeLine实例（或提供 get_frame 的替身对象）
+            slots (list): ModelSlot 列表
+            config (dict, optional): 调度配置，包含以下键：
+                - frame_budget_ms: 每帧推理的总耗时预算，0表示不限制，默认0
+            gc_config (dict, optional): 垃圾回收配置，见 GCPolicy
+        """
+        config = config or {}
+        if not slots:
+            raise ValueError("At least one model is required")
+        self.pl = pl
+        self.slots = slots
+        self.frame_budget_ms = config.get("frame_budget_ms", 0)
+        self.gc_policy = GCPolicy(gc_config)
+        self.frames = 0
+        self._tasks = []
+
+    def _due(self, now: int) -> tuple:
+        """
+        获取已经到期的模型和距离最近截止时间的毫秒数
+
+        Returns:
+            tuple: (按执行顺序排列的到期模型列表, 最小等待毫秒数)
+        """
+        due = []
+        wait = None
+        for slot in self.slots:
+            delay = slot.scheduler.due_in_ms(now)
+            if delay <= 0:
+                due.append((-(slot.priority + slot.waiting), delay, slot))
+            elif wait is None or delay < wait:
+                wait = delay
+        due.sort(key=lambda item: (item[0], item[1]))
+        return [item[2] for item in due], wait
+
+    def run_frame(self, due: list | None = None) -> int:
+        """
+        采集一帧并执行所有到期且在预算内的模型
+
+        Args:
+            due (list, optional): 按执行顺序排列的到期模型，默认重新计算
+
+        Returns:
+            int: 执行的模型数量，-1表示采集失败
+        """
+        if due is None:
+            due, _ = self._due(utime.ticks_ms())
+        if not due:
+            return 0
+        img = self.pl.get_frame()
+        if img is None:
+            logging.warning("Unable to capture frame.", log_name=LOGNAME, every_ms=5000)
+            return -1
+        self.frames += 1
+        spent = 0
+        ran = 0
+        for slot in due:
+            if (
+                self.frame_budget_ms
+                and ran
+                and spent + slot.scheduler.latency_ema_ms > self.frame_budget_ms
+            ):
+                # 截止时间不变，下一帧仍然到期
+                slot.deferred += 1
+                slot.waiting += 1
+                continue
+            slot.waiting = 0
+            slot.scheduler.advance()
+            start = utime.ticks_ms()
+            try:
+                slot.pipeline.infer(img)
+            except Exception as e:
+                logging.error(
+                    "Error running model %s: %s", slot.name, e, log_name=LOGNAME, every_ms=1000
+                )
+            spent += utime.ticks_diff(utime.ticks_ms(), start)
+            slot.runs += 1
+            ran += 1
+        return ran
+
+    async def _inference_stage(self) -> None:
+        """
+        采集与推理阶段，休眠到最近的截止时间后执行到期的模型
+        """
+        while True:
+            due, wait = self._due(utime.ticks_ms())
+            if not due:
+                # 先利用空闲时间回收，回收后重新计算等待时间
+                if not self.gc_policy.on_idle(wait):
+                    await asyncio.sleep_ms(wait)
+                continue
+            try:
+                if self.run_frame(due) > 0:
+                    self.gc_policy.after_frame()
+            except Exception as e:
+                logging.error("Error running models: %s", e, log_name=LOGNAME, every_ms=1000)
+            # 让出给各模型的后处理和发布阶段
+            await asyncio.sleep_ms(0)
+
+    def start(self) -> list:
+        """
+        启动各模型流水线的后处理、发布阶段和共享的推理阶段
+
+        Returns:
+            list: 创建的任务列表
+        """
+        self._tasks = []
+        for i in range(len(self.slots)):
+            # MQTT发送、指标等共享任务只随第一个流水线启动一次
+            self._tasks.extend(self.slots[i].pipeline.start(inference=False, services=i == 0))
+        self._tasks.append(asyncio.create_task(self._inference_stage()))
+        return self._tasks
+
+    def stop(self) -> None:
+        for slot in self.slots:
+            slot.pipeline.stop()
+        for task in self._tasks:
+            task.cancel()
+        self._tasks = []
+
+    async def run(self) -> None:
+        """
+        启动所有模型并一直运行，直到被取消
+        """
+        tasks = self.start()
+        try:
+            await asyncio.gather(*tasks)
+        finally:
+            self.stop()
+
+    def stats(self) -> dict:
+        """
+        获取调度统计信息
+
+        Returns:
+            dict: 包含采集帧数，以及每个模型的执行次数、顺延次数、帧率和推理耗时
+        """
+        return {
+            "frames": self.frames,
+            "gc": self.gc_policy.stats(),
+            "models": {
+                slot.name: {
+                    "runs": slot.runs,
+                    "deferred": slot.deferred,
+                    "skipped": slot.scheduler.skipped,
+                    "fps": slot.scheduler.fps,
+                    "latency_ema_ms": slot.scheduler.latency_ema_ms,
+                }
+                for slot in self.slots
+            },
+        }
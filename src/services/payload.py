@@ -0,0 +1,204 @@
+import json
+import struct
+from src.services.tracker import EVENT_NAMES
+
+# MQTT消息体格式
+PAYLOAD_JSON = "json"  # 兼容旧版本：每个对象都带 label/confidence/bbox/fps 键
+PAYLOAD_JSON_COMPACT = "json_compact"  # 每个对象编码为数组，fps 只出现一次
+PAYLOAD_BINARY = "binary"  # 定长头 + 紧凑记录
+
+PAYLOAD_FORMATS = (PAYLOAD_JSON, PAYLOAD_JSON_COMPACT, PAYLOAD_BINARY)
+
+# 二进制格式（小端）
+# 头：magic(2s) version(B) flags(B) client_hash(I) timestamp(I) fps_centi(H) count(H)
+# 记录：label_id(H) confidence(H, 乘以 CONFIDENCE_SCALE) x(h) y(h) w(h) h(h)，坐标取整到像素
+# 事件记录（flags 含 FLAG_EVENTS 时）：在普通记录后追加 track_id(H) event(B)
+BINARY_MAGIC = b"KD"
+BINARY_VERSION = 1
+HEADER_FORMAT = "<2sBBIIHH"
+RECORD_FORMAT = "<HHhhhh"
+EVENT_RECORD_FORMAT = "<HHhhhhHB"
+HEADER_SIZE = struct.calcsize(HEADER_FORMAT)
+RECORD_SIZE = struct.calcsize(RECORD_FORMAT)
+EVENT_RECORD_SIZE = struct.calcsize(EVENT_RECORD_FORMAT)
+FLAG_EVENTS = 0x01  # 记录为跟踪事件
+FLAG_KEYFRAME = 0x02  # 关键帧，包含全部目标
+CONFIDENCE_SCALE = 10000
+FPS_SCALE = 100
+
+
+def client_id_hash(client_id: str) -> int:
+    """
+    计算客户端ID的32位 FNV-1a 哈希，设备端和主机端结果一致
+
+    参数：
+        client_id: 客户端ID
+    返回：
+        32位无符号整数
+    """
+    h = 0x811C9DC5
+    for b in client_id.encode():
+        h = ((h ^ b) * 0x01000193) & 0xFFFFFFFF
+    return h
+
+
+def _clamp_i16(value) -> int:
+    value = int(value)
+    if value > 32767:
+        return 32767
+    if value < -32768:
+        return -32768
+    return value
+
+
+class PayloadEncoder:
+    def __init__(
+        self, payload_format: str, client_id: str, capacity: int = 100, confidence_digits: int = 3
+    ):
+        """
+        检测结果消息体编码器
+
+        Args:
+            payload_format (str): "json"、"json_compact" 或 "binary"
+            client_id (str): 客户端ID
+            capacity (int): 单帧最多的检测框数量，用于预分配二进制缓冲区
+            confidence_digits (int): json_compact 格式中置信度保留的小数位数，
+                置信度来自 float32 数组，不舍入时会带上很长的尾数
+        """
+        if payload_format not in PAYLOAD_FORMATS:
+            raise ValueError(f"Unknown payload format: {payload_format}")
+        self.payload_format = payload_format
+        self.client_id = client_id
+        self.client_hash = client_id_hash(client_id)
+        self.capacity = capacity
+        self.confidence_digits = max(0, confidence_digits)
+        self._buf = None
+        if payload_format == PAYLOAD_BINARY:
+            # 事件缓冲区的容量是检测框的两倍，按最大的情况分配
+            self._buf = bytearray(HEADER_SIZE + capacity * 2 * EVENT_RECORD_SIZE)
+
+    def encode(self, detections, fps: float, timestamp: int = 0):
+        """
+        编码一帧检测结果
+
+        Args:
+            detections (DetectionBuffer | EventBuffer): 检测结果或跟踪事件缓冲区
+            fps (float): 推理FPS
+            timestamp (int): 设备时间戳（秒）
+
+        Returns:
+            str | bytes: JSON格式返回字符串，二进制格式返回字节串
+        """
+        if self.payload_format == PAYLOAD_BINARY:
+            return self.encode_binary(detections, fps, timestamp)
+        if self.payload_format == PAYLOAD_JSON_COMPACT:
+            return self.encode_json_compact(detections, fps, timestamp)
+        return self.encode_json(detections, fps)
+
+    def encode_json(self, detections, fps: float) -> str:
+        fps = float(fps)
+        labels = detections.labels
+        label_ids = detections.label_ids
+        confidences = detections.confidences
+        bboxes = detections.bboxes
+        events = getattr(detections, "events", None)
+        detection_data = []
+        for i in range(detections.count):
+            j = i * 4
+            obj = {
+                "label": labels[label_ids[i]],
+                "confidence": confidences[i],
+                "bbox": list(bboxes[j : j + 4]),
+                "fps": fps,
+            }
+            if events is not None:
+                obj["id"] = detections.track_ids[i]
+                obj["event"] = EVENT_NAMES[events[i]]
+            detection_data.append(obj)
+        message = {"data": detection_data, "client_id": self.client_id}
+        if events is not None:
+            message["keyframe"] = detections.keyframe
+        return json.dumps(message)
+
+    def encode_json_compact(self, detections, fps: float, timestamp: int) -> str:
+        labels = detections.labels
+        label_ids = detections.label_ids
+        confidences = detections.confidences
+        bboxes = detections.bboxes
+        events = getattr(detections, "events", None)
+        digits = self.confidence_digits
+        data = []
+        for i in range(detections.count):
+            j = i * 4
+            obj = [
+                labels[label_ids[i]],
+                round(confidences[i], digits),
+                int(bboxes[j]),
+                int(bboxes[j + 1]),
+                int(bboxes[j + 2]),
+                int(bboxes[j + 3]),
+            ]
+            if events is not None:
+                obj.append(detections.track_ids[i])
+                obj.append(EVENT_NAMES[events[i]])
+            data.append(obj)
+        message = {"c": self.client_id, "t": timestamp, "f": round(fps, 2), "d": data}
+        if events is not None:
+            message["k"] = detections.keyframe
+        return json.dumps(message)
+
+    def encode_binary(self, detections, fps: float, timestamp: int) -> bytes:
+        count = detections.count
+        events = getattr(detections, "events", None)
+        flags = 0
+        record_size = RECORD_SIZE
+        if events is not None:
+            flags = FLAG_EVENTS | (FLAG_KEYFRAME if detections.keyframe else 0)
+            record_size = EVENT_RECORD_SIZE
+        if count > (len(self._buf) - HEADER_SIZE) // record_size:
+            count = (len(self._buf) - HEADER_SIZE) // record_size
+        buf = self._buf
+        struct.pack_into(
+            HEADER_FORMAT,
+            buf,
+            0,
+            BINARY_MAGIC,
+            BINARY_VERSION,
+            flags,
+            self.client_hash,
+            int(timestamp) & 0xFFFFFFFF,
+            min(int(fps * FPS_SCALE), 0xFFFF),
+            count,
+        )
+        label_ids = detections.label_ids
+        confidences = detections.confidences
+        bboxes = detections.bboxes
+        offset = HEADER_SIZE
+        for i in range(count):
+            j = i * 4
+            confidence = min(int(confidences[i] * CONFIDENCE_SCALE), 0xFFFF)
+            x = _clamp_i16(bboxes[j])
+            y = _clamp_i16(bboxes[j + 1])
+            w = _clamp_i16(bboxes[j + 2])
+            h = _clamp_i16(bboxes[j + 3])
+            if events is None:
+                struct.pack_into(
+                    RECORD_FORMAT, buf, offset, label_ids[i], confidence, x, y, w, h
+                )
+            else:
+                struct.pack_into(
+                    EVENT_RECORD_FORMAT,
+                    buf,
+                    offset,
+                    label_ids[i],
+                    confidence,
+                    x,
+                    y,
+                    w,
+                    h,
+                    detections.track_ids[i],
+                    events[i],
+                )
+            offset += record_size
+        # 消息会在发布队列中停留，因此复制出独立的字节串
+        return bytes(memoryview(buf)[:offset])
@@ -0,0 +1,461 @@
+import json
+import utime
+import uasyncio as asyncio
+from src.services.utils import logging
+from src.services.yolo import run_inference
+from src.services.detections import DetectionPool
+from src.services.payload import PayloadEncoder, PAYLOAD_JSON
+from src.services.scheduler import FrameScheduler
+from src.services.gcpolicy import GCPolicy
+from src.services.tracker import IoUTracker
+from src.services.aggregate import WindowAggregator
+from src.services.filters import DetectionFilter
+from src.services.motion import MotionGate
+from src.services.snapshot import Snapshotter
+from src.services.metrics import REGISTRY, serve_metrics
+from src.services.ringbuffer import BoundedQueue, DROP_OLDEST
+
+LOGNAME = "pipeline"
+
+
+class DetectionPipeline:
+    def __init__(
+        self,
+        pl,
+        yolo,
+        yolo_config: dict,
+        mqtt_client=None,
+        topic: str = "",
+        client_id: str = "",
+        payload_format: str = PAYLOAD_JSON,
+        confidence_digits: int = 3,
+        config: dict | None = None,
+        gc_config: dict | None = None,
+        tracker_config: dict | None = None,
+        aggregate_config: dict | None = None,
+        metrics_config: dict | None = None,
+        filter_config: dict | None = None,
+        motion_config: dict | None = None,
+        snapshot_config: dict | None = None,
+        journal=None,
+        name: str = "",
+    ):
+        """
+        检测流水线：采集 → 推理 → 后处理 → 序列化 → 发布
+
+        各阶段运行在独立的协程中，通过有界队列连接，
+        MQTT发布变慢时不会阻塞推理节奏。
+
+        Args:
+            pl: PipeLine实例（或提供 get_frame 的替身对象）
+            yolo: YOLOv8实例（或提供 run 的替身对象）
+            yolo_config (dict): YOLO配置，需包含 labels 和 max_boxes_num，帧率相关键见 FrameScheduler
+            mqtt_client: MQTTPublish实例，None表示不发布
+            topic (str): 检测结果发布的主题
+            client_id (str): 客户端ID，写入消息体
+            payload_format (str): 消息体格式，见 PayloadEncoder
+            confidence_digits (int): json_compact 格式中置信度保留的小数位数，默认3
+            config (dict, optional): 流水线配置，包含以下键：
+                - queue_size: 每个队列的容量，默认4
+                - drop_policy: "drop_oldest" 或 "drop_newest"，默认"drop_oldest"
+                - stats_interval_ms: 统计日志输出间隔，0表示不输出，默认0
+            gc_config (dict, optional): 垃圾回收配置，见 GCPolicy
+            tracker_config (dict, optional): 跟踪配置，enabled为True时只发布变化事件，见 IoUTracker
+            aggregate_config (dict, optional): 聚合配置，enabled为True时按窗口发布摘要而不是逐帧结果，
+                摘要发布到 "<topic>/summary"，见 WindowAggregator；与跟踪同时开启时只聚合，
+                不创建跟踪器
+            metrics_config (dict, optional): 指标配置，包含以下键：
+                - enabled: 是否定期发布指标快照到 "<topic>/metrics"，默认False
+                - interval_ms: 发布间隔，默认10000
+                - http_port: 指标HTTP端口，0表示不启动，默认0
+            filter_config (dict, optional): 过滤配置，enabled为True时在推理之后按标签、面积和ROI
+                过滤原始结果，见 DetectionFilter
+            motion_config (dict, optional): 画面变化门控配置，enabled为True时画面没有变化的帧
+                跳过推理并复用上一次的结果，见 MotionGate
+            snapshot_config (dict, optional): 截图配置，enabled为True时推理结果满足触发条件时截图，
+                由后台任务上传到 "<topic>/snapshot" 或写入SD卡，见 Snapshotter
+            journal (Journal, optional): 断网期间的消息日志，MQTT未连接时消息写入日志，
+                恢复连接后限速重放，多个流水线共用同一个实例
+            name (str): 模型名称，多模型时作为本流水线指标名称的前缀（"<name>_inference_us" 等），
+                各模型的耗时和仪表分开统计
+        """
+        config = config or {}
+        self.pl = pl
+        self.yolo = yolo
+        self.labels = yolo_config["labels"]
+        self.mqtt_client = mqtt_client
+        self.topic = topic
+        self.client_id = client_id
+
+        queue_size = config.get("queue_size", 4)
+        policy = config.get("drop_policy", DROP_OLDEST)
+        self.infer_queue = BoundedQueue(queue_size, policy, "infer")
+        self.post_queue = BoundedQueue(queue_size, policy, "post")
+        self.out_queue = BoundedQueue(queue_size, policy, "out")
+        self.stats_interval_ms = config.get("stats_interval_ms", 0)
+        # 在途的检测结果最多为队列容量加上正在序列化的一个
+        max_boxes_num = yolo_config.get("max_boxes_num", 100)
+        self.detection_pool = DetectionPool(queue_size + 2, max_boxes_num, self.labels)
+        self.encoder = PayloadEncoder(payload_format, client_id, max_boxes_num, confidence_digits)
+        self.aggregator = None
+        if aggregate_config and aggregate_config.get("enabled", False):
+            self.aggregator = WindowAggregator(
+                aggregate_config, self.labels, max_boxes_num
+            )
+        self.summary_topic = f"{topic}/summary"
+        self.tracker = None
+        if tracker_config and tracker_config.get("enabled", False):
+            if self.aggregator is not None:
+                # 聚合摘要不包含跟踪事件，两者同时开启时跟踪不会生效
+                logging.warning(
+                    "tracker and aggregate are both enabled, tracker disabled", log_name=LOGNAME
+                )
+            else:
+                self.tracker = IoUTracker(
+                    tracker_config, max_boxes_num, self.labels, queue_size + 2
+                )
+        self.box_filter = None
+        if filter_config and filter_config.get("enabled", False):
+            self.box_filter = DetectionFilter(
+                filter_config, self.labels, yolo_config["rgb888p_size"]
+            )
+        prefix = f"{name}_" if name else ""
+        self.motion_gate = None
+        if motion_config and motion_config.get("enabled", False):
+            self.motion_gate = MotionGate(
+                motion_config, yolo_config["rgb888p_size"], metrics_prefix=prefix
+            )
+        self.journal = journal
+        self.snapshotter = None
+        if snapshot_config and snapshot_config.get("enabled", False):
+            self.snapshotter = Snapshotter(
+                snapshot_config,
+                self.labels,
+                yolo_config["rgb888p_size"],
+                mqtt_client=mqtt_client,
+                topic=topic,
+                metrics_prefix=prefix,
+            )
+        self.scheduler = FrameScheduler(yolo_config)
+        self.gc_policy = GCPolicy(gc_config)
+
+        metrics_config = metrics_config or {}
+        self.metrics_enabled = metrics_config.get("enabled", False)
+        self.metrics_interval_ms = metrics_config.get("interval_ms", 10000)
+        self.metrics_http_port = metrics_config.get("http_port", 0)
+        self.metrics_topic = f"{topic}/metrics"
+        self.metrics = REGISTRY
+        self.metrics_prefix = prefix
+        self._capture_hist = REGISTRY.histogram(f"{prefix}capture_us")
+        self._inference_hist = REGISTRY.histogram(f"{prefix}inference_us")
+        self._filter_hist = REGISTRY.histogram(f"{prefix}filter_us")
+        self._motion_hist = REGISTRY.histogram(f"{prefix}motion_us")
+        self._postprocess_hist = REGISTRY.histogram(f"{prefix}postprocess_us")
+        self._encode_hist = REGISTRY.histogram(f"{prefix}encode_us")
+        self._publish_hist = REGISTRY.histogram(f"{prefix}publish_us")
+        self._capture_failures = REGISTRY.counter(f"{prefix}capture_failures")
+        self._publish_journaled = REGISTRY.counter(f"{prefix}publish_journaled")
+        self._publish_skipped = REGISTRY.counter(f"{prefix}publish_skipped")
+        # 同一个对象用于注册和移除
+        self._collector = self.update_gauges
+
+        self.frames_captured = 0
+        self.frames_published = 0
+        self.fps = 0
+        self._start_ms = utime.ticks_ms()
+        self._tasks = []
+        self.running = False
+
+    def _capture_and_infer(self) -> bool:
+        """
+        采集一帧并执行推理，结果放入推理队列
+
+        Returns:
+            bool: True表示成功处理一帧
+        """
+        start = utime.ticks_us()
+        img = self.pl.get_frame()
+        self._capture_hist.time_since(start)
+        if img is None:
+            self._capture_failures.inc()
+            logging.warning("Unable to capture frame.", log_name=LOGNAME, every_ms=5000)
+            return False
+        self.infer(img)
+        return True
+
+    def infer(self, img) -> None:
+        """
+        对一帧图像执行推理，结果经过过滤后放入推理队列；
+        开启画面变化门控且画面没有变化时跳过推理，复用上一次的结果
+
+        多模型调度时由 ModelScheduler 用共享的帧直接调用
+
+        Args:
+            img: PipeLine.get_frame() 返回的图像
+        """
+        gate = self.motion_gate
+        if gate is not None:
+            start = utime.ticks_us()
+            run = gate.check(img)
+            self._motion_hist.time_since(start)
+            if not run:
+                # 画面没有变化，复用上一次的结果
+                self.frames_captured += 1
+                self.infer_queue.put_nowait((utime.ticks_ms(), gate.fps, gate.result))
+                return
+        start = utime.ticks_us()
+        result, self.fps = run_inference(self.yolo, img)
+        self.scheduler.record_latency(self._inference_hist.time_since(start) / 1000)
+        if self.box_filter is not None and len(result):
+            start = utime.ticks_us()
+            result = self.box_filter.apply(result)
+            self._filter_hist.time_since(start)
+        if gate is not None:
+            gate.remember(result, self.fps)
+        if self.snapshotter is not None:
+            # 只复制触发的帧，编码和上传由后台任务完成
+            self.snapshotter.observe(img, result, utime.time())
+        self.frames_captured += 1
+        self.infer_queue.put_nowait((utime.ticks_ms(), self.fps, result))
+
+    async def _inference_stage(self) -> None:
+        """
+        采集与推理阶段，由帧调度器决定每一帧的处理时刻
+        """
+        while self.running:
+            self.gc_policy.on_idle(self.scheduler.slack_ms())
+            await self.scheduler.wait_next()
+            try:
+                if self._capture_and_infer():
+                    self.gc_policy.after_frame()
+            except Exception as e:
+                logging.error(
+                    "Error running inference: %s", e, log_name=LOGNAME, every_ms=1000
+                )
+
+    async def _postprocess_stage(self) -> None:
+        """
+        后处理阶段，将原始结果写入复用的检测结果缓冲区，
+        开启聚合时累计到窗口中，开启跟踪时转换为变化事件
+        """
+        while self.running:
+            timestamp, fps, result = await self.infer_queue.get()
+            # 开启跟踪或聚合时空帧也要处理，以便发现目标消失、统计空帧
+            if len(result) == 0 and self.tracker is None and self.aggregator is None:
+                continue
+            start = utime.ticks_us()
+            try:
+                detections = self.detection_pool.acquire()
+                detections.fill(result)
+                if self.aggregator is not None:
+                    # 聚合模式只在窗口结束时输出摘要
+                    detections = self.aggregator.add(detections, utime.time())
+                    if detections is None:
+                        continue
+                elif self.tracker is not None:
+                    detections = self.tracker.update(detections)
+                    if detections.count == 0 and not detections.keyframe:
+                        continue
+            except Exception as e:
+                logging.error(
+                    "Error parsing result: %s", e, log_name=LOGNAME, every_ms=1000
+                )
+                continue
+            finally:
+                self._postprocess_hist.time_since(start)
+            self.post_queue.put_nowait((timestamp, fps, detections))
+
+    async def _serialize_stage(self) -> None:
+        """
+        序列化阶段，将检测结果编码为MQTT消息体
+        """
+        while self.running:
+            timestamp, fps, detections = await self.post_queue.get()
+            start = utime.ticks_us()
+            try:
+                if isinstance(detections, dict):
+                    # 窗口摘要
+                    detections["client_id"] = self.client_id
+                    topic = self.summary_topic
+                    payload = json.dumps(detections)
+                else:
+                    topic = self.topic
+                    payload = self.encoder.encode(detections, fps, utime.time())
+                self._encode_hist.time_since(start)
+                self.out_queue.put_nowait((timestamp, topic, payload))
+            except Exception as e:
+                logging.error(
+                    "Error serializing detections: %s", e, log_name=LOGNAME, every_ms=1000
+                )
+            await asyncio.sleep_ms(0)
+
+    async def _publish_stage(self) -> None:
+        """
+        发布阶段，在后台逐条发送消息
+        """
+        while self.running:
+            timestamp, topic, payload = await self.out_queue.get()
+            start = utime.ticks_us()
+            mqtt_client = self.mqtt_client
+            if mqtt_client and mqtt_client.async_publish and (
+                mqtt_client.is_connected or self.journal is None
+            ):
+                # 异步模式：交给MQTT发送队列，断线期间由其缓存并在重连后重放
+                # 逐帧检测结果允许合并，聚合摘要单独发送
+                mqtt_client.enqueue(topic, payload, topic == self.topic)
+                self.frames_published += 1
+            elif mqtt_client and mqtt_client.is_connected and mqtt_client.publish(topic, payload):
+                self.frames_published += 1
+            elif self.journal is not None:
+                # 断线期间写入SD卡上的日志，恢复连接后重放
+                self.journal.append(topic, payload)
+                self._publish_journaled.inc()
+            else:
+                self._publish_skipped.inc()
+                logging.warning("MQTT client not connected", log_name=LOGNAME, every_ms=5000)
+            self._publish_hist.time_since(start)
+            await asyncio.sleep_ms(0)
+
+    async def _stats_stage(self) -> None:
+        """
+        定期输出流水线统计信息
+        """
+        while self.running:
+            await asyncio.sleep_ms(self.stats_interval_ms)
+            logging(f"Pipeline stats: {self.stats()}", log_name=LOGNAME)
+
+    def update_gauges(self) -> None:
+        """
+        将流水线各组件的当前状态写入指标仪表，流水线运行期间在每次生成快照前调用；
+        本流水线的仪表带有名称前缀，共用的MQTT客户端的仪表不带前缀
+        """
+        metrics = self.metrics
+        prefix = self.metrics_prefix
+        metrics.gauge(f"{prefix}frames_captured").set(self.frames_captured)
+        metrics.gauge(f"{prefix}frames_published").set(self.frames_published)
+        metrics.gauge(f"{prefix}infer_fps").set(self.fps)
+        metrics.gauge(f"{prefix}target_fps").set(self.scheduler.fps)
+        metrics.gauge(f"{prefix}frames_skipped").set(self.scheduler.skipped)
+        metrics.gauge(f"{prefix}lateness_max_ms").set(self.scheduler.lateness_max_ms)
+        for queue in (self.infer_queue, self.post_queue, self.out_queue):
+            metrics.gauge(f"{prefix}queue_{queue.name}_depth").set(len(queue))
+            metrics.gauge(f"{prefix}queue_{queue.name}_dropped").set(queue.dropped)
+        metrics.gauge(f"{prefix}gc_free").set(self.gc_policy.last_free)
+        if self.tracker is not None:
+            metrics.gauge(f"{prefix}tracker_events_dropped").set(self.tracker.events_dropped)
+        if self.mqtt_client:
+            mqtt_stats = self.mqtt_client.stats()
+            metrics.gauge("mqtt_connected").set(1 if mqtt_stats["connected"] else 0)
+            metrics.gauge("mqtt_depth").set(mqtt_stats["depth"])
+            metrics.gauge("mqtt_dropped").set(mqtt_stats["dropped"])
+
+    async def _metrics_stage(self) -> None:
+        """
+        定期把指标快照发布到 "<topic>/metrics"
+
+        快照不经过检测结果的发送队列，直接发布，不会挤掉尚未发送的检测结果；
+        MQTT未连接时跳过本次快照，不写入日志
+        """
+        while self.running:
+            await asyncio.sleep_ms(self.metrics_interval_ms)
+            mqtt_client = self.mqtt_client
+            if not mqtt_client or not mqtt_client.is_connected:
+                continue
+            snapshot = self.metrics.snapshot()
+            snapshot["client_id"] = self.client_id
+            mqtt_client.publish(self.metrics_topic, json.dumps(snapshot))
+
+    async def _replay_stage(self) -> None:
+        """
+        恢复连接后重放日志中的消息
+        """
+        await self.journal.run_replayer(self.mqtt_client)
+
+    async def _metrics_http_stage(self) -> None:
+        """
+        启动指标HTTP服务
+        """
+        await serve_metrics(self.metrics, self.metrics_http_port)
+
+    def stats(self) -> dict:
+        """
+        获取流水线统计信息
+
+        Returns:
+            dict: 包含处理帧数、发布帧数、端到端吞吐量和各队列的统计信息
+        """
+        elapsed_ms = utime.ticks_diff(utime.ticks_ms(), self._start_ms)
+        throughput = self.frames_captured * 1000 / elapsed_ms if elapsed_ms > 0 else 0
+        return {
+            "captured": self.frames_captured,
+            "published": self.frames_published,
+            "throughput": throughput,
+            "infer_fps": self.fps,
+            "scheduler": self.scheduler.stats(),
+            "gc": self.gc_policy.stats(),
+            "infer": self.infer_queue.stats(),
+            "post": self.post_queue.stats(),
+            "out": self.out_queue.stats(),
+            "mqtt": self.mqtt_client.stats() if self.mqtt_client else None,
+            "tracker": self.tracker.stats() if self.tracker else None,
+            "filter": self.box_filter.stats() if self.box_filter else None,
+            "motion": self.motion_gate.stats() if self.motion_gate else None,
+            "snapshot": self.snapshotter.stats() if self.snapshotter else None,
+            "journal": self.journal.stats() if self.journal else None,
+        }
+
+    def start(self, inference: bool = True, services: bool = True) -> list:
+        """
+        启动流水线各阶段的协程
+
+        Args:
+            inference (bool): 是否启动采集与推理阶段，多模型调度时由 ModelScheduler 负责推理
+            services (bool): 是否启动MQTT发送、统计和指标等共享任务，多个流水线共用时只需启动一次
+
+        Returns:
+            list: 创建的任务列表
+        """
+        self.running = True
+        self._start_ms = utime.ticks_ms()
+        # 共享的指标任务只随一个流水线启动，每个流水线的仪表都在生成快照前刷新
+        self.metrics.add_collector(self._collector)
+        stages = [self._postprocess_stage, self._serialize_stage, self._publish_stage]
+        if inference:
+            stages.append(self._inference_stage)
+        if self.snapshotter is not None:
+            stages.append(self.snapshotter.run_uploader)
+        if services:
+            if self.mqtt_client and self.mqtt_client.async_publish:
+                stages.append(self.mqtt_client.run_publisher)
+            if self.metrics_enabled:
+                stages.append(self._metrics_stage)
+            if self.metrics_http_port:
+                stages.append(self._metrics_http_stage)
+            if self.journal is not None:
+                stages.append(self.journal.run_flusher)
+                if self.mqtt_client:
+                    stages.append(self._replay_stage)
+        if self.stats_interval_ms > 0:
+            stages.append(self._stats_stage)
+        self._tasks = [asyncio.create_task(stage()) for stage in stages]
+        return self._tasks
+
+    def stop(self) -> None:
+        """
+        停止流水线并取消所有阶段的协程
+        """
+        self.running = False
+        self.metrics.remove_collector(self._collector)
+        for task in self._tasks:
+            task.cancel()
+        self._tasks = []
+
+    async def run(self) -> None:
+        """
+        启动流水线并一直运行，直到被取消
+        """
+        tasks = self.start()
+        try:
+            await asyncio.gather(*tasks)
+        finally:
+            self.stop()
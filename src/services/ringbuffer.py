@@ -0,0 +1,119 @@
+import uasyncio as asyncio
+
+# 队列满时的丢弃策略
+DROP_OLDEST = "drop_oldest"
+DROP_NEWEST = "drop_newest"
+
+
+class BoundedQueue:
+    def __init__(self, maxsize: int = 4, policy: str = DROP_OLDEST, name: str = "queue"):
+        """
+        有界环形队列，满时按策略丢弃元素，不会阻塞生产者
+
+        Args:
+            maxsize (int): 队列容量
+            policy (str): 队列满时的策略，"drop_oldest" 丢弃最旧的元素，"drop_newest" 丢弃新元素
+            name (str): 队列名称，用于统计输出
+        """
+        if policy not in (DROP_OLDEST, DROP_NEWEST):
+            raise ValueError(f"Unknown drop policy: {policy}")
+        self.name = name
+        self.maxsize = max(1, maxsize)
+        self.policy = policy
+        self._buf = [None] * self.maxsize
+        self._head = 0
+        self._count = 0
+        self._event = asyncio.Event()
+
+        # 统计信息
+        self.put_count = 0
+        self.dropped = 0
+        self.max_depth = 0
+
+    def __len__(self) -> int:
+        return self._count
+
+    def put_nowait(self, item) -> bool:
+        """
+        放入一个元素，不会阻塞生产者
+
+        Args:
+            item: 要放入的元素
+
+        Returns:
+            bool: True表示元素已入队，False表示元素被丢弃
+        """
+        self.put_count += 1
+        if self._count == self.maxsize:
+            self.dropped += 1
+            if self.policy == DROP_NEWEST:
+                return False
+            # 覆盖最旧的元素
+            self._buf[self._head] = None
+            self._head = (self._head + 1) % self.maxsize
+            self._count -= 1
+
+        self._buf[(self._head + self._count) % self.maxsize] = item
+        self._count += 1
+        if self._count > self.max_depth:
+            self.max_depth = self._count
+        self._event.set()
+        return True
+
+    def peek(self):
+        """
+        查看最旧的元素但不取出
+
+        Returns:
+            队首元素，队列为空时返回 None
+        """
+        if self._count == 0:
+            return None
+        return self._buf[self._head]
+
+    def get_nowait(self):
+        """
+        取出最旧的元素
+
+        Returns:
+            队首元素，队列为空时返回 None
+        """
+        if self._count == 0:
+            return None
+        item = self._buf[self._head]
+        self._buf[self._head] = None
+        self._head = (self._head + 1) % self.maxsize
+        self._count -= 1
+        return item
+
+    async def wait_not_empty(self) -> None:
+        """
+        等待队列中至少有一个元素
+        """
+        while self._count == 0:
+            self._event.clear()
+            await self._event.wait()
+
+    async def get(self):
+        """
+        异步取出最旧的元素，队列为空时等待
+
+        Returns:
+            队首元素
+        """
+        await self.wait_not_empty()
+        return self.get_nowait()
+
+    def stats(self) -> dict:
+        """
+        获取队列统计信息
+
+        Returns:
+            dict: 包含当前深度、最大深度、入队次数和丢弃次数
+        """
+        return {
+            "depth": self._count,
+            "max_depth": self.max_depth,
+            "put": self.put_count,
+            "dropped": self.dropped,
+        }
@@ -0,0 +1,191 @@
+import utime
+import uasyncio as asyncio
+from src.services.utils import logging
+
+LOGNAME = "scheduler"
+
+
+class FrameScheduler:
+    def __init__(self, config: dict):
+        """
+        基于截止时间的帧调度器
+
+        按目标帧率计算每一帧的截止时间并精确休眠到该时刻；
+        过载时跳过已经错过的帧，不会累积积压；
+        可选地根据测得的推理耗时自动调整帧率。
+
+        Args:
+            config (dict): YOLO配置字典，使用以下键：
+                - target_fps: 目标帧率，默认1
+                - adaptive_fps: 是否根据推理耗时自动调整帧率，默认False
+                - min_fps: 自动调整时的最低帧率，默认0.2
+                - max_fps: 自动调整时的最高帧率，默认等于target_fps
+                - fps_headroom: 推理耗时允许占用帧周期的比例，默认0.8
+        """
+        self.target_fps = config.get("target_fps", 1)
+        if self.target_fps <= 0:
+            raise ValueError(f"Invalid target_fps: {self.target_fps}")
+        self.adaptive = config.get("adaptive_fps", False)
+        self.min_fps = config.get("min_fps", 0.2)
+        self.max_fps = config.get("max_fps", self.target_fps)
+        self.headroom = config.get("fps_headroom", 0.8)
+
+        self.fps = self.target_fps
+        self.period_ms = int(1000 / self.fps)
+        self._deadline = None
+        self._latency_ema = 0.0
+
+        # 统计信息
+        self.frames = 0
+        self.skipped = 0
+        self.late_frames = 0
+        self.lateness_total_ms = 0
+        self.lateness_max_ms = 0
+        self.last_lateness_ms = 0
+
+    def set_fps(self, fps: float) -> None:
+        """
+        修改当前帧率，从下一帧开始生效
+
+        Args:
+            fps (float): 新的帧率
+        """
+        if fps <= 0:
+            raise ValueError(f"Invalid fps: {fps}")
+        self.fps = fps
+        self.period_ms = int(1000 / fps)
+
+    def set_target_fps(self, fps: float) -> None:
+        """
+        修改目标帧率，自动调整时同时作为帧率上限
+
+        Args:
+            fps (float): 新的目标帧率
+        """
+        if fps <= 0:
+            raise ValueError(f"Invalid target_fps: {fps}")
+        self.target_fps = fps
+        if self.adaptive:
+            self.max_fps = fps
+            if self.fps > fps:
+                self.set_fps(fps)
+        else:
+            self.set_fps(fps)
+
+    def slack_ms(self) -> int:
+        """
+        获取距离下一帧截止时间的剩余毫秒数
+
+        Returns:
+            int: 剩余时间，已经到期或尚未开始调度时返回0
+        """
+        if self._deadline is None:
+            return 0
+        slack = utime.ticks_diff(self._deadline, utime.ticks_ms())
+        return slack if slack > 0 else 0
+
+    def due_in_ms(self, now: int) -> int:
+        """
+        获取距离下一帧截止时间的毫秒数，可为负数，供多个调度器共用一个循环时使用
+
+        Args:
+            now (int): utime.ticks_ms() 的当前值
+
+        Returns:
+            int: 小于等于0表示本帧已经到期
+        """
+        if self._deadline is None:
+            self._deadline = now
+        return utime.ticks_diff(self._deadline, now)
+
+    def advance(self) -> int:
+        """
+        本帧开始处理时调用，记录延迟并计算下一帧的截止时间
+
+        Returns:
+            int: 本帧相对截止时间的延迟（毫秒）
+        """
+        lateness = utime.ticks_diff(utime.ticks_ms(), self._deadline)
+        if lateness < 0:
+            lateness = 0
+
+        # 过载时跳过已经错过的帧，截止时间对齐到下一个周期
+        missed = lateness // self.period_ms
+        if missed:
+            self.skipped += missed
+            self._deadline = utime.ticks_add(self._deadline, missed * self.period_ms)
+        self._deadline = utime.ticks_add(self._deadline, self.period_ms)
+
+        self.frames += 1
+        self.last_lateness_ms = lateness
+        self.lateness_total_ms += lateness
+        if lateness > 0:
+            self.late_frames += 1
+        if lateness > self.lateness_max_ms:
+            self.lateness_max_ms = lateness
+        return lateness
+
+    async def wait_next(self) -> int:
+        """
+        休眠到下一帧的截止时间
+
+        Returns:
+            int: 本帧相对截止时间的延迟（毫秒）
+        """
+        delay = self.due_in_ms(utime.ticks_ms())
+        if delay > 0:
+            await asyncio.sleep_ms(delay)
+        else:
+            # 即使已经迟到也让出一次，保证其他阶段能够运行
+            await asyncio.sleep_ms(0)
+        return self.advance()
+
+    def record_latency(self, latency_ms: float) -> None:
+        """
+        记录一帧的推理耗时，开启自动调整时据此修改帧率
+
+        Args:
+            latency_ms (float): yolo.run 的耗时（毫秒）
+        """
+        if self._latency_ema == 0:
+            self._latency_ema = latency_ms
+        else:
+            self._latency_ema = self._latency_ema * 0.8 + latency_ms * 0.2
+
+        if not self.adaptive or self._latency_ema <= 0:
+            return
+
+        fps = self.headroom * 1000 / self._latency_ema
+        if fps > self.max_fps:
+            fps = self.max_fps
+        elif fps < self.min_fps:
+            fps = self.min_fps
+
+        # 变化超过10%才调整，避免帧率来回抖动
+        if abs(fps - self.fps) > self.fps * 0.1:
+            logging(f"Adjust fps {self.fps:.2f} -> {fps:.2f}", log_name=LOGNAME)
+            self.set_fps(fps)
+
+    @property
+    def latency_ema_ms(self) -> float:
+        """最近推理耗时的指数移动平均（毫秒）"""
+        return self._latency_ema
+
+    def stats(self) -> dict:
+        """
+        获取调度统计信息
+
+        Returns:
+            dict: 包含当前帧率、已调度帧数、跳过帧数和迟到统计
+        """
+        return {
+            "fps": self.fps,
+            "frames": self.frames,
+            "skipped": self.skipped,
+            "late": self.late_frames,
+            "lateness_avg_ms": (
+                self.lateness_total_ms / self.frames if self.frames else 0
+            ),
+            "lateness_max_ms": self.lateness_max_ms,
+            "latency_ema_ms": self._latency_ema,
+        }
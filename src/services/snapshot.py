@@ -0,0 +1,418 @@
+import os
+import json
+import struct
+import utime
+import uasyncio as asyncio
+from src.services.utils import logging
+from src.services.metrics import REGISTRY
+
+LOGNAME = "snapshot"
+
+# 上传方式
+UPLOAD_MQTT = "mqtt"  # 分块发布到 "<topic>/snapshot"
+UPLOAD_SDCARD = "sdcard"  # 写入目录并按文件数量轮转
+
+# MQTT分块头：snapshot_id(I) chunk_index(H) chunk_count(H) data_length(H)，其后为JPEG数据；
+# 带有数据长度，多个分块首尾相接时接收端也能拆开
+CHUNK_HEADER_FORMAT = "<IHHH"
+CHUNK_HEADER_SIZE = struct.calcsize(CHUNK_HEADER_FORMAT)
+
+
+def encode_jpeg(img, frame_size: list, roi=None, quality: int = 80) -> bytes:
+    """
+    将 pl.get_frame() 返回的 CHW 图像（或其中的一个区域）编码为JPEG
+
+    参数：
+        img: CHW 排列的 RGB888P 图像（ulab ndarray）
+        frame_size: 图像大小 [宽, 高]
+        roi: 可选的裁剪区域 (x, y, w, h)
+        quality: JPEG质量
+    返回：
+        JPEG数据
+    """
+    import image  # 只在真正需要截图时加载
+
+    frame = image.Image(
+        frame_size[0], frame_size[1], image.RGBP888, alloc=image.ALLOC_REF, data=img
+    )
+    frame = frame.to_rgb888()
+    if roi is not None:
+        frame = frame.crop(roi=roi)
+    return bytes(frame.compress(quality=quality).bytearray())
+
+
+class SnapshotBuffer:
+    def __init__(self, max_items: int = 8, max_bytes: int = 262144):
+        """
+        有界的截图缓冲区，按条数和总字节数限制，超出时淘汰最久未使用的截图
+
+        Args:
+            max_items (int): 最多保存的截图数量
+            max_bytes (int): 所有截图的总字节数上限
+        """
+        self.max_items = max(1, max_items)
+        self.max_bytes = max_bytes
+        self._entries = []  # 按使用时间排序，最久未使用的在前
+        self.bytes = 0
+
+        # 统计信息
+        self.added = 0
+        self.evicted = 0
+        self.evicted_pending = 0  # 尚未上传就被淘汰的截图
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def put(self, entry: dict) -> bool:
+        """
+        放入一张截图
+
+        Args:
+            entry (dict): 截图，包含 id、data 和元信息
+
+        Returns:
+            bool: False表示截图本身超过了总字节数上限
+        """
+        size = len(entry["data"])
+        if size > self.max_bytes:
+            return False
+        while self._entries and (
+            len(self._entries) >= self.max_items or self.bytes + size > self.max_bytes
+        ):
+            old = self._entries.pop(0)
+            self.bytes -= len(old["data"])
+            self.evicted += 1
+            if not old["uploaded"]:
+                self.evicted_pending += 1
+        self._entries.append(entry)
+        self.bytes += size
+        self.added += 1
+        return True
+
+    def get(self, snapshot_id: int):
+        """
+        按ID获取截图，并标记为最近使用
+
+        Returns:
+            dict | None: 截图，不存在时返回None
+        """
+        for i in range(len(self._entries)):
+            entry = self._entries[i]
+            if entry["id"] == snapshot_id:
+                self._entries.append(self._entries.pop(i))
+                return entry
+        return None
+
+    def next_pending(self):
+        """
+        获取最早的尚未上传的截图
+
+        Returns:
+            dict | None: 截图，没有待上传的截图时返回None
+        """
+        for entry in self._entries:
+            if not entry["uploaded"]:
+                return entry
+        return None
+
+
+class Snapshotter:
+    def __init__(
+        self,
+        config: dict,
+        labels: list,
+        frame_size: list,
+        mqtt_client=None,
+        topic: str = "",
+        encoder=encode_jpeg,
+        metrics_prefix: str = "",
+    ):
+        """
+        事件触发的截图：推理结果满足触发条件时复制当前帧，由低优先级的后台任务
+        编码为JPEG放入缓冲区并上传，推理循环不会等待编码和上传
+
+        Args:
+            config (dict): 截图配置，包含以下键：
+                - triggers: 触发条件列表，每项为 {"label": "person"}（该标签出现）、
+                  {"label": "car", "min_count": 3}（该标签数量达到N）或
+                  {"min_count": 10}（总数达到N）；条件从不满足变为满足时触发一次
+                - cooldown_ms: 两次截图的最小间隔，默认5000
+                - crop: 是否只保存触发标签的检测框区域，默认False（保存整帧）
+                - max_crops: 裁剪模式下每次最多保存的框数，默认4
+                - quality: JPEG质量，默认80
+                - buffer_items: 缓冲区最多保存的截图数量，默认8
+                - buffer_bytes: 缓冲区总字节数上限，默认262144
+                - upload: "mqtt" 或 "sdcard"，默认"mqtt"
+                - chunk_size: MQTT分块大小，默认4096，最大65535
+                - chunk_interval_ms: 两个分块之间的间隔，默认50
+                - directory: sdcard模式下的保存目录，默认"/sdcard/snapshots"
+                - max_files: sdcard模式下最多保留的文件数，默认100
+            labels (list): 标签名称列表
+            frame_size (list): 图像大小 [宽, 高]，即 rgb888p_size
+            mqtt_client: MQTTPublish实例，mqtt模式下使用
+            topic (str): 检测结果主题，截图发布到 "<topic>/snapshot"
+            encoder (callable): JPEG编码函数，签名同 encode_jpeg，主机上测试时可替换
+            metrics_prefix (str): 指标名称前缀，多个模型各自截图时区分指标
+        """
+        self.labels = labels
+        self.frame_size = frame_size
+        self.mqtt_client = mqtt_client
+        self.topic = f"{topic}/snapshot"
+        self.meta_topic = f"{topic}/snapshot/meta"
+        self.encoder = encoder
+
+        self.triggers = []
+        for trigger in config.get("triggers", []):
+            label = trigger.get("label")
+            if label is not None and label not in labels:
+                raise ValueError(f"Unknown label in snapshot trigger: {label}")
+            label_id = labels.index(label) if label is not None else -1
+            # [标签ID（-1表示总数）, 数量阈值, 上一帧是否满足]
+            self.triggers.append([label_id, trigger.get("min_count", 1), False])
+        self._counts = [0] * len(labels)
+
+        self.cooldown_ms = config.get("cooldown_ms", 5000)
+        self.crop = config.get("crop", False)
+        self.max_crops = config.get("max_crops", 4)
+        self.quality = config.get("quality", 80)
+        self.buffer = SnapshotBuffer(
+            config.get("buffer_items", 8), config.get("buffer_bytes", 262144)
+        )
+
+        self.upload = config.get("upload", UPLOAD_MQTT)
+        if self.upload not in (UPLOAD_MQTT, UPLOAD_SDCARD):
+            raise ValueError(f"Unknown snapshot upload: {self.upload}")
+        self.chunk_size = min(max(1, config.get("chunk_size", 4096)), 0xFFFF)
+        self.chunk_interval_ms = config.get("chunk_interval_ms", 50)
+        self.directory = config.get("directory", "/sdcard/snapshots")
+        self.max_files = config.get("max_files", 100)
+        self._files = None  # sdcard模式下已写入的文件，按时间排序
+
+        self._next_id = 1
+        self._last_ms = None
+        self._pending = None  # 等待编码的 (帧副本, 裁剪区域, 标签, 数量, 时间戳)
+        self._event = asyncio.Event()
+
+        # 统计信息
+        self.triggered = 0
+        self.skipped = 0  # 上一帧尚未编码时跳过的触发
+        self.uploaded = 0
+        self.failed = 0
+        self._encode_hist = REGISTRY.histogram(f"{metrics_prefix}snapshot_encode_us")
+
+    def _fired(self, result) -> int:
+        """
+        统计本帧各标签数量并检查触发条件
+
+        Returns:
+            int: 触发的标签ID，-1表示按总数触发，-2表示没有触发
+        """
+        counts = self._counts
+        for i in range(len(counts)):
+            counts[i] = 0
+        total = 0
+        for box in result:
+            label_id = int(box[5])
+            if label_id < len(counts):
+                counts[label_id] += 1
+            total += 1
+
+        fired = -2
+        for trigger in self.triggers:
+            label_id = trigger[0]
+            count = total if label_id < 0 else counts[label_id]
+            active = count >= trigger[1]
+            if active and not trigger[2] and fired == -2:
+                fired = label_id
+            trigger[2] = active
+        return fired
+
+    def observe(self, img, result, timestamp: int = 0) -> bool:
+        """
+        检查一帧的推理结果，满足触发条件时截图
+
+        Args:
+            img: pl.get_frame() 返回的图像
+            result: yolo.run 的结果（经过过滤）
+            timestamp (int): 本帧的时间戳
+
+        Returns:
+            bool: True表示已复制本帧，等待后台任务编码
+        """
+        fired = self._fired(result)
+        if fired == -2:
+            return False
+        now = utime.ticks_ms()
+        if self._last_ms is not None and utime.ticks_diff(now, self._last_ms) < self.cooldown_ms:
+            return False
+        self._last_ms = now
+        self.triggered += 1
+
+        label = self.labels[fired] if fired >= 0 else None
+        rois = self._rois(result, fired) if self.crop else [None]
+        if not rois:
+            return False
+        if self._pending is not None:
+            # 上一次触发的帧尚未编码，只保留一帧的副本
+            self.skipped += 1
+            return False
+        try:
+            # pl.get_frame() 的缓冲区会被下一帧复用，先复制再由后台任务编码
+            frame = img.copy()
+        except Exception as e:
+            logging.error("Error copying snapshot frame: %s", e, log_name=LOGNAME, every_ms=5000)
+            return False
+        self._pending = (frame, rois, label, len(result), timestamp)
+        self._event.set()
+        return True
+
+    def _rois(self, result, fired: int) -> list:
+        """
+        获取触发标签的检测框，裁剪到图像范围内，去掉裁剪后为空的框
+
+        Returns:
+            list: (x, y, w, h) 元组列表，最多 max_crops 个
+        """
+        width, height = self.frame_size[0], self.frame_size[1]
+        rois = []
+        for box in result:
+            if fired >= 0 and int(box[5]) != fired:
+                continue
+            x0 = max(0, int(box[0]))
+            y0 = max(0, int(box[1]))
+            x1 = min(width, int(box[0]) + int(box[2]))
+            y1 = min(height, int(box[1]) + int(box[3]))
+            if x1 <= x0 or y1 <= y0:
+                continue
+            rois.append((x0, y0, x1 - x0, y1 - y0))
+            if len(rois) >= self.max_crops:
+                break
+        return rois
+
+    def _encode_pending(self) -> None:
+        """
+        把等待编码的帧编码为JPEG放入缓冲区，由后台任务调用
+        """
+        frame, rois, label, count, timestamp = self._pending
+        self._pending = None
+        start = utime.ticks_us()
+        try:
+            for roi in rois:
+                data = self.encoder(frame, self.frame_size, roi, self.quality)
+                entry = {
+                    "id": self._next_id,
+                    "ts": timestamp,
+                    "label": label,
+                    "count": count,
+                    "roi": roi,
+                    "data": data,
+                    "uploaded": False,
+                }
+                self._next_id = self._next_id % 0xFFFFFFFF + 1
+                self.buffer.put(entry)
+        except Exception as e:
+            logging.error("Error encoding snapshot: %s", e, log_name=LOGNAME, every_ms=5000)
+        finally:
+            self._encode_hist.time_since(start)
+
+    def _publish(self, topic: str, payload) -> bool:
+        if self.mqtt_client is None:
+            return False
+        if self.mqtt_client.async_publish:
+            return self.mqtt_client.enqueue(topic, payload)
+        if not self.mqtt_client.is_connected:
+            return False
+        return self.mqtt_client.publish(topic, payload)
+
+    async def _upload_mqtt(self, entry: dict) -> bool:
+        data = entry["data"]
+        chunks = (len(data) + self.chunk_size - 1) // self.chunk_size
+        meta = {
+            "id": entry["id"],
+            "ts": entry["ts"],
+            "label": entry["label"],
+            "count": entry["count"],
+            "roi": entry["roi"],
+            "size": len(data),
+            "chunks": chunks,
+        }
+        if not self._publish(self.meta_topic, json.dumps(meta)):
+            return False
+        view = memoryview(data)
+        for i in range(chunks):
+            chunk = view[i * self.chunk_size : (i + 1) * self.chunk_size]
+            header = struct.pack(CHUNK_HEADER_FORMAT, entry["id"], i, chunks, len(chunk))
+            if not self._publish(self.topic, header + bytes(chunk)):
+                return False
+            # 分块之间让出，避免占满发送队列和网络
+            await asyncio.sleep_ms(self.chunk_interval_ms)
+        return True
+
+    def _write_file(self, entry: dict) -> bool:
+        if self._files is None:
+            try:
+                os.mkdir(self.directory)
+            except OSError:
+                pass
+            self._files = sorted(
+                name for name in os.listdir(self.directory) if name.endswith(".jpg")
+            )
+        name = f"snap_{entry['ts']:010d}_{entry['id']:08d}.jpg"
+        with open(f"{self.directory}/{name}", "wb") as f:
+            f.write(entry["data"])
+        self._files.append(name)
+        while len(self._files) > self.max_files:
+            old = self._files.pop(0)
+            try:
+                os.remove(f"{self.directory}/{old}")
+            except OSError:
+                pass
+        return True
+
+    async def run_uploader(self) -> None:
+        """
+        后台上传任务：先编码等待中的帧，再依次上传缓冲区中尚未上传的截图
+        """
+        while True:
+            if self._pending is not None:
+                self._encode_pending()
+                await asyncio.sleep_ms(0)
+            entry = self.buffer.next_pending()
+            if entry is None:
+                await self._event.wait()
+                self._event.clear()
+                continue
+            try:
+                if self.upload == UPLOAD_MQTT:
+                    ok = await self._upload_mqtt(entry)
+                else:
+                    ok = self._write_file(entry)
+            except Exception as e:
+                logging.error("Error uploading snapshot: %s", e, log_name=LOGNAME, every_ms=5000)
+                ok = False
+            if ok:
+                entry["uploaded"] = True
+                self.uploaded += 1
+            else:
+                self.failed += 1
+                # 上传失败时稍后重试，期间截图可能被新的截图淘汰
+                await asyncio.sleep_ms(1000)
+            await asyncio.sleep_ms(0)
+
+    def stats(self) -> dict:
+        """
+        获取截图统计信息
+
+        Returns:
+            dict: 包含触发与跳过次数、缓冲区状态、上传成功与失败次数
+        """
+        return {
+            "triggered": self.triggered,
+            "skipped": self.skipped,
+            "buffered": len(self.buffer),
+            "bytes": self.buffer.bytes,
+            "evicted": self.buffer.evicted,
+            "evicted_pending": self.buffer.evicted_pending,
+            "uploaded": self.uploaded,
+            "failed": self.failed,
+        }
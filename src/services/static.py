@@ -0,0 +1,218 @@
+import os
+import struct
+import utime
+from src.services.utils import logging
+from src.services.httpserver import HTTPError, Request, Response
+
+LOGNAME = "static"
+
+MIME_TYPES = {
+    "html": "text/html; charset=utf-8",
+    "css": "text/css; charset=utf-8",
+    "js": "application/javascript; charset=utf-8",
+    "json": "application/json",
+    "svg": "image/svg+xml",
+    "png": "image/png",
+    "jpg": "image/jpeg",
+    "ico": "image/x-icon",
+    "txt": "text/plain; charset=utf-8",
+}
+
+_DAYS = ("Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun")
+_MONTHS = ("Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec")
+
+
+def http_date(seconds: int) -> str:
+    """
+    格式化为HTTP日期，例如 "Sun, 18 Oct 2026 08:00:00 GMT"
+
+    参数：
+        seconds: utime 纪元的秒数，与 os.stat 的修改时间一致
+    返回：
+        str: HTTP日期
+    """
+    gmtime = getattr(utime, "gmtime", utime.localtime)
+    t = gmtime(seconds)
+    return "%s, %02d %s %04d %02d:%02d:%02d GMT" % (
+        _DAYS[t[6]], t[2], _MONTHS[t[1] - 1], t[0], t[3], t[4], t[5]
+    )
+
+
+class _Asset:
+    def __init__(self, path: str, stat: tuple):
+        """
+        一个文件及其缓存的元数据；内容只在第一次发送且预算允许时读入内存
+
+        Args:
+            path (str): 文件路径
+            stat (tuple): os.stat 的结果
+        """
+        self.path = path
+        self.size = stat[6]
+        self.mtime = int(stat[8])
+        self.etag = '"%x-%x"' % (self.size, self.mtime)
+        self.last_modified = http_date(self.mtime)
+        self.data = None  # 已缓存的内容
+        self.cacheable = True  # 预算不足时置为False，之后总是分块读取
+
+
+class StaticFiles:
+    def __init__(self, directory: str, config: dict | None = None):
+        """
+        配网页面等静态文件：元数据只读取一次，小文件缓存在内存中，
+        存在预先压缩的 <文件>.gz 时对支持 gzip 的客户端直接发送压缩版本，
+        支持 ETag/Last-Modified 条件请求，大文件用一个共享缓冲区分块发送
+
+        Args:
+            directory (str): 静态文件目录
+            config (dict, optional): 配置，包含以下键：
+                - max_cached_bytes: 缓存在内存中的文件总字节数上限，默认16384
+                - chunk_size: 分块发送的块大小，默认1024
+        """
+        config = config or {}
+        self.directory = directory.rstrip("/")
+        self.max_cached_bytes = config.get("max_cached_bytes", 16384)
+        self.chunk_size = config.get("chunk_size", 1024)
+        # 所有连接共用：readinto 和 writer.write 之间没有 await，write 会复制数据
+        self._buffer = bytearray(self.chunk_size)
+        self._view = memoryview(self._buffer)
+        self._assets = {}  # 相对路径 -> (_Asset, gzip 版本的 _Asset 或 None)
+        self.cached_bytes = 0
+
+        # 统计信息
+        self.hits = 0
+        self.not_modified = 0
+        self.gzip_sent = 0
+        self.streamed = 0
+        self.disk_reads = 0
+
+    def reload(self) -> None:
+        """
+        清空缓存，文件更新后调用
+        """
+        self._assets = {}
+        self.cached_bytes = 0
+
+    def _lookup(self, name: str) -> tuple:
+        entry = self._assets.get(name)
+        if entry is not None:
+            return entry
+        if not name or ".." in name or name.startswith("/"):
+            raise HTTPError(404)
+        path = f"{self.directory}/{name}"
+        try:
+            asset = _Asset(path, os.stat(path))
+        except OSError:
+            raise HTTPError(404)
+        try:
+            gzipped = _Asset(path + ".gz", os.stat(path + ".gz"))
+            # gzip 末尾4字节是原文件长度，与源文件不一致说明修改后没有重新压缩
+            # （上传顺序不固定，修改时间不可靠）
+            with open(gzipped.path, "rb") as f:
+                f.seek(gzipped.size - 4)
+                if struct.unpack("<I", f.read(4))[0] != asset.size:
+                    logging.warning("%s is stale, ignored", gzipped.path, log_name=LOGNAME)
+                    gzipped = None
+        except (OSError, ValueError, struct.error):
+            gzipped = None
+        entry = (asset, gzipped)
+        self._assets[name] = entry
+        return entry
+
+    def _load(self, asset: _Asset) -> bytes | None:
+        """
+        在预算内把文件读入内存
+
+        Returns:
+            bytes | None: 文件内容，超出预算时返回None
+        """
+        if asset.data is not None:
+            return asset.data
+        if not asset.cacheable or self.cached_bytes + asset.size > self.max_cached_bytes:
+            if asset.cacheable:
+                logging.debug("%s exceeds cache budget, streaming", asset.path, log_name=LOGNAME)
+            asset.cacheable = False
+            return None
+        with open(asset.path, "rb") as f:
+            asset.data = f.read()
+        self.disk_reads += 1
+        self.cached_bytes += len(asset.data)
+        return asset.data
+
+    def _streamer(self, asset: _Asset):
+        async def stream(writer):
+            self.disk_reads += 1
+            with open(asset.path, "rb") as f:
+                while True:
+                    n = f.readinto(self._buffer)
+                    if not n:
+                        break
+                    writer.write(self._view[:n])
+                    await writer.drain()
+
+        return stream
+
+    def serve(self, request: Request, name: str) -> Response:
+        """
+        构建静态文件的响应
+
+        Args:
+            request (Request): 请求，读取 Accept-Encoding 和条件请求头
+            name (str): 相对于静态目录的路径
+
+        Returns:
+            Response: 200 或 304 响应
+
+        Raises:
+            HTTPError: 文件不存在（404）
+        """
+        asset, gzipped = self._lookup(name)
+        # 两个版本内容相同，Last-Modified 都取源文件的修改时间，ETag 区分版本
+        headers = {"Cache-Control": "no-cache", "Last-Modified": asset.last_modified}
+        if gzipped is not None:
+            headers["Vary"] = "Accept-Encoding"
+            if "gzip" in request.headers.get("accept-encoding", ""):
+                headers["Content-Encoding"] = "gzip"
+                asset = gzipped
+        headers["ETag"] = asset.etag
+
+        # If-None-Match 优先；浏览器回传的 If-Modified-Since 与 Last-Modified 完全相同
+        if_none_match = request.headers.get("if-none-match")
+        if if_none_match is not None:
+            fresh = asset.etag in if_none_match or if_none_match == "*"
+        else:
+            fresh = request.headers.get("if-modified-since") == headers["Last-Modified"]
+        if fresh:
+            self.not_modified += 1
+            return Response(b"", 304, headers=headers)
+
+        self.hits += 1
+        if asset is gzipped:
+            self.gzip_sent += 1
+        content_type = MIME_TYPES.get(name.rpartition(".")[2], "application/octet-stream")
+        data = self._load(asset)
+        if data is not None:
+            return Response(data, content_type=content_type, headers=headers)
+        self.streamed += 1
+        return Response(
+            content_type=content_type,
+            headers=headers,
+            stream=self._streamer(asset),
+            length=asset.size,
+        )
+
+    def stats(self) -> dict:
+        """
+        获取统计信息
+
+        Returns:
+            dict: 包含缓存字节数、200/304 响应数、gzip 响应数、分块发送次数和读盘次数
+        """
+        return {
+            "cached_bytes": self.cached_bytes,
+            "hits": self.hits,
+            "not_modified": self.not_modified,
+            "gzip_sent": self.gzip_sent,
+            "streamed": self.streamed,
+            "disk_reads": self.disk_reads,
+        }
@@ -0,0 +1,246 @@
+from array import array
+from src.services.detections import DetectionBuffer
+
+# 事件类型
+EVENT_KEEP = 0  # 关键帧中的存量目标
+EVENT_ENTER = 1  # 新目标出现
+EVENT_MOVE = 2  # 目标位置变化超过阈值
+EVENT_LEAVE = 3  # 目标消失
+
+EVENT_NAMES = ("keep", "enter", "move", "leave")
+
+
+class EventBuffer(DetectionBuffer):
+    def __init__(self, capacity: int, labels: list):
+        """
+        检测事件缓冲区，在检测结果的基础上附带跟踪ID和事件类型
+
+        Args:
+            capacity (int): 最多存放的事件数量
+            labels (list): 标签名称列表
+        """
+        super().__init__(capacity, labels)
+        self.track_ids = array("H", [0] * capacity)
+        self.events = array("B", [0] * capacity)
+        self.keyframe = False
+
+    def append(self, track, event: int) -> bool:
+        """
+        追加一个目标的事件
+
+        Args:
+            track (_Track): 目标
+            event (int): 事件类型
+
+        Returns:
+            bool: False表示缓冲区已满
+        """
+        i = self.count
+        if i == self.capacity:
+            return False
+        self.label_ids[i] = track.label_id
+        self.confidences[i] = track.confidence
+        bbox = track.bbox
+        j = i * 4
+        self.bboxes[j] = bbox[0]
+        self.bboxes[j + 1] = bbox[1]
+        self.bboxes[j + 2] = bbox[2]
+        self.bboxes[j + 3] = bbox[3]
+        self.track_ids[i] = track.track_id
+        self.events[i] = event
+        self.count = i + 1
+        return True
+
+
+class _Track:
+    def __init__(self, track_id: int, label_id: int, confidence: float, bbox, offset: int = 0):
+        self.track_id = track_id
+        self.label_id = label_id
+        self.confidence = confidence
+        x, y, w, h = bbox[offset], bbox[offset + 1], bbox[offset + 2], bbox[offset + 3]
+        self.bbox = [x, y, w, h]
+        self.reported = [x, y, w, h]  # 最近一次上报的位置
+        self.hits = 1
+        self.missed = 0
+        self.confirmed = False
+
+
+def iou(a, b, offset: int = 0) -> float:
+    """
+    计算两个 [x, y, w, h] 框的交并比
+
+    参数：
+        a: 第一个框
+        b: 第二个框，或从 offset 开始存放第二个框的数组（避免在匹配循环中切片）
+        offset: 第二个框在 b 中的起始下标
+    返回：
+        交并比，0到1之间
+    """
+    bx, by, bw, bh = b[offset], b[offset + 1], b[offset + 2], b[offset + 3]
+    ix = min(a[0] + a[2], bx + bw) - max(a[0], bx)
+    iy = min(a[1] + a[3], by + bh) - max(a[1], by)
+    if ix <= 0 or iy <= 0:
+        return 0.0
+    inter = ix * iy
+    union = a[2] * a[3] + bw * bh - inter
+    return inter / union if union > 0 else 0.0
+
+
+class IoUTracker:
+    def __init__(self, config: dict, capacity: int, labels: list, pool_size: int = 4):
+        """
+        基于IoU的轻量级多目标跟踪器，只输出变化事件
+
+        同一标签的检测框与已有目标按IoU贪心匹配，目标获得稳定的ID；
+        每帧只输出出现、移动（中心位移超过阈值）和消失事件，
+        并每隔固定帧数输出一次包含全部目标的关键帧。
+
+        Args:
+            config (dict): 跟踪配置，包含以下键：
+                - iou_thresh: 匹配所需的最小IoU，默认0.3
+                - move_thresh: 触发移动事件的中心位移（像素），默认20
+                - max_missed: 连续未匹配多少帧后判定目标消失，默认3
+                - min_hits: 连续匹配多少帧后确认目标出现，默认1
+                - keyframe_interval: 关键帧间隔帧数，0表示不输出关键帧，默认30
+            capacity (int): 单帧最多的检测框数量
+            labels (list): 标签名称列表
+            pool_size (int): 事件缓冲区数量，需大于在途缓冲区数量
+        """
+        self.iou_thresh = config.get("iou_thresh", 0.3)
+        self.move_thresh = config.get("move_thresh", 20)
+        self.max_missed = config.get("max_missed", 3)
+        self.min_hits = config.get("min_hits", 1)
+        self.keyframe_interval = config.get("keyframe_interval", 30)
+
+        self.tracks = []
+        self._next_id = 1
+        self._frames = 0
+        # 关键帧要容纳全部目标以及同一帧内消失的目标
+        self._buffers = [EventBuffer(capacity * 2, labels) for _ in range(max(1, pool_size))]
+        self._next_buffer = 0
+        self._matched = bytearray(capacity)
+
+        # 统计信息
+        self.frames_in = 0
+        self.frames_out = 0
+        self.events_dropped = 0
+
+    def _moved(self, track: _Track) -> bool:
+        a = track.bbox
+        b = track.reported
+        dx = (a[0] + a[2] / 2) - (b[0] + b[2] / 2)
+        dy = (a[1] + a[3] / 2) - (b[1] + b[3] / 2)
+        return dx * dx + dy * dy > self.move_thresh * self.move_thresh
+
+    def _emit(self, out: EventBuffer, track: _Track, event: int) -> None:
+        # 缓冲区已满时丢弃事件并计数；漏检期间保留的目标与新目标之和可能超过容量
+        if not out.append(track, event):
+            self.events_dropped += 1
+
+    def update(self, detections) -> EventBuffer:
+        """
+        用一帧检测结果更新目标并生成事件
+
+        Args:
+            detections (DetectionBuffer): 本帧检测结果，空缓冲区表示画面中没有目标
+
+        Returns:
+            EventBuffer: 本帧的事件，count为0表示没有需要发布的变化
+        """
+        self.frames_in += 1
+        self._frames += 1
+        keyframe = self.keyframe_interval > 0 and self._frames >= self.keyframe_interval
+        if keyframe:
+            self._frames = 0
+
+        out = self._buffers[self._next_buffer]
+        self._next_buffer = (self._next_buffer + 1) % len(self._buffers)
+        out.clear()
+        out.keyframe = keyframe
+
+        count = detections.count
+        matched = self._matched
+        for i in range(count):
+            matched[i] = 0
+
+        # 已有目标与本帧检测框按IoU贪心匹配
+        bboxes = detections.bboxes
+        for track in self.tracks:
+            best = -1
+            best_iou = self.iou_thresh
+            for i in range(count):
+                if matched[i] or detections.label_ids[i] != track.label_id:
+                    continue
+                score = iou(track.bbox, bboxes, i * 4)
+                if score >= best_iou:
+                    best = i
+                    best_iou = score
+            if best < 0:
+                track.missed += 1
+                continue
+            matched[best] = 1
+            j = best * 4
+            track.bbox[0] = bboxes[j]
+            track.bbox[1] = bboxes[j + 1]
+            track.bbox[2] = bboxes[j + 2]
+            track.bbox[3] = bboxes[j + 3]
+            track.confidence = detections.confidences[best]
+            track.hits += 1
+            track.missed = 0
+
+        # 未匹配的检测框作为新目标
+        for i in range(count):
+            if not matched[i]:
+                self.tracks.append(
+                    _Track(
+                        self._next_id,
+                        detections.label_ids[i],
+                        detections.confidences[i],
+                        bboxes,
+                        i * 4,
+                    )
+                )
+                self._next_id = self._next_id % 0xFFFF + 1
+
+        # 生成事件
+        alive = []
+        for track in self.tracks:
+            if track.missed > self.max_missed:
+                if track.confirmed:
+                    self._emit(out, track, EVENT_LEAVE)
+                continue
+            alive.append(track)
+            if track.missed:
+                if keyframe and track.confirmed:
+                    self._emit(out, track, EVENT_KEEP)
+                continue
+            if not track.confirmed:
+                if track.hits >= self.min_hits:
+                    track.confirmed = True
+                    track.reported[:] = track.bbox
+                    self._emit(out, track, EVENT_ENTER)
+                continue
+            if self._moved(track):
+                track.reported[:] = track.bbox
+                self._emit(out, track, EVENT_MOVE)
+            elif keyframe:
+                self._emit(out, track, EVENT_KEEP)
+        self.tracks = alive
+
+        if out.count or keyframe:
+            self.frames_out += 1
+        return out
+
+    def stats(self) -> dict:
+        """
+        获取跟踪统计信息
+
+        Returns:
+            dict: 包含当前目标数、输入帧数、实际需要发布的帧数和因缓冲区已满丢弃的事件数
+        """
+        return {
+            "tracks": len(self.tracks),
+            "frames_in": self.frames_in,
+            "frames_out": self.frames_out,
+            "events_dropped": self.events_dropped,
+        }
@@ -1,57 +1,33 @@
-from machine import RTC
 import json
+from src.services.logger import logging, format_time
+from src.services.config import get_store
 
-
-# 写日志的函数，支持自定义日志名称
-def logging(message: str, log_name: str = "log"):
-    try:
-        current_time = RTC().datetime()
-        # 格式化时间为字符串 (YYYY-MM-DD HH:MM:SS)
-        print(f"[{format_time(current_time)}] {log_name}: {message}")
-    except Exception as e:
-        print(f"Error writing to log: {e}")
-
-
-# 格式化时间函数，将RTC返回的时间元组格式化为字符串
-def format_time(current_time) -> str:
-    return f"{current_time[0]}-{current_time[1]:02d}-{current_time[2]:02d} {current_time[3]:02d}:{current_time[4]:02d}:{current_time[5]:02d}"
+LOGNAME = "utils.config"
 
 
 # 读取配置文件并返回配置字典
 def load_config(config_path: str = "/sdcard/.config.json") -> tuple[bool, dict]:
-    """读取配置文件并返回配置字典"""
-    try:
-        with open(config_path) as f:
-            return True, json.load(f)
-    except Exception as e:
-        logging(
-            f"Error loading config from {config_path}: {e}", log_name="utils.config"
-        )
+    """读取配置文件并返回配置字典，文件只在第一次调用时读取，之后返回内存中的配置"""
+    store = get_store(config_path)
+    if not store.load():
         return False, None
+    return True, store.data
 
 
 # 更新配置文件中的配置
 def update_config(new_config: dict, config_path: str = "/sdcard/.config.json") -> bool:
     """更新配置文件中的配置"""
-    success, config = load_config(config_path)
-    if not success:
-        return False
-
-    # 更新配置
-    config.update(new_config)
-
-    # 保存更新后的配置
-    return save_config(config, config_path)
+    return get_store(config_path).update(new_config)
 
 
 # 获取WiFi网络配置列表
 def get_wifi_network(config_path: str = "/sdcard/.config.json") -> list | bool:
     """获取WiFi网络配置"""
-    success, config = load_config(config_path)
-    if not success:
+    networks = get_store(config_path).get("wifi.networks")
+    if networks is None:
         return False
 
-    return config["wifi"]["networks"]
+    return networks
 
 
 # 新增WiFi网络配置
@@ -59,28 +35,24 @@ def add_wifi_network(
     ssid: str, password: str, config_path: str = "/sdcard/.config.json"
 ) -> bool:
     """新增WiFi网络配置"""
-    success, config = load_config(config_path)
-    if not success:
+    store = get_store(config_path)
+    networks = store.get("wifi.networks")
+    if networks is None:
         return False
 
     new_network = {"enabled": True, "ssid": ssid, "password": password}
-    config["wifi"]["networks"].append(new_network)
-
-    return save_config(config, config_path)
+    return store.set("wifi.networks", networks + [new_network])
 
 
 # 删除WiFi网络配置
 def remove_wifi_network(ssid: str, config_path: str = "/sdcard/.config.json") -> bool:
     """删除WiFi网络配置"""
-    success, config = load_config(config_path)
-    if not success:
+    store = get_store(config_path)
+    networks = store.get("wifi.networks")
+    if networks is None:
         return False
 
-    config["wifi"]["networks"] = [
-        net for net in config["wifi"]["networks"] if net["ssid"] != ssid
-    ]
-
-    return save_config(config, config_path)
+    return store.set("wifi.networks", [net for net in networks if net["ssid"] != ssid])
 
 
 # 修改WiFi网络配置
@@ -92,12 +64,15 @@ def modify_wifi_network(
 ) -> bool:
     """修改WiFi网络配置"""
     try:
-        success, config = load_config(config_path)
-        if not success:
+        store = get_store(config_path)
+        networks = store.get("wifi.networks")
+        if networks is None:
             return False
 
+        # 修改副本，保存失败时内存中的配置保持不变
+        networks = [dict(net) for net in networks]
         is_modify = False
-        for net in config["wifi"]["networks"]:
+        for net in networks:
             if net["ssid"] == ssid:
                 if new_password:
                     net["password"] = new_password
@@ -108,23 +83,134 @@ def modify_wifi_network(
         # 如果没有修改现有网络配置，则添加新的网络
         if not is_modify:
             new_network = {"enabled": enabled, "ssid": ssid, "password": new_password}
-            config["wifi"]["networks"].append(new_network)
+            networks = networks + [new_network]
 
         # 保存修改后的配置
-        return save_config(config, config_path)
+        return store.set("wifi.networks", networks)
     except Exception as e:
-        logging.error(f"Error modify_wifi_network : {e}")
+        logging.error(f"Error modify_wifi_network : {e}", log_name=LOGNAME)
         return False
 
 
 # 保存配置字典到配置文件
 def save_config(config: dict, config_path: str = "/sdcard/.config.json") -> bool:
-    """保存配置字典到配置文件"""
-    try:
-        with open(config_path, "w") as f:
-            json.dump(config, f)  # 格式化输出，便于调试
-        logging.info(f"Config saved to {config_path}")
-        return True
-    except Exception as e:
-        logging.error(f"Error saving config to {config_path}: {e}")
-        return False
+    """保存配置字典到配置文件，写入先写临时文件再重命名"""
+    store = get_store(config_path)
+    store.data = config
+    return store.mark_dirty()
+
+
+WIFI_BATCH_OPS = ("add", "update", "delete", "reorder")
+
+
+def _check_network_fields(op: dict, index: int) -> None:
+    ssid = op.get("ssid")
+    if not isinstance(ssid, str) or not ssid or len(ssid.encode()) > 32:
+        raise ValueError(f"op {index}: SSID must be 1-32 bytes")
+    if "password" in op and not isinstance(op["password"], str):
+        raise ValueError(f"op {index}: password must be a string")
+    if "password" in op and len(op["password"]) > 64:
+        raise ValueError(f"op {index}: password too long")
+    if "enabled" in op and not isinstance(op["enabled"], bool):
+        raise ValueError(f"op {index}: enabled must be true or false")
+    if "priority" in op and (
+        not isinstance(op["priority"], int) or isinstance(op["priority"], bool)
+    ):
+        raise ValueError(f"op {index}: priority must be an integer")
+
+
+# 批量修改WiFi网络配置
+def apply_wifi_network_ops(
+    ops: list, config_path: str = "/sdcard/.config.json", max_networks: int = 32
+) -> tuple[bool, list]:
+    """
+    在一个事务中依次执行多个操作，全部校验通过后只写入一次配置文件，
+    任何一个操作无效时不做任何修改
+
+    参数：
+        ops: 操作列表，每项为以下之一：
+            {"op": "add", "ssid", "password", "enabled", "priority"}：添加，已存在时覆盖
+            {"op": "update", "ssid", ...}：只修改给出的字段，网络必须存在
+            {"op": "delete", "ssid"}：删除，网络必须存在
+            {"op": "reorder", "ssids": [...]}：按给出的顺序改写这些网络的 priority，
+                使它们依次排在其余网络之前；连接顺序只由 priority 决定
+        config_path: 配置文件路径
+        max_networks: 网络数量上限
+    返回：
+        tuple[bool, list]: (是否写入成功, 修改后的网络列表)；
+            最终列表按 priority 从高到低排序，priority 相同时保持原来的列表顺序
+    异常：
+        ValueError: 操作无效，消息中包含出错操作的序号
+    """
+    if not isinstance(ops, list) or not ops:
+        raise ValueError("ops must be a non-empty list")
+    store = get_store(config_path)
+    wifi = store.get("wifi")
+    if wifi is None:
+        return False, []
+
+    # 在副本上修改，校验失败时内存中的配置保持不变
+    networks = [dict(net) for net in wifi.get("networks", [])]
+    last_good = wifi.get("last_good")
+    forget_last_good = False
+
+    def find(ssid):
+        for net in networks:
+            if net["ssid"] == ssid:
+                return net
+        return None
+
+    for index, op in enumerate(ops):
+        if not isinstance(op, dict) or op.get("op") not in WIFI_BATCH_OPS:
+            raise ValueError(f"op {index}: op must be one of {', '.join(WIFI_BATCH_OPS)}")
+        kind = op["op"]
+        if kind == "reorder":
+            ssids = op.get("ssids")
+            if not isinstance(ssids, list) or not ssids or len(set(ssids)) != len(ssids):
+                raise ValueError(f"op {index}: ssids must be a non-empty list without duplicates")
+            listed = []
+            for ssid in ssids:
+                net = find(ssid)
+                if net is None:
+                    raise ValueError(f"op {index}: SSID {ssid} not found")
+                listed.append(net)
+            # 列出的网络优先级依次递减，且都高于其余网络
+            base = max([net.get("priority", 0) for net in networks if net not in listed] or [0])
+            for rank, net in enumerate(listed):
+                net["priority"] = base + len(listed) - rank
+            continue
+
+        _check_network_fields(op, index)
+        ssid = op["ssid"]
+        net = find(ssid)
+        if kind == "delete":
+            if net is None:
+                raise ValueError(f"op {index}: SSID {ssid} not found")
+            networks.remove(net)
+        elif kind == "update":
+            if net is None:
+                raise ValueError(f"op {index}: SSID {ssid} not found")
+        elif net is None:
+            net = {"enabled": True, "ssid": ssid, "password": ""}
+            networks.append(net)
+        if kind != "delete":
+            for key in ("password", "enabled", "priority"):
+                if key in op:
+                    net[key] = op[key]
+        # 上次成功的网络被删除或修改密码后，下次启动不再直接连接它
+        if last_good and last_good.get("ssid") == ssid and (kind == "delete" or "password" in op):
+            forget_last_good = True
+
+    if len(networks) > max_networks:
+        raise ValueError(f"at most {max_networks} networks")
+    # MicroPython 的排序不稳定，用列表下标区分优先级相同的网络
+    order = sorted(range(len(networks)), key=lambda i: (-networks[i].get("priority", 0), i))
+    networks = [networks[i] for i in order]
+
+    new_wifi = dict(wifi)
+    new_wifi["networks"] = networks
+    if forget_last_good:
+        new_wifi.pop("last_good", None)
+    # 一次合并、一次原子写入；后台保存任务运行时也立即写入，随后重启不会丢失修改
+    saved = store.update({"wifi": new_wifi}) and store.flush()
+    return saved, networks
@@ -1,6 +1,8 @@
 import network
 import time
 import ujson
+import utime
+import uasyncio as asyncio
 from src.services.utils import logging, load_config
 
 
@@ -67,14 +69,19 @@ def connect_wifi(ssid: str, password: str) -> tuple[bool, str]:
 
 # 读取配置并循环尝试连接
 def test_wifi_connections(wifi_configs: dict) -> bool:
-    """测试可用的WiFi连接，按顺序尝试连接
+    """测试可用的WiFi连接，按 priority 从高到低、相同时按列表顺序尝试连接
     参数:
         wifi_configs: 包含多个WiFi配置的字典列表
     返回值:
         bool: 连接成功返回True，否则False
     """
     if wifi_configs:
-        for config in wifi_configs.get("networks", []):
+        networks = wifi_configs.get("networks", [])
+        # MicroPython 的排序不稳定，priority 相同时用列表下标保持配置顺序
+        order = sorted(
+            range(len(networks)), key=lambda i: (-networks[i].get("priority", 0), i)
+        )
+        for config in [networks[i] for i in order]:
             ssid = config.get("ssid")
             password = config.get("password")
             enabled = config.get("enabled", False)
@@ -96,3 +103,317 @@ def test_wifi_connections(wifi_configs: dict) -> bool:
     else:
         logging("No WiFi configurations enabled.", log_name=LOGNAME)
         return False
+
+
+def parse_scan_result(net) -> dict | None:
+    """解析一条扫描结果
+    参数:
+        net: sta.scan() 返回的一项，K230 固件为带属性的对象，
+            标准 MicroPython 为 (ssid, bssid, channel, rssi, security, hidden) 元组
+    返回值:
+        dict: 包含 ssid、bssid、channel、rssi、security，隐藏或无效网络返回None
+    """
+    if isinstance(net, tuple):
+        ssid, bssid, channel, rssi, security = net[:5]
+    else:
+        ssid = getattr(net, "ssid", b"")
+        bssid = getattr(net, "bssid", b"")
+        channel = getattr(net, "channel", 0)
+        rssi = getattr(net, "rssi", -100)
+        security = getattr(net, "security", 0)
+    if isinstance(ssid, bytes):
+        ssid = ssid.decode("utf-8")
+    if not ssid:
+        return None
+    if isinstance(bssid, bytes):
+        bssid = ":".join(f"{b:02x}" for b in bssid)
+    return {
+        "ssid": ssid,
+        "bssid": bssid,
+        "channel": channel,
+        "rssi": rssi,
+        "security": security,
+    }
+
+
+class WiFiManager:
+    def __init__(self, config: dict, store=None):
+        """
+        异步WiFi管理器：扫描一次后按信号强度和连接历史排序候选网络，
+        连接时让出事件循环而不是阻塞等待，连接成功后在后台监测链路并按退避间隔重连
+
+        Args:
+            config (dict): WiFi配置，包含以下键：
+                - networks: 网络列表，每项包含 ssid、password、enabled，
+                  可选 priority（越大越优先，默认0）
+                - connect_timeout_ms (optional): 单个网络的关联超时，默认10000
+                - ip_timeout_ms (optional): 关联后等待获取IP的超时，默认5000
+                - check_interval_ms (optional): 后台检查链路的间隔，默认5000
+                - backoff_min_ms (optional): 重连退避的初始间隔，默认1000
+                - backoff_max_ms (optional): 重连退避的最大间隔，默认60000
+                - last_good (optional): 上次连接成功的网络 {"ssid", "bssid", "channel"}，
+                  没有优先级更高的网络时，启动时不扫描先直接连接该网络
+            store (ConfigStore, optional): 配置存储，连接的网络变化时写入 "wifi.last_good"
+        """
+        self.networks = [
+            net
+            for net in config.get("networks", [])
+            if net.get("enabled", False) and net.get("ssid") and net.get("password")
+        ]
+        self.connect_timeout_ms = config.get("connect_timeout_ms", 10000)
+        self.ip_timeout_ms = config.get("ip_timeout_ms", 5000)
+        self.check_interval_ms = config.get("check_interval_ms", 5000)
+        self.backoff_min_ms = config.get("backoff_min_ms", 1000)
+        self.backoff_max_ms = config.get("backoff_max_ms", 60000)
+
+        self.store = store
+        self.last_good = config.get("last_good") or None
+
+        self.sta = network.WLAN(network.STA_IF)
+        self.ssid = None  # 当前连接的网络
+        self.ip_address = None
+        self.is_connected = False
+        self._scanned = {}  # ssid -> 扫描结果，取信号最强的一项
+        self._history = {}  # ssid -> [成功次数, 连续失败次数]
+        self._listeners = []
+
+        # 统计信息
+        self.scans = 0
+        self.attempts = 0
+        self.connects = 0
+        self.drops = 0
+
+    def add_listener(self, listener) -> None:
+        """
+        注册链路变化的回调
+
+        Args:
+            listener (callable): listener(up, ip_address)，up 为True表示已连接
+        """
+        self._listeners.append(listener)
+
+    def _notify(self, up: bool) -> None:
+        for listener in self._listeners:
+            try:
+                listener(up, self.ip_address)
+            except Exception as e:
+                logging.error("Error in WiFi listener: %s", e, log_name=LOGNAME)
+
+    def scan(self) -> dict:
+        """
+        扫描周围的网络，结果按 SSID 保留信号最强的一项
+
+        扫描本身由固件同步完成，只在首次连接和重连前执行
+
+        Returns:
+            dict: ssid -> 扫描结果
+        """
+        if not self.sta.active():
+            self.sta.active(True)
+        self.scans += 1
+        scanned = {}
+        try:
+            for net in self.sta.scan():
+                info = parse_scan_result(net)
+                if info is None:
+                    continue
+                old = scanned.get(info["ssid"])
+                if old is None or info["rssi"] > old["rssi"]:
+                    scanned[info["ssid"]] = info
+        except Exception as e:
+            logging.error("WiFi scan failed: %s", e, log_name=LOGNAME)
+        self._scanned = scanned
+        return scanned
+
+    def _find(self, ssid: str) -> dict | None:
+        for net in self.networks:
+            if net["ssid"] == ssid:
+                return net
+        return None
+
+    def candidates(self) -> list:
+        """
+        按优先顺序排列候选网络：先按配置的 priority 从高到低；priority 相同时扫描到的网络在前，
+        按信号强度排序，曾经连接成功的加分，连续失败的减分；未扫描到的网络（可能是隐藏网络）排在最后；
+        其余都相同时按列表顺序（MicroPython 的排序不稳定，显式比较下标）
+
+        Returns:
+            list: 网络配置列表
+        """
+
+        networks = self.networks
+
+        def score(i):
+            net = networks[i]
+            info = self._scanned.get(net["ssid"])
+            successes, failures = self._history.get(net["ssid"], (0, 0))
+            bonus = (10 if successes else 0) - 10 * failures
+            priority = -net.get("priority", 0)
+            if info is None:
+                return (priority, 1, -bonus, i)
+            return (priority, 0, -(info["rssi"] + bonus), i)
+
+        return [networks[i] for i in sorted(range(len(networks)), key=score)]
+
+    async def connect_network(
+        self, net: dict, bssid: str | None = None, channel: int | None = None
+    ) -> bool:
+        """
+        连接一个网络，等待关联和获取IP期间让出事件循环
+
+        Args:
+            net (dict): 网络配置，包含 ssid 和 password
+            bssid (str, optional): 指定接入点，格式为 "aa:bb:cc:dd:ee:ff"
+            channel (int, optional): 接入点所在信道，固件支持时省去逐个信道的扫描
+
+        Returns:
+            bool: True表示已连接并获取到IP
+        """
+        ssid = net["ssid"]
+        self.attempts += 1
+        history = self._history.setdefault(ssid, [0, 0])
+        logging(f"Attempting to connect to WiFi: {ssid}", log_name=LOGNAME)
+        try:
+            hints = {}
+            if bssid:
+                hints["bssid"] = bytes([int(b, 16) for b in bssid.split(":")])
+            if channel:
+                hints["channel"] = channel
+            if hints:
+                try:
+                    self.sta.connect(ssid, net["password"], **hints)
+                except (TypeError, ValueError):
+                    # 固件不支持指定BSSID或信道
+                    self.sta.connect(ssid, net["password"])
+            else:
+                self.sta.connect(ssid, net["password"])
+        except Exception as e:
+            logging.error("Error connecting to %s: %s", ssid, e, log_name=LOGNAME)
+            history[1] += 1
+            return False
+
+        start = utime.ticks_ms()
+        while not self.sta.isconnected():
+            if utime.ticks_diff(utime.ticks_ms(), start) >= self.connect_timeout_ms:
+                logging(f"Failed to connect to {ssid}", log_name=LOGNAME)
+                history[1] += 1
+                return False
+            await asyncio.sleep_ms(100)
+
+        start = utime.ticks_ms()
+        ip_address = self.sta.ifconfig()[0]
+        while ip_address == "0.0.0.0":
+            if utime.ticks_diff(utime.ticks_ms(), start) >= self.ip_timeout_ms:
+                logging("Failed to obtain valid IP Address.", log_name=LOGNAME)
+                history[1] += 1
+                return False
+            await asyncio.sleep_ms(100)
+            ip_address = self.sta.ifconfig()[0]
+
+        history[0] += 1
+        history[1] = 0
+        self.ssid = ssid
+        self.ip_address = ip_address
+        self.is_connected = True
+        self.connects += 1
+        logging(f"Successfully connected to {ssid}, ip is {ip_address}", log_name=LOGNAME)
+        self._remember(ssid, bssid, channel)
+        self._notify(True)
+        return True
+
+    def _remember(self, ssid: str, bssid: str | None, channel: int | None) -> None:
+        """
+        记录连接成功的网络，供下次启动时跳过扫描直接连接
+        """
+        info = self._scanned.get(ssid)
+        if info is None:
+            # 走快速路径时没有扫描结果，沿用上次记录的接入点信息
+            info = self.last_good if self.last_good and self.last_good["ssid"] == ssid else {}
+        last_good = {
+            "ssid": ssid,
+            "bssid": info.get("bssid") or bssid,
+            "channel": info.get("channel") or channel,
+        }
+        if last_good == self.last_good:
+            return
+        self.last_good = last_good
+        if self.store is not None:
+            self.store.set("wifi.last_good", last_good, notify=False)
+
+    async def connect(self, timeout_ms: int = 0) -> bool:
+        """
+        扫描一次并按优先顺序尝试各个网络
+
+        Args:
+            timeout_ms (int): 总超时，0表示尝试完所有网络为止
+
+        Returns:
+            bool: True表示连接成功
+        """
+        if not self.networks:
+            logging("No WiFi configurations enabled.", log_name=LOGNAME)
+            return False
+        start = utime.ticks_ms()
+        last = self._find(self.last_good["ssid"]) if self.last_good else None
+        top = max(net.get("priority", 0) for net in self.networks)
+        if last is not None and last.get("priority", 0) >= top:
+            # 快速路径：不扫描，直接连接上次成功的接入点和信道；有优先级更高的网络时先扫描
+            if await self.connect_network(
+                last, self.last_good.get("bssid"), self.last_good.get("channel")
+            ):
+                return True
+        self.scan()
+        for net in self.candidates():
+            if timeout_ms and utime.ticks_diff(utime.ticks_ms(), start) >= timeout_ms:
+                break
+            if await self.connect_network(net):
+                return True
+        logging("All WiFi connections failed.", log_name=LOGNAME)
+        return False
+
+    async def supervise(self) -> None:
+        """
+        后台监测链路：断开时通知监听者，先直接重连原来的网络，
+        失败后按指数退避重新扫描和连接（扫描由固件同步完成，会短暂阻塞事件循环）
+        """
+        delay = self.backoff_min_ms
+        while True:
+            if self.is_connected:
+                await asyncio.sleep_ms(self.check_interval_ms)
+                if self.sta.isconnected():
+                    continue
+                self.is_connected = False
+                self.ip_address = None
+                self.drops += 1
+                logging.warning(f"WiFi link to {self.ssid} lost", log_name=LOGNAME)
+                self._notify(False)
+                delay = self.backoff_min_ms
+                last = self._find(self.ssid)
+                hint = self.last_good if self.last_good and self.last_good["ssid"] == self.ssid else {}
+                if last is not None and await self.connect_network(
+                    last, hint.get("bssid"), hint.get("channel")
+                ):
+                    continue
+            if await self.connect():
+                delay = self.backoff_min_ms
+                continue
+            logging.warning("WiFi reconnect failed, retry in %d ms", delay, log_name=LOGNAME)
+            await asyncio.sleep_ms(delay)
+            delay = min(delay * 2, self.backoff_max_ms)
+
+    def stats(self) -> dict:
+        """
+        获取连接统计信息
+
+        Returns:
+            dict: 包含连接状态、当前网络、扫描、尝试、成功和掉线次数
+        """
+        return {
+            "connected": self.is_connected,
+            "ssid": self.ssid,
+            "ip": self.ip_address,
+            "scans": self.scans,
+            "attempts": self.attempts,
+            "connects": self.connects,
+            "drops": self.drops,
+        }
@@ -0,0 +1,195 @@
+import json
+import utime
+import uasyncio as asyncio
+from src.services.utils import logging
+from src.services.wifi import parse_scan_result
+
+LOGNAME = "wifiscan"
+
+
+class ScanService:
+    def __init__(self, sta, config: dict | None = None):
+        """
+        WiFi扫描服务：在后台按周期扫描，结果按 BSSID 缓存并记录信号强度历史，
+        接口直接返回缓存的快照；按需刷新时并发的请求共用同一次扫描
+
+        Args:
+            sta: 用于扫描的 network.WLAN(network.STA_IF)
+            config (dict, optional): 配置，包含以下键：
+                - interval_ms: 后台扫描周期，0 表示只按需扫描，默认30000
+                - ttl_ms: 超过该时间没有再扫描到的 BSSID 从缓存中移除，默认90000
+                - history: 每个 BSSID 保留的信号强度样本数，默认8
+                - min_refresh_ms: 距上次扫描不足该时间的按需刷新直接返回缓存，默认3000
+        """
+        config = config or {}
+        self.sta = sta
+        self.interval_ms = config.get("interval_ms", 30000)
+        self.ttl_ms = config.get("ttl_ms", 90000)
+        self.history = max(1, config.get("history", 8))
+        self.min_refresh_ms = config.get("min_refresh_ms", 3000)
+        self._entries = {}  # bssid -> 扫描结果，附加 rssi_history、last_seen、seen
+        self._scanning = None  # 正在进行的扫描，完成时 set
+        self._version = 0  # 缓存内容变化时递增
+        self._snapshots = {}  # detail -> (version, JSON字符串)
+        self.last_scan_ms = None
+
+        # 统计信息
+        self.scans = 0
+        self.joined = 0
+        self.failures = 0
+        self.scan_duration_ms = 0
+
+    def _scan(self) -> None:
+        start = utime.ticks_ms()
+        try:
+            self.sta.active(True)
+            results = self.sta.scan()
+        except Exception as e:
+            self.failures += 1
+            logging.warning("Scan failed: %s", e, log_name=LOGNAME, every_ms=10000)
+            return
+        now = utime.ticks_ms()
+        self.scans += 1
+        self.scan_duration_ms = utime.ticks_diff(now, start)
+        self.last_scan_ms = now
+        for net in results:
+            info = parse_scan_result(net)
+            if info is None:
+                continue
+            entry = self._entries.get(info["bssid"])
+            if entry is None:
+                entry = info
+                entry["rssi_history"] = []
+                entry["seen"] = 0
+                self._entries[info["bssid"]] = entry
+            else:
+                entry.update(info)
+            entry["rssi_history"].append(info["rssi"])
+            if len(entry["rssi_history"]) > self.history:
+                entry["rssi_history"].pop(0)
+            entry["seen"] += 1
+            entry["last_seen"] = now
+        self._expire(now)
+        self._version += 1
+
+    def _expire(self, now: int) -> None:
+        expired = [
+            bssid
+            for bssid, entry in self._entries.items()
+            if utime.ticks_diff(now, entry["last_seen"]) > self.ttl_ms
+        ]
+        for bssid in expired:
+            del self._entries[bssid]
+        if expired:
+            self._version += 1
+
+    async def refresh(self, force: bool = False) -> None:
+        """
+        扫描一次并更新缓存；已有扫描在进行时等待它完成，不重复扫描
+
+        Args:
+            force (bool): 为False时距上次扫描不足 min_refresh_ms 则直接返回
+        """
+        if self._scanning is not None:
+            self.joined += 1
+            await self._scanning.wait()
+            return
+        if (
+            not force
+            and self.last_scan_ms is not None
+            and utime.ticks_diff(utime.ticks_ms(), self.last_scan_ms) < self.min_refresh_ms
+        ):
+            self.joined += 1
+            return
+        scanning = asyncio.Event()
+        self._scanning = scanning
+        try:
+            # 先让出一次，同一轮事件循环中到达的请求共用这次扫描
+            await asyncio.sleep_ms(0)
+            # sta.scan() 在固件中阻塞直到扫描结束
+            self._scan()
+        finally:
+            self._scanning = None
+            scanning.set()
+
+    async def run(self) -> None:
+        """
+        后台扫描任务
+        """
+        while True:
+            await self.refresh(force=True)
+            if self.interval_ms <= 0:
+                return
+            await asyncio.sleep_ms(self.interval_ms)
+
+    def networks(self) -> list:
+        """
+        缓存中的网络，按信号强度从强到弱排序
+
+        Returns:
+            list[dict]: 每项包含 ssid、bssid、channel、rssi、security、rssi_history、seen、last_seen
+        """
+        self._expire(utime.ticks_ms())
+        return sorted(self._entries.values(), key=lambda entry: -entry["rssi"])
+
+    def ssids(self) -> list:
+        """
+        缓存中的 SSID，去重后按最强信号排序
+
+        Returns:
+            list[str]: SSID 列表
+        """
+        ssids = []
+        for entry in self.networks():
+            if entry["ssid"] not in ssids:
+                ssids.append(entry["ssid"])
+        return ssids
+
+    def snapshot(self, detail: bool = False) -> str:
+        """
+        缓存内容的JSON，内容不变时返回同一个字符串
+
+        Args:
+            detail (bool): 为True时返回每个 BSSID 的详细信息，否则只返回 SSID 列表
+
+        Returns:
+            str: JSON字符串
+        """
+        now = utime.ticks_ms()
+        self._expire(now)
+        cached = self._snapshots.get(detail)
+        if cached is not None and cached[0] == self._version:
+            return cached[1]
+        if detail:
+            data = [
+                {
+                    "ssid": entry["ssid"],
+                    "bssid": entry["bssid"],
+                    "channel": entry["channel"],
+                    "rssi": entry["rssi"],
+                    "rssi_avg": sum(entry["rssi_history"]) // len(entry["rssi_history"]),
+                    "security": entry["security"],
+                    "seen": entry["seen"],
+                }
+                for entry in self.networks()
+            ]
+        else:
+            data = self.ssids()
+        text = json.dumps(data)
+        self._snapshots[detail] = (self._version, text)
+        return text
+
+    def stats(self) -> dict:
+        """
+        获取统计信息
+
+        Returns:
+            dict: 包含扫描次数、合并的刷新请求数、失败次数、上次扫描耗时和缓存的 BSSID 数
+        """
+        return {
+            "scans": self.scans,
+            "joined": self.joined,
+            "failures": self.failures,
+            "scan_duration_ms": self.scan_duration_ms,
+            "entries": len(self._entries),
+        }
@@ -58,47 +58,72 @@ def initialize_yolo(CONFIG: dict) -> YOLOv8:
     return yolo
 
 
-def process_frame(yolo: YOLOv8, pl: PipeLine, CONFIG: dict) -> tuple:
+def run_inference(yolo: YOLOv8, img) -> tuple:
     """
-    处理当前帧，返回检测结果和物体数量
+    对单帧图像执行推理
 
     参数：
         yolo: YOLOv8模型实例
-        pl: PipeLine管道实例
-        CONFIG: 配置字典
+        img: 由PipeLine获取的当前帧
     返回：
-        检测结果列表，FPS值，当前帧图像
+        原始推理结果，FPS值
     """
-    img = pl.get_frame()
-    if img is None:
-        logging("Unable to capture frame.")
-        return []
-    fps = 0
     clock = utime.clock()
     clock.tick()
     result = yolo.run(img)
-    fps = clock.fps()
-    # logging(f"YOLO run result: {result}", log_name=LOGNAME)  # 添加日志记录返回值
+    return result, clock.fps()
 
-    # 解析结果
-    if len(result) == 0:
-        return [], fps, img  # 返回检测结果、FPS 和当前帧
 
+def parse_result(result, labels: list) -> list:
+    """
+    将 yolo.run 的原始结果转换为检测结果列表
+
+    参数：
+        result: yolo.run 返回的结果，每项为 [x, y, w, h, score, label_id]
+        labels: 标签名称列表
+    返回：
+        检测结果列表
+    """
     detections = []
     for item in result:
         detection = {
-            "label": CONFIG["labels"][int(item[5])],
+            "label": labels[int(item[5])],
             "label_id": int(item[5]),
             "confidence": float(item[4]),
             "bbox": [float(item[0]), float(item[1]), float(item[2]), float(item[3])],
         }
         detections.append(detection)
-    return detections, fps, img  # 返回检测结果、FPS 和当前帧
+    return detections
+
+
+def process_frame(yolo: YOLOv8, pl: PipeLine, CONFIG: dict) -> tuple:
+    """
+    处理当前帧，返回检测结果和物体数量；过滤、画面变化门控等由 DetectionPipeline.infer 完成
+
+    参数：
+        yolo: YOLOv8模型实例
+        pl: PipeLine管道实例
+        CONFIG: 配置字典
+    返回：
+        检测结果列表，FPS值，当前帧图像
+    """
+    img = pl.get_frame()
+    if img is None:
+        logging.warning("Unable to capture frame.", log_name=LOGNAME, every_ms=5000)
+        return [], 0, None
+    result, fps = run_inference(yolo, img)
+    # logging(f"YOLO run result: {result}", log_name=LOGNAME)  # 添加日志记录返回值
+
+    # 解析结果
+    if len(result) == 0:
+        return [], fps, img  # 返回检测结果、FPS 和当前帧
+
+    return parse_result(result, CONFIG["labels"]), fps, img  # 返回检测结果、FPS 和当前帧
 
 
 def calculate_cycle_result(cycle_data: list[int], frame_index: int) -> int:
     """
-    统计周期内物体数量的众数
+    统计周期内物体数量的众数，流式场景请使用 aggregate.WindowAggregator
 
     参数：
         cycle_data: 历史检测结果数据，整数列表
@@ -108,4 +133,10 @@ def calculate_cycle_result(cycle_data: list[int], frame_index: int) -> int:
     """
     if frame_index == 0:
         return 0
-    return max(set(cycle_data[:frame_index]), key=cycle_data[:frame_index].count)
+    # 单次遍历计数，避免切片和 list.count 带来的 O(n²)；
+    # 众数相同时与原实现一样取集合遍历顺序中的第一个
+    counts = {}
+    for i in range(min(frame_index, len(cycle_data))):
+        value = cycle_data[i]
+        counts[value] = counts.get(value, 0) + 1
+    return max(set(counts), key=counts.get)
@@ -0,0 +1,113 @@
+"""
+对比 calculate_cycle_result 与 WindowAggregator 的耗时
+
+模拟按帧到达的检测结果，每帧都求窗口内物体数量的众数：
+- legacy：原始实现，对切片调用 list.count，O(n²)
+- cycle_result：当前的 calculate_cycle_result，单次遍历 O(n)，众数相同时取值与 legacy 相同
+- aggregator：WindowAggregator 的滑动窗口，增量更新
+
+用法：
+    python3 tools/bench_aggregate.py --window 100 --frames 2000
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "tools", "fakes"))
+sys.path.insert(0, ROOT)
+
+from src.services.aggregate import WindowAggregator  # noqa: E402
+from src.services.detections import DetectionBuffer  # noqa: E402
+from src.services.yolo import calculate_cycle_result  # noqa: E402
+
+LABELS = ["person", "bicycle", "car"]
+
+
+def legacy_cycle_result(cycle_data: list, frame_index: int) -> int:
+    if frame_index == 0:
+        return 0
+    return max(set(cycle_data[:frame_index]), key=cycle_data[:frame_index].count)
+
+
+def make_frames(n: int, max_boxes: int) -> list:
+    rng = random.Random(0)
+    frames = []
+    for _ in range(n):
+        count = rng.randint(0, max_boxes)
+        frames.append(
+            [
+                [10.0, 10.0, 20.0, 20.0, rng.random(), rng.randrange(len(LABELS))]
+                for _ in range(count)
+            ]
+        )
+    return frames
+
+
+def run_list(frames: list, window: int, func) -> tuple:
+    cycle_data = [0] * window
+    modes = []
+    start = time.perf_counter()
+    for i, result in enumerate(frames):
+        cycle_data[i % window] = len(result)
+        modes.append(func(cycle_data, min(i + 1, window)))
+    return time.perf_counter() - start, modes
+
+
+def run_aggregator(frames: list, window: int, max_boxes: int) -> tuple:
+    aggregator = WindowAggregator(
+        {"window": window, "mode": "sliding", "slide": 1}, LABELS, max_boxes
+    )
+    buffer = DetectionBuffer(max_boxes, LABELS)
+    modes = []
+    start = time.perf_counter()
+    for result in frames:
+        buffer.fill(result)
+        aggregator.add(buffer)
+        modes.append(aggregator.count_mode())
+    return time.perf_counter() - start, modes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--window", type=int, default=100)
+    parser.add_argument("--frames", type=int, default=2000)
+    parser.add_argument("--max-boxes", type=int, default=10)
+    args = parser.parse_args()
+
+    frames = make_frames(args.frames, args.max_boxes)
+    results = {
+        "legacy": run_list(frames, args.window, legacy_cycle_result),
+        "cycle_result": run_list(frames, args.window, calculate_cycle_result),
+        "aggregator": run_aggregator(frames, args.window, args.max_boxes),
+    }
+    for name, (elapsed, _) in results.items():
+        print(f"{name:>12}: {elapsed * 1e6 / args.frames:8.1f} us/frame")
+
+    # calculate_cycle_result 与原实现逐帧相同；聚合器在众数相同时取最小值，只比较出现次数
+    def occurrences(i, mode):
+        window = [len(r) for r in frames[max(0, i + 1 - args.window) : i + 1]]
+        return window.count(mode)
+
+    legacy_modes = results["legacy"][1]
+    same = results["cycle_result"][1] == legacy_modes
+    print(f"{'cycle_result':>12}: {'matches' if same else 'DIFFERS from'} legacy")
+    same = all(
+        occurrences(i, a) == occurrences(i, b)
+        for i, (a, b) in enumerate(zip(legacy_modes, results["aggregator"][1]))
+    )
+    print(f"{'aggregator':>12}: {'matches' if same else 'DIFFERS from'} legacy")
+
+    # 众数相同时的取值
+    ties = ([2, 2, 1, 1], [3, 1, 3, 1], [0, 5, 5, 0, 7, 7], [4, 4, 9, 9, 1])
+    same = all(
+        calculate_cycle_result(data, len(data)) == legacy_cycle_result(data, len(data))
+        for data in ties
+    )
+    print(f"{'ties':>12}: {'matches' if same else 'DIFFERS from'} legacy")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""
+在主机上用替身对象运行 main.main_task，测量启动各阶段耗时和首帧时间
+
+第一次启动没有记录上次成功的网络，需要扫描；配置中第一个网络不在范围内。
+连接成功后 wifi.last_good 写入配置，第二次启动（模拟重启）跳过扫描直接连接。
+两次启动中模型初始化都与 WiFi 关联并行进行。
+
+用法：
+    python3 tools/bench_boot.py --init-ms 2500 --create-ms 800 --scan-ms 1500
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "tools", "fakes"))
+sys.path.insert(0, ROOT)
+
+import network  # noqa: E402
+import uasyncio as asyncio  # noqa: E402
+from libs.PipeLine import PipeLine  # noqa: E402
+from libs.YOLO import YOLOv8  # noqa: E402
+from tools.fake_broker import FakeBroker  # noqa: E402
+
+# CanMV 的 os 和 time 扩展
+os.exitpoint = lambda *args: None
+os.EXITPOINT_ENABLE_SLEEP = 0
+time.sleep_ms = lambda ms: time.sleep(ms / 1000)
+
+import main  # noqa: E402
+from src.services import config as config_module  # noqa: E402
+from src.services.boottime import BootTimer  # noqa: E402
+
+
+def write_config(path: str, port: int) -> None:
+    config = {
+        "wifi": {
+            "enabled": True,
+            "networks": [
+                {"enabled": True, "ssid": "office", "password": "p1"},
+                {"enabled": True, "ssid": "home", "password": "p3"},
+            ],
+        },
+        "yolo": {
+            "labels": ["person", "bicycle", "car"],
+            "rgb888p_size": [640, 480],
+            "kmodel_path": "/sdcard/yolov8n_320.kmodel",
+            "model_input_size": [320, 320],
+            "display_size": [1920, 1080],
+            "display_mode": "hdmi",
+            "conf_thresh": 0.5,
+            "nms_thresh": 0.45,
+            "max_boxes_num": 50,
+            "debug_mode": 0,
+        },
+        "mqtt": {
+            "enabled": True,
+            "broker": "127.0.0.1",
+            "port": port,
+            "topic_detection": "/yolo/detection",
+            "client_id": "bench",
+        },
+        "ntptime": {"enabled": False},
+    }
+    with open(path, "w") as f:
+        json.dump(config, f)
+
+
+async def boot(path: str) -> BootTimer:
+    # 模拟重启：清空内存中的配置和无线状态，重新开始计时
+    config_module._stores.clear()
+    network.drop_link()
+    main.BOOT = BootTimer()
+    task = asyncio.create_task(main.main_task(path))
+    start = time.monotonic()
+    while not main.BOOT.reported and time.monotonic() - start < 60:
+        await asyncio.sleep(0.05)
+    task.cancel()
+    try:
+        await task
+    except asyncio.CancelledError:
+        pass
+    return main.BOOT
+
+
+def main_bench():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--init-ms", type=int, default=2500, help="每个模型的初始化耗时")
+    parser.add_argument("--create-ms", type=int, default=800, help="显示管道的初始化耗时")
+    parser.add_argument("--scan-ms", type=int, default=1500, help="一次WiFi扫描的耗时")
+    parser.add_argument("--assoc-ms", type=int, default=1500, help="WiFi关联的耗时")
+    args = parser.parse_args()
+
+    YOLOv8.init_ms = args.init_ms
+    PipeLine.create_ms = args.create_ms
+    network.scan_ms = args.scan_ms
+    network.set_networks([network.AccessPoint("home", "p3", rssi=-55, assoc_ms=args.assoc_ms)])
+
+    broker = FakeBroker()
+    port = broker.start()
+    path = os.path.join(tempfile.mkdtemp(prefix="boot_"), "config.json")
+    write_config(path, port)
+
+    results = []
+    for name in ("cold", "warm"):
+        timer = asyncio.run(boot(path))
+        results.append((name, timer))
+    broker.stop()
+
+    with open(path) as f:
+        print(f"last_good: {json.load(f)['wifi'].get('last_good')}")
+    # 第二次启动的快速路径应带上记录的接入点和信道
+    print(f"warm connect hints: {network.stats()['last_hints']}")
+    for name, timer in results:
+        phases = ", ".join(f"{phase} {ms}" for phase, ms in timer.phases)
+        print(f"{name}: first frame after {timer.total_ms()} ms ({phases})")
+
+
+if __name__ == "__main__":
+    main_bench()
@@ -0,0 +1,171 @@
+"""
+在主机上用本地UDP客户端测试强制门户的 DNSServer
+
+先检查解析结果（ap.net 和任意域名的A记录、AAAA空应答、非门户模式下的NXDOMAIN、
+格式错误的数据包不回复），再测量空闲时的CPU占用，最后由多个客户端并发发送查询，
+每个客户端保持固定数量的未完成请求，输出每秒查询数。
+
+用法：
+    python3 tools/bench_dns.py --queries 20000 --clients 4 --window 16
+"""
+import argparse
+import os
+import socket
+import struct
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "tools", "fakes"))
+sys.path.insert(0, ROOT)
+
+import uasyncio as asyncio  # noqa: E402
+from src.services.dns import DNSServer, QTYPE_A, QTYPE_AAAA  # noqa: E402
+
+HOST_IP = "192.168.4.1"
+NAMES = ["ap.net", "connectivitycheck.gstatic.com", "captive.apple.com", "www.msftconnecttest.com"]
+
+
+def free_port() -> int:
+    s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    s.bind(("127.0.0.1", 0))
+    port = s.getsockname()[1]
+    s.close()
+    return port
+
+
+def build_query(query_id: int, name: str, qtype: int = QTYPE_A) -> bytes:
+    qname = b"".join(bytes([len(label)]) + label.encode() for label in name.split(".")) + b"\x00"
+    # RD=1，附带一个 EDNS 的 OPT 记录
+    opt = b"\x00" + struct.pack("!HHIH", 41, 1232, 0, 0)
+    return struct.pack("!HHHHHH", query_id, 0x0100, 1, 0, 0, 1) + qname + struct.pack("!HH", qtype, 1) + opt
+
+
+def parse_response(data: bytes) -> tuple:
+    query_id, flags, _, ancount = struct.unpack_from("!HHHH", data)
+    ip = None
+    if ancount:
+        ip = socket.inet_ntoa(data[-4:])
+    return query_id, flags & 0xF, ancount, ip
+
+
+class Client(asyncio.DatagramProtocol):
+    def __init__(self, total: int, window: int, name: str, done):
+        self.total = total
+        self.window = window
+        self.query = build_query(0, name)
+        self.sent = 0
+        self.received = 0
+        self.done = done
+
+    def connection_made(self, transport):
+        self.transport = transport
+        for _ in range(self.window):
+            self.send()
+
+    def send(self):
+        if self.sent < self.total:
+            self.transport.sendto(struct.pack("!H", self.sent & 0xFFFF) + self.query[2:])
+            self.sent += 1
+
+    def datagram_received(self, data, addr):
+        self.received += 1
+        if self.received >= self.total:
+            self.done.set_result(None)
+        else:
+            self.send()
+
+
+async def ask(port: int, packet: bytes, timeout: float = 0.5):
+    loop = asyncio.get_event_loop()
+    done = loop.create_future()
+
+    class Once(asyncio.DatagramProtocol):
+        def datagram_received(self, data, addr):
+            if not done.done():
+                done.set_result(data)
+
+    transport, _ = await loop.create_datagram_endpoint(Once, remote_addr=("127.0.0.1", port))
+    transport.sendto(packet)
+    try:
+        return await asyncio.wait_for(done, timeout)
+    except asyncio.TimeoutError:
+        return None
+    finally:
+        transport.close()
+
+
+async def checks(port: int, strict_port: int) -> dict:
+    result = {}
+    for name in ("ap.net", "AP.Net", "connectivitycheck.gstatic.com"):
+        result[f"A {name}"] = parse_response(await ask(port, build_query(7, name)))
+    result["AAAA ap.net"] = parse_response(await ask(port, build_query(8, "ap.net", QTYPE_AAAA)))
+    result["strict ap.net"] = parse_response(await ask(strict_port, build_query(9, "ap.net")))
+    result["strict other"] = parse_response(await ask(strict_port, build_query(10, "example.com")))
+    result["malformed"] = await ask(port, b"\x00\x01\x01\x00\x00\x01" + b"\x00" * 6 + b"\xc0\x0c", 0.2)
+    return result
+
+
+async def bench(args) -> dict:
+    port, strict_port = free_port(), free_port()
+    server = DNSServer(HOST_IP, config={"host": "127.0.0.1", "port": port})
+    strict = DNSServer(HOST_IP, config={"host": "127.0.0.1", "port": strict_port, "wildcard": False})
+    tasks = [asyncio.create_task(server.start()), asyncio.create_task(strict.start())]
+    await asyncio.sleep(0.05)
+    result = {"checks": await checks(port, strict_port)}
+
+    # 空闲时应当挂起等待，不应轮询
+    cpu = time.process_time()
+    await asyncio.sleep(1)
+    result["idle_cpu_ms"] = (time.process_time() - cpu) * 1000
+
+    loop = asyncio.get_event_loop()
+    per_client = args.queries // args.clients
+    futures = []
+    transports = []
+    start = time.monotonic()
+    for i in range(args.clients):
+        done = loop.create_future()
+        futures.append(done)
+        transport, _ = await loop.create_datagram_endpoint(
+            lambda: Client(per_client, args.window, NAMES[i % len(NAMES)], done),
+            remote_addr=("127.0.0.1", port),
+        )
+        transports.append(transport)
+    try:
+        await asyncio.wait_for(asyncio.gather(*futures), 30)
+    except asyncio.TimeoutError:
+        result["timeout"] = True
+    elapsed = time.monotonic() - start
+    for transport in transports:
+        transport.close()
+    result["qps"] = server.stats()["answered"] / elapsed
+    result["server"] = server.stats()
+    result["strict"] = strict.stats()
+
+    for task in tasks:
+        task.cancel()
+    server.stop()
+    strict.stop()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--queries", type=int, default=20000)
+    parser.add_argument("--clients", type=int, default=4)
+    parser.add_argument("--window", type=int, default=16, help="每个客户端未完成的请求数")
+    args = parser.parse_args()
+
+    result = asyncio.run(bench(args))
+    print("checks (id, rcode, answers, ip):")
+    for name, value in result["checks"].items():
+        print(f"    {name}: {value}")
+    print(f"idle cpu:  {result['idle_cpu_ms']:.1f} ms in 1 s")
+    print(f"throughput: {result['qps']:.0f} queries/s")
+    print(f"server:    {result['server']}")
+    print(f"strict:    {result['strict']}")
+
+
+if __name__ == "__main__":
+    main()
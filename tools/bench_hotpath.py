@@ -0,0 +1,216 @@
+"""
+热路径基准：在 CPython 上用替身模块回放检测结果，逐阶段测量延迟分布、内存分配和吞吐量
+
+覆盖的阶段：
+- process_frame：逐帧生成字典列表的原始路径，作为对照
+- pipeline：DetectionPipeline 的采集与推理阶段（可选过滤、画面变化门控）和后处理阶段
+- serialize：json、json_compact、binary 三种消息体格式
+- publish：同步发布到 tools/fake_broker.py，以及异步模式的入队
+
+用法：
+    python3 tools/bench_hotpath.py --boxes 20 --iterations 2000
+    python3 tools/bench_hotpath.py --record replay.json --frames 500 --boxes 30
+    python3 tools/bench_hotpath.py --replay replay.json
+"""
+import argparse
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "tools", "fakes"))
+sys.path.insert(0, ROOT)
+
+from libs.PipeLine import PipeLine  # noqa: E402
+from libs.YOLO import YOLOv8  # noqa: E402
+from src.services.mqtt import MQTTPublish  # noqa: E402
+from src.services.pipeline import DetectionPipeline  # noqa: E402
+from src.services.payload import PAYLOAD_FORMATS, PayloadEncoder  # noqa: E402
+from src.services.yolo import process_frame  # noqa: E402
+from tools.fake_broker import FakeBroker  # noqa: E402
+
+LABELS = ["person", "bicycle", "car", "motorcycle", "bus", "truck"]
+BUCKETS_US = (10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000)
+
+
+class Histogram:
+    def __init__(self, buckets=BUCKETS_US):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.samples = []
+
+    def add(self, value_us: float) -> None:
+        self.samples.append(value_us)
+        for i, bound in enumerate(self.buckets):
+            if value_us <= bound:
+                self.counts[i] += 1
+                return
+        self.counts[-1] += 1
+
+    def percentile(self, p: float) -> float:
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * p))] if ordered else 0.0
+
+    def render(self) -> str:
+        labels = [f"<={b}" for b in self.buckets] + [f">{self.buckets[-1]}"]
+        return " ".join(f"{label}:{count}" for label, count in zip(labels, self.counts) if count)
+
+
+def measure(name: str, func, iterations: int) -> dict:
+    """
+    执行 func 多次，返回延迟分布、吞吐量和内存分配统计
+    """
+    for _ in range(min(50, iterations)):
+        func()
+
+    hist = Histogram()
+    start = time.perf_counter()
+    for _ in range(iterations):
+        t0 = time.perf_counter_ns()
+        func()
+        hist.add((time.perf_counter_ns() - t0) / 1000)
+    elapsed = time.perf_counter() - start
+
+    # 单独一轮统计内存分配，避免 tracemalloc 的开销影响计时
+    tracemalloc.start()
+    peak_total = 0
+    before = tracemalloc.take_snapshot()
+    for _ in range(min(200, iterations)):
+        tracemalloc.reset_peak()
+        base = tracemalloc.get_traced_memory()[0]
+        func()
+        peak_total += tracemalloc.get_traced_memory()[1] - base
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    diff = after.compare_to(before, "filename")
+    retained_blocks = sum(stat.count_diff for stat in diff if stat.count_diff > 0)
+
+    return {
+        "stage": name,
+        "throughput": iterations / elapsed,
+        "p50_us": hist.percentile(0.5),
+        "p99_us": hist.percentile(0.99),
+        "peak_bytes_per_call": peak_total / min(200, iterations),
+        "retained_blocks": retained_blocks,
+        "histogram": hist.render(),
+    }
+
+
+def run(args) -> list:
+    YOLOv8.infer_ms = 0
+    YOLOv8.boxes_per_frame = args.boxes
+    if args.replay:
+        frames = YOLOv8.load_replay(args.replay)
+        print(f"replaying {frames} frames from {args.replay}")
+    else:
+        YOLOv8.replay_frames = YOLOv8.synthesize(500, args.boxes, len(LABELS))
+
+    config = {"labels": LABELS, "max_boxes_num": args.max_boxes, "rgb888p_size": [640, 480]}
+    pl = PipeLine()
+    yolo = YOLOv8(labels=LABELS, max_boxes_num=args.max_boxes)
+    filter_config = {
+        "enabled": True,
+        "min_area": 400,
+        "rois": [{"points": [[0, 0], [640, 0], [640, 360], [0, 360]], "labels": ["person"]}],
+    }
+    pipelines = [
+        ("pipeline:infer", DetectionPipeline(pl, yolo, config)),
+        ("pipeline:infer+filter", DetectionPipeline(pl, yolo, config, filter_config=filter_config)),
+        ("pipeline:infer+motion", DetectionPipeline(pl, yolo, config, motion_config={"enabled": True})),
+    ]
+
+    results = [
+        measure("process_frame:dicts", lambda: process_frame(yolo, pl, config), args.iterations),
+    ]
+    for name, pipeline in pipelines:
+        # 推理队列按 drop_oldest 丢弃，无需消费
+        results.append(measure(name, pipeline._capture_and_infer, args.iterations))
+
+    # 后处理与序列化使用最大框数的帧，反映最坏情况
+    pipeline = pipelines[0][1]
+    densest = max(YOLOv8.replay_frames, key=len)
+
+    def postprocess():
+        # 与 _postprocess_stage 相同：从池中取出缓冲区并写入原始结果
+        buffer = pipeline.detection_pool.acquire()
+        buffer.fill(densest)
+        return buffer
+
+    results.append(measure("pipeline:postprocess", postprocess, args.iterations))
+    buffer = postprocess()
+    for payload_format in PAYLOAD_FORMATS:
+        encoder = PayloadEncoder(payload_format, "bench", args.max_boxes)
+        results.append(
+            measure(
+                f"serialize:{payload_format}",
+                lambda: encoder.encode(buffer, 25.0, 1700000000),
+                args.iterations,
+            )
+        )
+
+    payload = PayloadEncoder("json", "bench", args.max_boxes).encode(buffer, 25.0)
+    broker = FakeBroker()
+    port = broker.start()
+    mqtt_config = {
+        "broker": "127.0.0.1",
+        "port": port,
+        "topic_detection": "/yolo/detection",
+        "client_id": "bench",
+    }
+    sync_client = MQTTPublish(mqtt_config)
+    sync_client.connect()
+    results.append(
+        measure("publish:sync", lambda: sync_client.publish("/bench", payload), args.iterations)
+    )
+    sync_client.disconnect()
+    async_client = MQTTPublish(dict(mqtt_config, async_publish=True, queue_size=64))
+    results.append(
+        measure(
+            "publish:enqueue",
+            lambda: async_client.enqueue("/bench", payload, True),
+            args.iterations,
+        )
+    )
+    broker.stop()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--iterations", type=int, default=1000)
+    parser.add_argument("--boxes", type=int, default=10, help="合成数据每帧最多的框数")
+    parser.add_argument("--max-boxes", type=int, default=100, help="max_boxes_num")
+    parser.add_argument("--replay", help="回放录制的检测结果 JSON 文件")
+    parser.add_argument("--record", help="生成合成检测结果并写入 JSON 文件后退出")
+    parser.add_argument("--frames", type=int, default=500, help="--record 生成的帧数")
+    parser.add_argument("--json", action="store_true", help="以 JSON 输出结果")
+    args = parser.parse_args()
+
+    if args.record:
+        frames = YOLOv8.synthesize(args.frames, args.boxes, len(LABELS))
+        with open(args.record, "w") as f:
+            json.dump(frames, f)
+        print(f"wrote {len(frames)} frames to {args.record}")
+        return
+
+    results = run(args)
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print(
+        f"{'stage':<24}{'ops/s':>10}{'p50 us':>10}{'p99 us':>10}{'peak B':>10}{'kept':>6}"
+    )
+    for r in results:
+        print(
+            f"{r['stage']:<24}{r['throughput']:>10.0f}{r['p50_us']:>10.1f}"
+            f"{r['p99_us']:>10.1f}{r['peak_bytes_per_call']:>10.0f}{r['retained_blocks']:>6}"
+        )
+    print()
+    for r in results:
+        print(f"{r['stage']:<24}{r['histogram']}")
+
+
+if __name__ == "__main__":
+    main()
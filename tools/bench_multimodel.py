@@ -0,0 +1,106 @@
+"""
+在 Linux 主机上用替身模型驱动多模型调度，检查各模型的实际帧率、顺延次数和子主题消息数
+
+用法：
+    python3 tools/bench_multimodel.py --seconds 5 --budget-ms 120
+"""
+import argparse
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "tools", "fakes"))
+sys.path.insert(0, ROOT)
+
+import uasyncio as asyncio  # noqa: E402
+from libs.PipeLine import PipeLine  # noqa: E402
+from libs.YOLO import YOLOv8  # noqa: E402
+from src.services.metrics import REGISTRY  # noqa: E402
+from src.services.mqtt import MQTTPublish  # noqa: E402
+from src.services.pipeline import DetectionPipeline  # noqa: E402
+from src.services.multimodel import ModelScheduler, ModelSlot  # noqa: E402
+from tools.fake_broker import FakeBroker  # noqa: E402
+
+# 名称, 标签, 目标帧率, 优先级, 模拟推理耗时
+MODELS = [
+    ("person", ["person"], 5, 1, 30),
+    ("vehicle", ["car", "truck", "plate"], 1, 0, 150),
+]
+
+
+async def bench(args) -> dict:
+    broker = FakeBroker()
+    port = broker.start()
+    mqtt_client = MQTTPublish(
+        {
+            "broker": "127.0.0.1",
+            "port": port,
+            "topic_detection": "/yolo/detection",
+            "client_id": "bench",
+            "async_publish": True,
+        }
+    )
+    mqtt_client.connect()
+
+    slots = []
+    for name, labels, fps, priority, infer_ms in MODELS:
+        model = YOLOv8(labels=labels, max_boxes_num=20)
+        model.infer_ms = infer_ms * args.slowdown
+        config = {"labels": labels, "max_boxes_num": 20, "target_fps": fps}
+        pipeline = DetectionPipeline(
+            PipeLine(),
+            model,
+            config,
+            mqtt_client=mqtt_client,
+            topic=f"/yolo/detection/bench/{name}",
+            client_id="bench",
+            name=name,
+        )
+        slots.append(ModelSlot(name, pipeline, priority))
+
+    scheduler = ModelScheduler(PipeLine(), slots, {"frame_budget_ms": args.budget_ms})
+    scheduler.start()
+    await asyncio.sleep(args.seconds)
+    stats = scheduler.stats()
+    # 各模型的指标按名称前缀分开统计
+    snapshot = REGISTRY.snapshot()
+    stats["metrics"] = {
+        name: (
+            snapshot["histograms"][f"{name}_inference_us"]["count"],
+            snapshot["gauges"][f"{name}_frames_published"],
+        )
+        for name, _, _, _, _ in MODELS
+    }
+    scheduler.stop()
+    await asyncio.sleep(0.2)
+    mqtt_client.disconnect()
+    broker.stop()
+    stats["topics"] = {}
+    for topic, _ in broker.messages:
+        stats["topics"][topic] = stats["topics"].get(topic, 0) + 1
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--seconds", type=float, default=5)
+    parser.add_argument("--budget-ms", type=int, default=0, help="每帧推理预算，0表示不限")
+    parser.add_argument("--slowdown", type=float, default=1, help="模拟推理耗时的倍数")
+    args = parser.parse_args()
+
+    stats = asyncio.run(bench(args))
+    print(f"frames:     {stats['frames']}")
+    for name, model in stats["models"].items():
+        rate = model["runs"] / args.seconds
+        print(f"{name:>10}: {rate:.2f} runs/s {model}")
+    for name, (inferences, published) in stats["metrics"].items():
+        print(
+            f"{name:>10}: metrics {name}_inference_us count {inferences}, "
+            f"{name}_frames_published {published}"
+        )
+    for topic, count in sorted(stats["topics"].items()):
+        print(f"{topic}: {count} messages")
+
+
+if __name__ == "__main__":
+    main()
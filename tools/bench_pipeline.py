@@ -0,0 +1,165 @@
+"""
+在 Linux 主机上用替身对象驱动检测流水线，测量端到端吞吐量和队列深度
+
+用法：
+    python3 tools/bench_pipeline.py --seconds 5 --infer-ms 20 --publish-ms 300
+"""
+import argparse
+import json
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "tools", "fakes"))
+sys.path.insert(0, ROOT)
+
+import uasyncio as asyncio  # noqa: E402
+from libs.PipeLine import PipeLine  # noqa: E402
+from libs.YOLO import YOLOv8  # noqa: E402
+from libs.umqtt.simple import MQTTClient  # noqa: E402
+from src.services.mqtt import MQTTPublish  # noqa: E402
+from src.services.pipeline import DetectionPipeline  # noqa: E402
+from tools.fake_broker import FakeBroker  # noqa: E402
+from tools.payload_decoder import split_snapshot_chunks  # noqa: E402
+
+YOLO_CONFIG = {
+    "labels": ["person", "bicycle", "car"],
+    "max_boxes_num": 100,
+    "rgb888p_size": [640, 480],
+}
+MQTT_CONFIG = {
+    "broker": "127.0.0.1",
+    "port": 1883,
+    "topic_detection": "/yolo/detection",
+    "client_id": "bench",
+}
+
+
+async def bench(args) -> dict:
+    YOLOv8.infer_ms = args.infer_ms
+    YOLOv8.boxes_per_frame = args.boxes
+    PipeLine.camera_fps = args.camera_fps
+    PipeLine.motion_ratio = args.motion_ratio
+    if args.replay:
+        YOLOv8.load_replay(args.replay)
+    MQTTClient.publish_ms = args.publish_ms
+
+    yolo_config = dict(YOLO_CONFIG, target_fps=args.target_fps, adaptive_fps=args.adaptive)
+    broker = FakeBroker()
+    port = broker.start()
+    mqtt_config = dict(
+        MQTT_CONFIG,
+        port=port,
+        async_publish=args.async_publish,
+        batch_max=args.batch_max,
+        batch_interval_ms=args.batch_interval_ms,
+    )
+    mqtt_client = MQTTPublish(mqtt_config)
+    mqtt_client.connect()
+    snapshot_config = {}
+    if args.snapshot:
+        with open(args.snapshot) as f:
+            snapshot_config = dict(json.load(f), enabled=True)
+    filter_config = {}
+    if args.filter:
+        with open(args.filter) as f:
+            filter_config = dict(json.load(f), enabled=True)
+    pipeline = DetectionPipeline(
+        PipeLine(),
+        YOLOv8(**YOLO_CONFIG),
+        yolo_config,
+        mqtt_client=mqtt_client,
+        topic="/yolo/detection/bench",
+        client_id="bench",
+        payload_format=args.payload_format,
+        config={"queue_size": args.queue_size, "drop_policy": args.drop_policy},
+        gc_config={"mode": args.gc_mode},
+        tracker_config={"enabled": args.tracker},
+        metrics_config={
+            "enabled": args.metrics_interval_ms > 0,
+            "interval_ms": args.metrics_interval_ms,
+            "http_port": args.metrics_port,
+        },
+        filter_config=filter_config,
+        motion_config={"enabled": args.motion, "mode": args.motion_mode},
+        snapshot_config=snapshot_config,
+    )
+    pipeline.start()
+    await asyncio.sleep(args.seconds)
+    stats = pipeline.stats()
+    pipeline.stop()
+    mqtt_client.disconnect()
+    broker.stop()
+    stats["broker_messages"] = len(broker.messages)
+    stats["broker_topics"] = {}
+    for topic, _ in broker.messages:
+        stats["broker_topics"][topic] = stats["broker_topics"].get(topic, 0) + 1
+    if args.snapshot:
+        # 按分块头中的长度拆分并重组，检查每张截图都能完整还原
+        parts = {}
+        for topic, message in broker.messages:
+            if topic.endswith("/snapshot"):
+                for snapshot_id, index, count, data in split_snapshot_chunks(message):
+                    parts.setdefault(snapshot_id, [count, {}])[1][index] = data
+        stats["snapshots_rebuilt"] = sum(
+            1 for count, chunks in parts.values() if len(chunks) == count
+        )
+    metrics = [m for t, m in broker.messages if t.endswith("/metrics")]
+    if metrics:
+        stats["metrics"] = metrics[-1].decode()
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--seconds", type=float, default=5)
+    parser.add_argument("--infer-ms", type=float, default=20)
+    parser.add_argument("--publish-ms", type=float, default=50)
+    parser.add_argument("--target-fps", type=float, default=10)
+    parser.add_argument("--adaptive", action="store_true")
+    parser.add_argument("--async-publish", action="store_true")
+    parser.add_argument("--batch-max", type=int, default=1)
+    parser.add_argument("--batch-interval-ms", type=int, default=0)
+    parser.add_argument("--payload-format", default="json")
+    parser.add_argument("--tracker", action="store_true")
+    parser.add_argument("--metrics-interval-ms", type=int, default=0)
+    parser.add_argument("--metrics-port", type=int, default=0)
+    parser.add_argument("--gc-mode", default="frames")
+    parser.add_argument("--boxes", type=int, default=3)
+    parser.add_argument("--camera-fps", type=float, default=0, help="摄像头帧率，0表示不限")
+    parser.add_argument("--replay", help="回放录制的检测结果 JSON 文件")
+    parser.add_argument("--queue-size", type=int, default=4)
+    parser.add_argument("--drop-policy", default="drop_oldest")
+    parser.add_argument("--filter", help="检测框过滤配置 JSON 文件，见 DetectionFilter")
+    parser.add_argument("--snapshot", help="截图配置 JSON 文件，见 Snapshotter")
+    parser.add_argument("--motion", action="store_true", help="开启画面变化门控")
+    parser.add_argument("--motion-mode", default="diff")
+    parser.add_argument(
+        "--motion-ratio", type=float, default=1.0, help="替身摄像头中有移动目标的帧所占比例"
+    )
+    args = parser.parse_args()
+
+    stats = asyncio.run(bench(args))
+    print(f"captured:   {stats['captured']}")
+    print(f"published:  {stats['published']}")
+    print(f"throughput: {stats['throughput']:.2f} frames/s")
+    print(f"scheduler:  {stats['scheduler']}")
+    print(f"gc:         {stats['gc']}")
+    for name in ("infer", "post", "out"):
+        print(f"{name:>6} queue: {stats[name]}")
+    print(f"mqtt:       {stats['mqtt']}")
+    print(f"tracker:    {stats['tracker']}")
+    print(f"filter:     {stats['filter']}")
+    print(f"motion:     {stats['motion']}")
+    print(f"snapshot:   {stats['snapshot']}")
+    if "snapshots_rebuilt" in stats:
+        print(f"snapshots rebuilt from chunks: {stats['snapshots_rebuilt']}")
+    print(f"broker received {stats['broker_messages']} messages")
+    for topic, count in sorted(stats["broker_topics"].items()):
+        print(f"  {topic}: {count}")
+    if "metrics" in stats:
+        print(f"last metrics snapshot: {stats['metrics']}")
+
+
+if __name__ == "__main__":
+    main()
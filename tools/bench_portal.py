@@ -0,0 +1,367 @@
+"""
+在主机上对配网门户的 HTTP 服务器做并发压测
+
+多个客户端并发地在保持连接上循环请求页面和接口（收到 503 时稍后重试），
+同时有一个只发送半个请求头的慢速客户端，以及一个超过 1 KB 的 POST 请求体。
+静态文件先用 tools/build_static.py 预先压缩，检查 gzip 响应、ETag/Last-Modified
+条件请求和超出缓存预算的大文件分块发送。扫描列表由扫描服务缓存，
+多个客户端同时请求刷新时只扫描一次。最后比较逐个添加网络和一次批量事务的
+配置写入次数与耗时，并检查无效的批量操作不修改配置、连接顺序遵循 priority。
+输出吞吐量、延迟分位数、503 次数和服务器统计。
+
+用法：
+    python3 tools/bench_portal.py --clients 16 --requests 50 --max-connections 4
+"""
+import argparse
+import gzip
+import json
+import os
+import shutil
+import socket
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "tools", "fakes"))
+sys.path.insert(0, ROOT)
+
+import network  # noqa: E402
+import uasyncio as asyncio  # noqa: E402
+from src.services.ap import WiFiAP  # noqa: E402
+from src.services.config import get_store  # noqa: E402
+from src.services.wifi import WiFiManager  # noqa: E402
+from tools.build_static import build  # noqa: E402
+
+PATHS = ["/", "/api/scanned_networks", "/api/config_file_networks"]
+
+
+def free_port() -> int:
+    s = socket.socket()
+    s.bind(("127.0.0.1", 0))
+    port = s.getsockname()[1]
+    s.close()
+    return port
+
+
+async def read_response(reader) -> tuple:
+    status_line = await reader.readline()
+    if not status_line:
+        raise ConnectionError("closed")
+    status = int(status_line.split()[1])
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b""):
+            break
+        key, _, value = line.decode().partition(":")
+        headers[key.strip().lower()] = value.strip()
+    body = await reader.readexactly(int(headers.get("content-length", 0)))
+    return status, headers, body
+
+
+async def request(
+    reader, writer, method: str, path: str, body: bytes = b"", headers: dict | None = None
+) -> tuple:
+    head = f"{method} {path} HTTP/1.1\r\nHost: ap.net\r\nContent-Length: {len(body)}\r\n"
+    for key, value in (headers or {}).items():
+        head += f"{key}: {value}\r\n"
+    writer.write(head.encode() + b"\r\n" + body)
+    await writer.drain()
+    return await read_response(reader)
+
+
+async def client(port: int, count: int, latencies: list, counters: dict) -> None:
+    done = 0
+    while done < count:
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        try:
+            while done < count:
+                start = time.monotonic()
+                status, headers, _ = await request(reader, writer, "GET", PATHS[done % len(PATHS)])
+                if status == 503:
+                    counters["busy"] += 1
+                    break
+                latencies.append(time.monotonic() - start)
+                counters[status] = counters.get(status, 0) + 1
+                done += 1
+                if headers.get("connection") == "close":
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            counters["reconnects"] += 1
+        writer.close()
+        if done < count:
+            await asyncio.sleep(0.05)
+
+
+async def slow_client(port: int, result: dict) -> None:
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    writer.write(b"GET / HTTP/1.1\r\nHost: ap.net\r\n")
+    await writer.drain()
+    start = time.monotonic()
+    status, _, _ = await read_response(reader)
+    result["slow"] = (status, round(time.monotonic() - start, 2))
+    writer.close()
+
+
+async def oversize_checks(port: int) -> dict:
+    """超长的请求行和请求头不带换行符，服务器读到上限即应答，不等待请求超时"""
+    checks = {}
+    for name, head in (
+        ("request_line", b"GET /" + b"a" * 4096),
+        ("header", b"GET / HTTP/1.1\r\nX-Long: " + b"b" * 4096),
+    ):
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        writer.write(head)
+        await writer.drain()
+        start = time.monotonic()
+        status, _, _ = await read_response(reader)
+        checks[name] = (status, round((time.monotonic() - start) * 1000, 1))
+        writer.close()
+    return checks
+
+
+async def static_checks(port: int, static_dir: str) -> dict:
+    with open(os.path.join(static_dir, "index.html"), "rb") as f:
+        index = f.read()
+    with open(os.path.join(static_dir, "big.js"), "rb") as f:
+        big = f.read()
+    checks = {}
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    status, headers, body = await request(
+        reader, writer, "GET", "/", headers={"Accept-Encoding": "gzip, deflate"}
+    )
+    checks["gzip"] = (
+        status == 200
+        and headers.get("content-encoding") == "gzip"
+        and gzip.decompress(body) == index
+    )
+    checks["gzip_bytes"] = (len(index), len(body))
+    status, _, body = await request(reader, writer, "GET", "/")
+    checks["identity"] = status == 200 and body == index
+    etag = headers["etag"]
+    status, _, body = await request(reader, writer, "GET", "/", headers={"Accept-Encoding": "gzip", "If-None-Match": etag})
+    checks["if_none_match"] = status == 304 and body == b""
+    status, _, _ = await request(
+        reader, writer, "GET", "/", headers={"If-Modified-Since": headers["last-modified"]}
+    )
+    checks["if_modified_since"] = status == 304
+    status, _, body = await request(reader, writer, "GET", "/static/big.js")
+    checks["streamed"] = status == 200 and body == big
+    status, _, _ = await request(reader, writer, "GET", "/static/../config.json")
+    checks["traversal"] = status == 404
+    writer.close()
+    return checks
+
+
+async def scan_checks(port: int, ap: WiFiAP, clients: int) -> dict:
+    async def refresh():
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        result = await request(reader, writer, "GET", "/api/scanned_networks?refresh=1&detail=1")
+        writer.close()
+        return result
+
+    # 等过 min_refresh_ms，刷新请求才会触发扫描
+    await asyncio.sleep(ap.scanner.min_refresh_ms / 1000)
+    scans = ap.scanner.scans
+    start = time.monotonic()
+    responses = await asyncio.gather(*[refresh() for _ in range(clients)])
+    checks = {
+        "refresh_clients": clients,
+        "refresh_scans": ap.scanner.scans - scans,
+        "refresh_s": round(time.monotonic() - start, 2),
+        "statuses": [r[0] for r in responses],
+        "detail": json.loads(responses[0][2]),
+    }
+    start = time.monotonic()
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    status, _, body = await request(reader, writer, "GET", "/api/scanned_networks")
+    writer.close()
+    checks["cached_ms"] = round((time.monotonic() - start) * 1000, 1)
+    checks["ssids"] = json.loads(body)
+    return checks
+
+
+async def batch_checks(port: int, ap: WiFiAP, count: int) -> dict:
+    store = get_store(ap.config_path)
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    checks = {}
+
+    # 逐个添加
+    saves = store.saves
+    start = time.monotonic()
+    for i in range(count):
+        body = json.dumps({"ssid": f"single{i}", "password": "password", "enabled": True})
+        await request(reader, writer, "POST", "/api/add_update", body.encode())
+    checks["single"] = (count, store.saves - saves, round((time.monotonic() - start) * 1000, 1))
+
+    # 一次事务：删除逐个添加的网络，添加同样数量的网络，设置优先级并排序
+    ops = [{"op": "delete", "ssid": f"single{i}"} for i in range(count)]
+    ops += [{"op": "add", "ssid": f"site{i}", "password": "password"} for i in range(count)]
+    ops.append({"op": "add", "ssid": "home", "password": "p3", "priority": 5})
+    ops.append({"op": "update", "ssid": "lab", "enabled": True})
+    ops.append({"op": "reorder", "ssids": ["site2", "site1"]})
+    saves = store.saves
+    start = time.monotonic()
+    status, _, body = await request(
+        reader, writer, "POST", "/api/networks/batch", json.dumps({"ops": ops}).encode()
+    )
+    checks["batch"] = (len(ops), store.saves - saves, round((time.monotonic() - start) * 1000, 1))
+    checks["batch_status"] = status
+    networks = json.loads(body)["networks"]
+    checks["order"] = [net["ssid"] for net in networks[:4]]
+
+    # 第二个操作无效时整个事务不生效
+    bad = [{"op": "delete", "ssid": "home"}, {"op": "update", "ssid": "missing", "enabled": False}]
+    status, _, body = await request(
+        reader, writer, "POST", "/api/networks/batch", json.dumps({"ops": bad}).encode()
+    )
+    checks["invalid"] = (status, body.decode())
+    checks["unchanged"] = [net["ssid"] for net in store.get("wifi.networks")] == [
+        net["ssid"] for net in networks
+    ]
+    writer.close()
+
+    # home 优先级最高，即使信号比 lab 弱也先尝试
+    manager = WiFiManager(store.get("wifi"))
+    manager.scan()
+    checks["candidates"] = [net["ssid"] for net in manager.candidates()[:3]]
+    return checks
+
+
+async def bench(args, ap: WiFiAP) -> dict:
+    port = free_port()
+    server = await ap.start_server(
+        {
+            "host": "127.0.0.1",
+            "port": port,
+            "max_connections": args.max_connections,
+            "request_timeout_ms": args.timeout_ms,
+            "static": {"max_cached_bytes": args.max_cached_bytes, "chunk_size": 512},
+        }
+    )
+    # 扫描服务的第一次后台扫描
+    await ap.scanner.refresh(force=True)
+    result = {}
+    slow = asyncio.create_task(slow_client(port, result))
+    await asyncio.sleep(0.05)
+
+    latencies = []
+    counters = {"busy": 0, "reconnects": 0}
+    start = time.monotonic()
+    await asyncio.gather(
+        *[client(port, args.requests, latencies, counters) for _ in range(args.clients)]
+    )
+    elapsed = time.monotonic() - start
+
+    # 超过 1 KB 的请求体和按路径删除
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    body = json.dumps({"ssid": "lab", "password": "p2", "enabled": True, "note": "x" * 3000})
+    result["post"] = (await request(reader, writer, "POST", "/api/add_update", body.encode()))[0]
+    result["delete"] = (await request(reader, writer, "DELETE", "/api/delete/old%20net"))[0]
+    _, _, listed = await request(reader, writer, "GET", "/api/config_file_networks")
+    result["networks"] = [net["ssid"] for net in json.loads(listed)]
+    writer.close()
+
+    result["oversize"] = await oversize_checks(port)
+    result["static"] = await static_checks(port, ap.static_dir)
+    network.scan_ms = args.scan_ms
+    # 慢速客户端仍占用一个连接
+    result["scan"] = await scan_checks(port, ap, args.max_connections - 1)
+    result["batch"] = await batch_checks(port, ap, args.networks)
+
+    await slow
+    latencies.sort()
+    result.update(
+        {
+            "requests": len(latencies),
+            "rps": len(latencies) / elapsed,
+            "p50_ms": latencies[len(latencies) // 2] * 1000,
+            "p99_ms": latencies[int(len(latencies) * 0.99)] * 1000,
+            "counters": counters,
+            "server": server.stats(),
+            "static_stats": ap.static.stats(),
+            "scan_stats": ap.scanner.stats(),
+        }
+    )
+    # 停止时关闭仍在等待下一个请求的连接，让连接协程自行结束
+    server.stop()
+    await asyncio.sleep(0.05)
+    result["closed"] = server.stats()["active"] == 0
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--clients", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=50, help="每个客户端的请求数")
+    parser.add_argument("--max-connections", type=int, default=4)
+    parser.add_argument("--timeout-ms", type=int, default=2000, help="请求超时")
+    parser.add_argument("--max-cached-bytes", type=int, default=16384, help="静态文件缓存预算")
+    parser.add_argument("--scan-ms", type=int, default=1500, help="一次WiFi扫描的耗时")
+    parser.add_argument("--networks", type=int, default=10, help="批量事务中添加的网络数")
+    args = parser.parse_args()
+
+    network.scan_ms = 0
+    network.set_networks(
+        [
+            network.AccessPoint("home", "p3", rssi=-70),
+            network.AccessPoint("lab", "p2", rssi=-50),
+            network.AccessPoint("lab", "p2", rssi=-80, channel=11, bssid=b"\x02\x00\x00\x00\x01\x02"),
+        ]
+    )
+    directory = tempfile.mkdtemp(prefix="portal_")
+    config_path = os.path.join(directory, "config.json")
+    with open(config_path, "w") as f:
+        json.dump(
+            {"wifi": {"enabled": False, "networks": [{"enabled": True, "ssid": "old net", "password": "x"}]}},
+            f,
+        )
+    static_dir = os.path.join(directory, "static")
+    shutil.copytree(os.path.join(ROOT, "src", "static"), static_dir)
+    with open(os.path.join(static_dir, "big.js"), "w") as f:
+        f.write("".join(f"console.log({i});\n" for i in range(4000)))
+    build(static_dir)
+    ap = WiFiAP(
+        config_path=config_path, static_dir=static_dir, scan_config={"min_refresh_ms": 500}
+    )
+
+    result = asyncio.run(bench(args, ap))
+    print(f"requests:   {result['requests']} ({result['rps']:.0f}/s)")
+    print(f"latency:    p50 {result['p50_ms']:.1f} ms, p99 {result['p99_ms']:.1f} ms")
+    print(f"counters:   {result['counters']}")
+    print(f"slow client: status {result['slow'][0]} after {result['slow'][1]} s")
+    print(f"large POST: {result['post']}, DELETE by path: {result['delete']}")
+    print(f"networks:   {result['networks']}")
+    oversize = result["oversize"]
+    print(
+        f"oversize:   request line {oversize['request_line'][0]} in {oversize['request_line'][1]} ms, "
+        f"header {oversize['header'][0]} in {oversize['header'][1]} ms"
+    )
+    print(f"server:     {result['server']}, all connections closed on stop: {result['closed']}")
+    print(f"static:     {result['static']}")
+    print(f"            {result['static_stats']}")
+    scan = result["scan"]
+    print(
+        f"scan:       {scan['refresh_clients']} concurrent refreshes {scan['statuses']} -> "
+        f"{scan['refresh_scans']} scan "
+        f"in {scan['refresh_s']} s, cached list in {scan['cached_ms']} ms: {scan['ssids']}"
+    )
+    for entry in scan["detail"]:
+        print(f"            {entry}")
+    print(f"            {result['scan_stats']}")
+    batch = result["batch"]
+    print(
+        f"single:     {batch['single'][0]} requests, {batch['single'][1]} config writes, "
+        f"{batch['single'][2]} ms"
+    )
+    print(
+        f"batch:      {batch['batch'][0]} ops -> status {batch['batch_status']}, "
+        f"{batch['batch'][1]} config write, {batch['batch'][2]} ms, order {batch['order']}"
+    )
+    print(f"invalid:    {batch['invalid']}, config unchanged: {batch['unchanged']}")
+    print(f"candidates: {batch['candidates']}")
+
+
+if __name__ == "__main__":
+    main()
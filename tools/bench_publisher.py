@@ -0,0 +1,87 @@
+"""
+在主机上用 tools/fake_broker.py 测试 MQTTPublish 的异步发布模式
+
+按固定速率入队消息，中途停止代理模拟断网，一段时间后重启，
+输出发送队列深度、丢弃数、重连次数、排队延迟以及代理实际收到的消息数。
+
+用法：
+    python3 tools/bench_publisher.py --rate 20 --seconds 6 --outage 2
+"""
+import argparse
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "tools", "fakes"))
+sys.path.insert(0, ROOT)
+
+import uasyncio as asyncio  # noqa: E402
+from src.services.mqtt import MQTTPublish  # noqa: E402
+from tools.fake_broker import FakeBroker  # noqa: E402
+
+
+async def bench(args) -> tuple:
+    broker = FakeBroker()
+    port = broker.start()
+    client = MQTTPublish(
+        {
+            "broker": "127.0.0.1",
+            "port": port,
+            "topic_detection": "/yolo/detection",
+            "client_id": "bench",
+            "async_publish": True,
+            "queue_size": args.queue_size,
+            "batch_max": args.batch_max,
+            "batch_interval_ms": args.batch_interval_ms,
+            "reconnect_min_ms": 100,
+            "reconnect_max_ms": 1000,
+        }
+    )
+    client.connect()
+    publisher = asyncio.create_task(client.run_publisher())
+
+    total = int(args.rate * args.seconds)
+    outage_start = int(total / 3)
+    outage_end = outage_start + int(args.rate * args.outage)
+    for i in range(total):
+        if i == outage_start:
+            print(f"[{i}] broker down")
+            broker.stop()
+        if i == outage_end:
+            broker = FakeBroker(port=port)
+            broker.start()
+            print(f"[{i}] broker up")
+        client.enqueue("/yolo/detection/bench", f'{{"seq": {i}}}', coalesce=True)
+        await asyncio.sleep(1 / args.rate)
+
+    # 等待队列清空
+    for _ in range(50):
+        if client.stats()["depth"] == 0:
+            break
+        await asyncio.sleep(0.1)
+    await asyncio.sleep(0.2)
+    publisher.cancel()
+    stats = client.stats()
+    client.disconnect()
+    broker.stop()
+    return total, stats, broker.messages
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rate", type=float, default=20, help="每秒入队的消息数")
+    parser.add_argument("--seconds", type=float, default=6)
+    parser.add_argument("--outage", type=float, default=2, help="代理停止的秒数")
+    parser.add_argument("--queue-size", type=int, default=64)
+    parser.add_argument("--batch-max", type=int, default=1)
+    parser.add_argument("--batch-interval-ms", type=int, default=0)
+    args = parser.parse_args()
+
+    total, stats, messages = asyncio.run(bench(args))
+    print(f"enqueued: {total}")
+    print(f"stats:    {stats}")
+    print(f"broker received {len(messages)} messages after restart")
+
+
+if __name__ == "__main__":
+    main()
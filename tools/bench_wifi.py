@@ -0,0 +1,100 @@
+"""
+在主机上用 tools/fakes/network.py 比较 WiFi 启动连接耗时，并测试掉线后的后台重连
+
+配置三个网络：第一个不在范围内，第二个信号弱，第三个信号强。
+原来的 test_wifi_connections 按配置顺序逐个阻塞尝试；WiFiManager 扫描一次后按信号强度排序，
+等待关联期间让出事件循环。之后模拟链路中断，输出重连耗时、链路事件和事件循环的最大停顿。
+
+用法：
+    python3 tools/bench_wifi.py --legacy
+"""
+import argparse
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "tools", "fakes"))
+sys.path.insert(0, ROOT)
+
+import network  # noqa: E402
+import uasyncio as asyncio  # noqa: E402
+from src.services.wifi import WiFiManager, test_wifi_connections  # noqa: E402
+
+WIFI_CONFIG = {
+    "enabled": True,
+    "networks": [
+        {"enabled": True, "ssid": "office", "password": "p1"},
+        {"enabled": True, "ssid": "lab", "password": "p2"},
+        {"enabled": True, "ssid": "home", "password": "p3"},
+    ],
+    "check_interval_ms": 500,
+    "backoff_min_ms": 500,
+}
+
+
+def setup_networks():
+    network.set_networks(
+        [
+            network.AccessPoint("lab", "p2", rssi=-82, channel=1),
+            network.AccessPoint("home", "p3", rssi=-48, channel=11),
+            network.AccessPoint("neighbour", "x", rssi=-40, channel=6),
+        ]
+    )
+
+
+async def heartbeat(gaps: list):
+    last = time.monotonic()
+    while True:
+        await asyncio.sleep_ms(10)
+        now = time.monotonic()
+        gaps.append(now - last)
+        last = now
+
+
+async def bench(args) -> None:
+    setup_networks()
+    events = []
+    gaps = []
+    beat = asyncio.create_task(heartbeat(gaps))
+    manager = WiFiManager(dict(WIFI_CONFIG, connect_timeout_ms=args.connect_timeout_ms))
+    manager.add_listener(lambda up, ip: events.append((round(time.monotonic() - start, 2), up, ip)))
+
+    start = time.monotonic()
+    ok = await manager.connect()
+    print(f"manager: connected={ok} to {manager.ssid} in {time.monotonic() - start:.2f}s")
+
+    supervisor = asyncio.create_task(manager.supervise())
+    await asyncio.sleep(1)
+    network.drop_link()
+    dropped = time.monotonic()
+    while manager.connects < 2 and time.monotonic() - dropped < 30:
+        await asyncio.sleep_ms(50)
+    print(f"manager: reconnected to {manager.ssid} {time.monotonic() - dropped:.2f}s after drop")
+    supervisor.cancel()
+    beat.cancel()
+    print(f"manager: events {events}")
+    print(f"manager: stats {manager.stats()}")
+    # 扫描是固件的同步调用，会让事件循环停顿 scan_ms
+    print(f"manager: max event loop stall {max(gaps) * 1000:.0f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--legacy", action="store_true", help="同时测试原来的 test_wifi_connections")
+    parser.add_argument("--connect-timeout-ms", type=int, default=10000)
+    parser.add_argument("--scan-ms", type=int, default=1500)
+    args = parser.parse_args()
+    network.scan_ms = args.scan_ms
+
+    if args.legacy:
+        setup_networks()
+        start = time.monotonic()
+        ok = test_wifi_connections(WIFI_CONFIG)
+        print(f"legacy:  connected={ok} in {time.monotonic() - start:.2f}s")
+
+    asyncio.run(bench(args))
+
+
+if __name__ == "__main__":
+    main()
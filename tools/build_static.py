@@ -0,0 +1,62 @@
+"""
+部署前预先压缩静态文件：为 src/static 中的文本文件生成 <文件>.gz
+
+设备上的 StaticFiles 对支持 gzip 的客户端直接发送 .gz 文件，不在设备上压缩。
+压缩结果固定（mtime 为 0），内容不变时重复运行不会产生差异；
+压缩后没有变小的文件不生成 .gz。
+
+用法：
+    python3 tools/build_static.py
+    python3 tools/build_static.py --clean
+"""
+import argparse
+import gzip
+import os
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+COMPRESSIBLE = (".html", ".css", ".js", ".json", ".svg", ".txt")
+
+
+def build(directory: str) -> list:
+    results = []
+    for dirpath, _, filenames in os.walk(directory):
+        for name in sorted(filenames):
+            if not name.endswith(COMPRESSIBLE):
+                continue
+            path = os.path.join(dirpath, name)
+            with open(path, "rb") as f:
+                data = f.read()
+            compressed = gzip.compress(data, compresslevel=9, mtime=0)
+            if len(compressed) >= len(data):
+                continue
+            with open(path + ".gz", "wb") as f:
+                f.write(compressed)
+            results.append((os.path.relpath(path, directory), len(data), len(compressed)))
+    return results
+
+
+def clean(directory: str) -> int:
+    removed = 0
+    for dirpath, _, filenames in os.walk(directory):
+        for name in filenames:
+            if name.endswith(".gz"):
+                os.remove(os.path.join(dirpath, name))
+                removed += 1
+    return removed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--dir", default=os.path.join(ROOT, "src", "static"))
+    parser.add_argument("--clean", action="store_true", help="删除生成的 .gz 文件")
+    args = parser.parse_args()
+
+    if args.clean:
+        print(f"removed {clean(args.dir)} files")
+        return
+    for name, size, compressed in build(args.dir):
+        print(f"{name}: {size} -> {compressed} bytes ({compressed * 100 // size}%)")
+
+
+if __name__ == "__main__":
+    main()
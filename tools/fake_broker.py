@@ -0,0 +1,185 @@
+"""
+主机端的最小 MQTT 3.1.1 代理，仅支持 QoS 0
+
+用于在没有真实代理的情况下测试 MQTTPublish 的发布、断线重连和订阅；
+运行在独立线程中，可以随时断开全部客户端或停止/重启以模拟网络故障。
+
+用法：
+    broker = FakeBroker()
+    broker.start()
+    ...
+    broker.kick_clients()  # 模拟链路中断
+    broker.stop()
+"""
+import socket
+import struct
+import threading
+
+
+def _encode_str(value: bytes) -> bytes:
+    return struct.pack("!H", len(value)) + value
+
+
+def _encode_length(length: int) -> bytes:
+    out = bytearray()
+    while True:
+        byte = length & 0x7F
+        length >>= 7
+        out.append(byte | (0x80 if length else 0))
+        if not length:
+            return bytes(out)
+
+
+def _topic_matches(pattern: bytes, topic: bytes) -> bool:
+    p_parts = pattern.split(b"/")
+    t_parts = topic.split(b"/")
+    for i, part in enumerate(p_parts):
+        if part == b"#":
+            return True
+        if i >= len(t_parts) or (part != b"+" and part != t_parts[i]):
+            return False
+    return len(p_parts) == len(t_parts)
+
+
+class FakeBroker:
+    def __init__(self, host: str = "127.0.0.1", port: int = 0):
+        self.host = host
+        self.port = port
+        self.messages = []  # (topic, payload)
+        self.connects = 0
+        self._clients = {}  # socket -> 订阅列表
+        self._lock = threading.Lock()
+        self._server = None
+        self._running = False
+
+    def start(self) -> int:
+        """
+        启动代理，返回监听端口
+        """
+        self._server = socket.socket()
+        self._server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self._server.bind((self.host, self.port))
+        self._server.listen(16)
+        self.port = self._server.getsockname()[1]
+        self._running = True
+        threading.Thread(target=self._accept_loop, daemon=True).start()
+        return self.port
+
+    def stop(self) -> None:
+        """
+        停止监听并断开全部客户端
+        """
+        self._running = False
+        if self._server:
+            try:
+                # 唤醒阻塞在 accept 上的线程
+                self._server.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+            self._server.close()
+            self._server = None
+        self.kick_clients()
+
+    def kick_clients(self) -> None:
+        """
+        断开全部客户端连接，模拟链路中断
+        """
+        with self._lock:
+            clients = list(self._clients)
+            self._clients.clear()
+        for sock in clients:
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+            sock.close()
+
+    def publish(self, topic, payload) -> None:
+        """
+        向订阅了该主题的客户端推送消息
+        """
+        if isinstance(topic, str):
+            topic = topic.encode()
+        if isinstance(payload, str):
+            payload = payload.encode()
+        body = _encode_str(topic) + payload
+        packet = b"\x30" + _encode_length(len(body)) + body
+        with self._lock:
+            targets = [
+                sock
+                for sock, subs in self._clients.items()
+                if any(_topic_matches(p, topic) for p in subs)
+            ]
+        for sock in targets:
+            try:
+                sock.sendall(packet)
+            except OSError:
+                pass
+
+    def _accept_loop(self) -> None:
+        while self._running:
+            try:
+                sock, _ = self._server.accept()
+            except OSError:
+                return
+            if not self._running:
+                sock.close()
+                return
+            with self._lock:
+                self._clients[sock] = []
+            threading.Thread(target=self._client_loop, args=(sock,), daemon=True).start()
+
+    @staticmethod
+    def _recv_exact(sock, n: int) -> bytes:
+        data = b""
+        while len(data) < n:
+            chunk = sock.recv(n - len(data))
+            if not chunk:
+                raise OSError("closed")
+            data += chunk
+        return data
+
+    def _client_loop(self, sock) -> None:
+        try:
+            while True:
+                op = self._recv_exact(sock, 1)[0]
+                length = 0
+                shift = 0
+                while True:
+                    byte = self._recv_exact(sock, 1)[0]
+                    length |= (byte & 0x7F) << shift
+                    if not byte & 0x80:
+                        break
+                    shift += 7
+                body = self._recv_exact(sock, length) if length else b""
+                kind = op & 0xF0
+                if kind == 0x10:  # CONNECT
+                    self.connects += 1
+                    sock.sendall(b"\x20\x02\x00\x00")
+                elif kind == 0x30:  # PUBLISH
+                    topic_len = struct.unpack("!H", body[:2])[0]
+                    topic = body[2 : 2 + topic_len]
+                    pos = 2 + topic_len + (2 if op & 0x06 else 0)
+                    with self._lock:
+                        self.messages.append((topic.decode(), body[pos:]))
+                    self.publish(topic, body[pos:])
+                elif kind == 0x80:  # SUBSCRIBE
+                    pid = body[:2]
+                    pos = 2
+                    while pos < len(body):
+                        n = struct.unpack("!H", body[pos : pos + 2])[0]
+                        with self._lock:
+                            if sock in self._clients:
+                                self._clients[sock].append(body[pos + 2 : pos + 2 + n])
+                        pos += 3 + n
+                    sock.sendall(b"\x90\x03" + pid + b"\x00")
+                elif kind == 0xC0:  # PINGREQ
+                    sock.sendall(b"\xd0\x00")
+                elif kind == 0xE0:  # DISCONNECT
+                    break
+        except OSError:
+            pass
+        finally:
+            with self._lock:
+                self._clients.pop(sock, None)
+            sock.close()
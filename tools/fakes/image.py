@@ -0,0 +1,40 @@
+"""
+CanMV image 模块的替身，只实现截图所需的 Image 构造、to_rgb888、crop 和 compress
+
+compress 返回的“JPEG”以 SOI/EOI 标记包裹，长度随图像面积和质量变化。
+"""
+RGBP888 = 1
+RGB888 = 2
+ALLOC_REF = 1
+
+
+class Image:
+    def __init__(self, width, height, fmt=RGB888, alloc=None, data=None, _jpeg=None):
+        self._width = width
+        self._height = height
+        self.format = fmt
+        self.data = data
+        self._jpeg = _jpeg
+
+    def width(self):
+        return self._width
+
+    def height(self):
+        return self._height
+
+    def to_rgb888(self):
+        return Image(self._width, self._height, RGB888, data=self.data)
+
+    def crop(self, roi=None, **kwargs):
+        x, y, w, h = roi
+        w = max(1, min(w, self._width - x))
+        h = max(1, min(h, self._height - y))
+        return Image(w, h, self.format, data=self.data)
+
+    def compress(self, quality=90):
+        size = max(64, self._width * self._height * quality // 2000)
+        body = bytes((i * 31) & 0xFF for i in range(size))
+        return Image(self._width, self._height, self.format, _jpeg=b"\xff\xd8" + body + b"\xff\xd9")
+
+    def bytearray(self):
+        return bytearray(self._jpeg or b"")
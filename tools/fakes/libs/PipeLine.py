@@ -0,0 +1,82 @@
+"""
+CanMV libs.PipeLine 的替身
+
+get_frame 返回一个模拟的 CHW 帧；camera_fps 大于0时按摄像头帧率阻塞，直到下一帧到达。
+motion_ratio 为画面中有移动目标的帧所占的比例，其余帧是带轻微噪声的静止背景。
+"""
+import random
+import time as _time
+
+
+class Frame:
+    """
+    模拟 ulab ndarray 的 CHW 图像，只支持 img[c, ::sy, ::sx].flatten() 和 copy()，
+    像素按需计算，不会分配整帧内存
+    """
+
+    def __init__(self, width: int, height: int, frame_id: int, moving: bool, seed: int):
+        self.shape = (3, height, width)
+        self.frame_id = frame_id
+        self.moving = moving
+        self._seed = seed
+        self._rng = random.Random(seed)
+
+    def copy(self):
+        return Frame(self.shape[2], self.shape[1], self.frame_id, self.moving, self._seed)
+
+    def pixel(self, c: int, x: int, y: int) -> int:
+        value = (x * 7 + y * 13 + c * 50) % 200 + self._rng.randint(-2, 2)
+        if self.moving:
+            # 一个亮色方块在画面中水平移动
+            left = (self.frame_id * 15) % self.shape[2]
+            if left <= x < left + 120 and 100 <= y < 260:
+                value = 250
+        return min(max(value, 0), 255)
+
+    def __getitem__(self, index):
+        c, ys, xs = index
+        return _Plane(self, c, range(*ys.indices(self.shape[1])), range(*xs.indices(self.shape[2])))
+
+
+class _Plane:
+    def __init__(self, frame: Frame, c: int, ys: range, xs: range):
+        self.frame = frame
+        self.c = c
+        self.ys = ys
+        self.xs = xs
+
+    def flatten(self) -> bytes:
+        pixel = self.frame.pixel
+        return bytes(pixel(self.c, x, y) for y in self.ys for x in self.xs)
+
+
+class PipeLine:
+    # 可由基准脚本直接修改
+    camera_fps = 0
+    motion_ratio = 1.0
+    create_ms = 0  # 初始化摄像头和显示的耗时
+
+    def __init__(self, rgb888p_size=None, display_size=None, display_mode=None, **kwargs):
+        self.rgb888p_size = rgb888p_size or [640, 480]
+        self.frame_id = 0
+        self._next_frame = _time.monotonic()
+
+    def create(self):
+        if self.create_ms:
+            _time.sleep(self.create_ms / 1000)
+
+    def get_frame(self):
+        if self.camera_fps:
+            now = _time.monotonic()
+            if now < self._next_frame:
+                _time.sleep(self._next_frame - now)
+            self._next_frame = max(now, self._next_frame) + 1 / self.camera_fps
+        self.frame_id += 1
+        # 每50帧中前 motion_ratio 比例的帧有移动目标
+        moving = (self.frame_id % 50) < self.motion_ratio * 50
+        return Frame(
+            self.rgb888p_size[0], self.rgb888p_size[1], self.frame_id, moving, self.frame_id
+        )
+
+    def destroy(self):
+        pass
@@ -0,0 +1,88 @@
+"""
+CanMV libs.YOLO 的替身
+
+run() 按 infer_ms 阻塞以模拟同步推理，返回值与 yolo.run 的格式一致：
+每个检测框为 [x, y, w, h, score, label_id]。
+设置了回放数据时按顺序循环返回录制的结果，否则返回 boxes_per_frame 个合成框。
+"""
+import json
+import random
+import time as _time
+
+
+class YOLOv8:
+    # 可由基准脚本直接修改
+    infer_ms = 20
+    init_ms = 0  # 加载 kmodel 的耗时
+    boxes_per_frame = 3
+    replay_frames = None
+
+    def __init__(self, labels=None, max_boxes_num=100, **kwargs):
+        self.labels = labels or ["person"]
+        self.max_boxes_num = max_boxes_num
+        self.conf_thresh = kwargs.get("conf_thresh", 0.5)
+        self.nms_thresh = kwargs.get("nms_thresh", 0.45)
+        self._replay_pos = 0
+
+    @classmethod
+    def load_replay(cls, path: str) -> int:
+        """
+        加载录制的检测结果，文件为 JSON 格式的帧列表
+
+        Returns:
+            int: 帧数
+        """
+        with open(path) as f:
+            cls.replay_frames = json.load(f)
+        return len(cls.replay_frames)
+
+    @staticmethod
+    def synthesize(frames: int, boxes: int, labels: int, size=(640, 480), seed=0) -> list:
+        """
+        生成合成的检测结果，目标在画面中缓慢移动，数量在 0 到 boxes 之间变化
+        """
+        rng = random.Random(seed)
+        tracks = [
+            [rng.uniform(0, size[0] - 80), rng.uniform(0, size[1] - 80), rng.randrange(labels)]
+            for _ in range(boxes)
+        ]
+        out = []
+        for _ in range(frames):
+            visible = rng.randint(0, boxes)
+            frame = []
+            for track in tracks[:visible]:
+                track[0] = min(max(track[0] + rng.uniform(-5, 5), 0), size[0] - 80)
+                track[1] = min(max(track[1] + rng.uniform(-5, 5), 0), size[1] - 80)
+                frame.append(
+                    [
+                        round(track[0], 1),
+                        round(track[1], 1),
+                        60.0,
+                        80.0,
+                        round(rng.uniform(0.5, 1.0), 3),
+                        track[2],
+                    ]
+                )
+            out.append(frame)
+        return out
+
+    def config_preprocess(self):
+        if self.init_ms:
+            _time.sleep(self.init_ms / 1000)
+
+    def run(self, img):
+        # 推理在设备上是同步阻塞的，这里用 time.sleep 模拟
+        if self.infer_ms:
+            _time.sleep(self.infer_ms / 1000)
+        if self.replay_frames:
+            frame = self.replay_frames[self._replay_pos % len(self.replay_frames)]
+            self._replay_pos += 1
+            # 与真实后处理一致：按置信度阈值过滤，并限制最大框数
+            return [box for box in frame if box[4] >= self.conf_thresh][: self.max_boxes_num]
+        n = min(self.boxes_per_frame, self.max_boxes_num)
+        return [
+            [10.0 * i, 20.0, 50.0, 80.0, 0.9, i % len(self.labels)] for i in range(n)
+        ]
+
+    def deinit(self):
+        pass
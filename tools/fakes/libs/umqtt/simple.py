@@ -0,0 +1,160 @@
+"""
+umqtt.simple 的 CPython 实现，仅支持 QoS 0，用于连接 tools/fake_broker.py
+
+publish_ms 可由基准脚本修改，用于模拟较慢的网络往返。
+"""
+import socket
+import struct
+import time as _time
+
+
+class MQTTException(Exception):
+    pass
+
+
+def _encode_str(value) -> bytes:
+    if isinstance(value, str):
+        value = value.encode()
+    return struct.pack("!H", len(value)) + value
+
+
+def _encode_length(length: int) -> bytes:
+    out = bytearray()
+    while True:
+        byte = length & 0x7F
+        length >>= 7
+        out.append(byte | (0x80 if length else 0))
+        if not length:
+            return bytes(out)
+
+
+class MQTTClient:
+    # 可由基准脚本直接修改
+    publish_ms = 0
+
+    def __init__(self, client_id, server, port=0, user=None, password=None, keepalive=0, **kwargs):
+        self.client_id = client_id
+        self.server = server
+        self.port = port or 1883
+        self.user = user
+        self.pswd = password
+        self.keepalive = keepalive
+        self.sock = None
+        self.cb = None
+        self.lw_topic = None
+        self.lw_msg = None
+        self.lw_retain = False
+        self.pid = 0
+
+    def set_callback(self, f):
+        self.cb = f
+
+    def set_last_will(self, topic, msg, retain=False, qos=0):
+        self.lw_topic = topic
+        self.lw_msg = msg
+        self.lw_retain = retain
+
+    def _recv_exact(self, n: int) -> bytes:
+        data = b""
+        while len(data) < n:
+            chunk = self.sock.recv(n - len(data))
+            if not chunk:
+                raise OSError("connection closed")
+            data += chunk
+        return data
+
+    def _recv_length(self) -> int:
+        length = 0
+        shift = 0
+        while True:
+            byte = self._recv_exact(1)[0]
+            length |= (byte & 0x7F) << shift
+            if not byte & 0x80:
+                return length
+            shift += 7
+
+    def connect(self, clean_session=True):
+        self.sock = socket.create_connection((self.server, self.port), timeout=5)
+        flags = 0x02 if clean_session else 0
+        payload = _encode_str(self.client_id)
+        if self.lw_topic:
+            flags |= 0x04 | (0x20 if self.lw_retain else 0)
+            payload += _encode_str(self.lw_topic) + _encode_str(self.lw_msg)
+        if self.user is not None:
+            flags |= 0x80
+            payload += _encode_str(self.user)
+            if self.pswd is not None:
+                flags |= 0x40
+                payload += _encode_str(self.pswd)
+        variable = _encode_str("MQTT") + bytes([4, flags]) + struct.pack("!H", self.keepalive)
+        body = variable + payload
+        self.sock.sendall(b"\x10" + _encode_length(len(body)) + body)
+        resp = self._recv_exact(4)
+        if resp[0] != 0x20 or resp[3] != 0:
+            raise MQTTException(resp[3])
+        return resp[2] & 1
+
+    def disconnect(self):
+        if self.sock is None:
+            return
+        try:
+            self.sock.sendall(b"\xe0\x00")
+        finally:
+            self.sock.close()
+            self.sock = None
+
+    def ping(self):
+        self.sock.sendall(b"\xc0\x00")
+
+    def publish(self, topic, msg, retain=False, qos=0):
+        if self.sock is None:
+            raise OSError("not connected")
+        if self.publish_ms:
+            _time.sleep(self.publish_ms / 1000)
+        if isinstance(msg, str):
+            msg = msg.encode()
+        body = _encode_str(topic) + bytes(msg)
+        header = 0x30 | (0x01 if retain else 0)
+        self.sock.sendall(bytes([header]) + _encode_length(len(body)) + body)
+
+    def subscribe(self, topic, qos=0):
+        self.pid += 1
+        body = struct.pack("!H", self.pid) + _encode_str(topic) + bytes([qos])
+        self.sock.sendall(b"\x82" + _encode_length(len(body)) + body)
+        while True:
+            op = self.wait_msg()
+            if op == 0x90:
+                return
+
+    def unsubscribe(self, topic):
+        self.pid += 1
+        body = struct.pack("!H", self.pid) + _encode_str(topic)
+        self.sock.sendall(b"\xa2" + _encode_length(len(body)) + body)
+
+    def wait_msg(self):
+        res = self._recv_exact(1)
+        op = res[0]
+        length = self._recv_length()
+        body = self._recv_exact(length) if length else b""
+        if op & 0xF0 != 0x30:
+            return op
+        topic_len = struct.unpack("!H", body[:2])[0]
+        topic = body[2 : 2 + topic_len]
+        pos = 2 + topic_len
+        if op & 0x06:
+            pos += 2
+        if self.cb:
+            self.cb(topic, body[pos:])
+        return None
+
+    def check_msg(self):
+        self.sock.setblocking(False)
+        try:
+            if not self.sock.recv(1, socket.MSG_PEEK):
+                raise OSError("connection closed")
+        except BlockingIOError:
+            return None
+        finally:
+            self.sock.setblocking(True)
+            self.sock.settimeout(5)
+        return self.wait_msg()
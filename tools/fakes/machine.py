@@ -0,0 +1,13 @@
+"""CPython 上的 machine 替身"""
+import time as _time
+
+
+class RTC:
+    def datetime(self):
+        # 与 K230 固件一致：(year, month, day, hour, minute, second, weekday, yearday)
+        t = _time.localtime()
+        return (t[0], t[1], t[2], t[3], t[4], t[5], t[6], t[7])
+
+
+def reset():
+    raise SystemExit("machine.reset()")
@@ -0,0 +1 @@
+"""CanMV media 模块的空替身"""
@@ -0,0 +1,126 @@
+"""
+CanMV network 模块的替身，模拟 STA 扫描、关联、DHCP 和掉线，以及 AP 模式
+
+基准脚本通过 set_networks 配置周围的无线网络，通过 drop_link 模拟链路中断。
+scan 返回与 K230 固件相同的对象列表（ssid、bssid、channel、rssi、security 属性）。
+"""
+import time as _time
+
+STA_IF = 0
+AP_IF = 1
+
+# 可由基准脚本直接修改
+scan_ms = 1500  # 一次扫描的耗时
+
+
+class AccessPoint:
+    def __init__(self, ssid, password, rssi=-60, channel=6, bssid=None, assoc_ms=800, dhcp_ms=300,
+                 visible=True):
+        self.ssid = ssid.encode() if isinstance(ssid, str) else ssid
+        self.password = password
+        self.rssi = rssi
+        self.channel = channel
+        self.bssid = bssid or bytes([0x02, 0, 0, 0, 0, abs(hash(ssid)) % 256])
+        self.security = 3 if password else 0
+        self.assoc_ms = assoc_ms
+        self.dhcp_ms = dhcp_ms
+        self.visible = visible
+
+
+_networks = []
+_sta = {"active": False, "target": None, "since": 0.0, "connects": 0, "scans": 0, "hints": {}}
+
+
+def set_networks(networks):
+    del _networks[:]
+    _networks.extend(networks)
+    _sta["target"] = None
+
+
+def drop_link():
+    """模拟链路中断：当前连接断开，需要重新 connect"""
+    _sta["target"] = None
+
+
+def stats():
+    return {"connects": _sta["connects"], "scans": _sta["scans"], "last_hints": _sta["hints"]}
+
+
+class WLAN:
+    def __init__(self, interface=STA_IF):
+        self.interface = interface
+        self._ap_config = {}
+
+    def active(self, value=None):
+        if value is None:
+            return True if self.interface == AP_IF else _sta["active"]
+        if self.interface == STA_IF:
+            _sta["active"] = bool(value)
+            if not value:
+                _sta["target"] = None
+        return None
+
+    def status(self, *args):
+        if self.interface == STA_IF:
+            if args and args[0] == "rssi":
+                target = _sta["target"]
+                return target.rssi if target else 0
+            return 1 if self.isconnected() else 0
+        return 1
+
+    def scan(self):
+        _sta["scans"] += 1
+        _time.sleep(scan_ms / 1000)
+        return [_ScanResult(ap) for ap in _networks if ap.visible]
+
+    def connect(self, ssid=None, key=None, bssid=None, **kwargs):
+        _sta["connects"] += 1
+        # 记录最近一次连接指定的接入点和信道
+        _sta["hints"] = dict(kwargs, bssid=bssid) if bssid is not None else dict(kwargs)
+        ssid = ssid.encode() if isinstance(ssid, str) else ssid
+        _sta["target"] = None
+        for ap in _networks:
+            if (
+                ap.ssid == ssid
+                and (bssid is None or ap.bssid == bssid)
+                and kwargs.get("channel") in (None, ap.channel)
+                and ap.password == (key or "")
+            ):
+                _sta["target"] = ap
+                _sta["since"] = _time.monotonic()
+                break
+
+    def disconnect(self):
+        _sta["target"] = None
+
+    def _elapsed_ms(self):
+        return (_time.monotonic() - _sta["since"]) * 1000
+
+    def isconnected(self):
+        if self.interface == AP_IF:
+            return True
+        target = _sta["target"]
+        return target is not None and self._elapsed_ms() >= target.assoc_ms
+
+    def ifconfig(self, *args):
+        if self.interface == AP_IF:
+            return ("192.168.4.1", "255.255.255.0", "192.168.4.1", "8.8.8.8")
+        target = _sta["target"]
+        if target is not None and self._elapsed_ms() >= target.assoc_ms + target.dhcp_ms:
+            return ("192.168.1.100", "255.255.255.0", "192.168.1.1", "192.168.1.1")
+        return ("0.0.0.0", "0.0.0.0", "0.0.0.0", "0.0.0.0")
+
+    def config(self, *args, **kwargs):
+        if args:
+            return self._ap_config.get(args[0])
+        self._ap_config.update(kwargs)
+        return None
+
+
+class _ScanResult:
+    def __init__(self, ap):
+        self.ssid = ap.ssid
+        self.bssid = ap.bssid
+        self.channel = ap.channel
+        self.rssi = ap.rssi
+        self.security = ap.security
@@ -0,0 +1,11 @@
+"""CPython 上的 uasyncio 替身，补齐 MicroPython 特有的 *_ms 接口"""
+from asyncio import *  # noqa: F401,F403
+import asyncio as _asyncio
+
+
+async def sleep_ms(ms):
+    await _asyncio.sleep(ms / 1000)
+
+
+async def wait_for_ms(aw, timeout):
+    return await _asyncio.wait_for(aw, timeout / 1000)
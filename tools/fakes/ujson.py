@@ -0,0 +1,2 @@
+"""CPython 上的 ujson 替身"""
+from json import dumps, dump, loads, load  # noqa: F401
@@ -0,0 +1,2 @@
+"""CPython 上的 urandom 替身"""
+from random import choice, getrandbits, randint, random  # noqa: F401
@@ -0,0 +1,46 @@
+"""CPython 上的 utime 替身"""
+import time as _time
+from time import gmtime, localtime, sleep  # noqa: F401
+
+
+def time():
+    # MicroPython 的 utime.time() 返回整数秒
+    return int(_time.time())
+
+
+def ticks_ms():
+    return int(_time.monotonic() * 1000)
+
+
+def ticks_us():
+    return int(_time.monotonic() * 1000000)
+
+
+def ticks_add(ticks, delta):
+    return ticks + delta
+
+
+def ticks_diff(ticks1, ticks2):
+    return ticks1 - ticks2
+
+
+def sleep_ms(ms):
+    _time.sleep(ms / 1000)
+
+
+def sleep_us(us):
+    _time.sleep(us / 1000000)
+
+
+class clock:
+    """CanMV utime.clock 的替身，fps() 返回距上次 tick() 的帧率"""
+
+    def __init__(self):
+        self._t = _time.monotonic()
+
+    def tick(self):
+        self._t = _time.monotonic()
+
+    def fps(self):
+        elapsed = _time.monotonic() - self._t
+        return 1 / elapsed if elapsed > 0 else 0.0
@@ -0,0 +1,284 @@
+"""
+主机端检测结果消息体解码器，支持 json、json_compact 和 binary 三种格式
+
+用法：
+    python3 tools/payload_decoder.py --labels person,bicycle,car < payload.bin
+    python3 tools/payload_decoder.py --check
+"""
+import argparse
+import json
+import os
+import struct
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+# snapshot 模块依赖 utime、uasyncio，主机上使用替身
+sys.path.append(os.path.join(ROOT, "tools", "fakes"))
+
+from src.services.snapshot import CHUNK_HEADER_FORMAT, CHUNK_HEADER_SIZE  # noqa: E402
+from src.services.tracker import EVENT_NAMES  # noqa: E402
+from src.services.payload import (  # noqa: E402
+    BINARY_MAGIC,
+    BINARY_VERSION,
+    CONFIDENCE_SCALE,
+    EVENT_RECORD_FORMAT,
+    EVENT_RECORD_SIZE,
+    FLAG_EVENTS,
+    FLAG_KEYFRAME,
+    FPS_SCALE,
+    HEADER_FORMAT,
+    HEADER_SIZE,
+    RECORD_FORMAT,
+    RECORD_SIZE,
+)
+
+
+def _record_layout(flags: int) -> tuple:
+    if flags & FLAG_EVENTS:
+        return EVENT_RECORD_FORMAT, EVENT_RECORD_SIZE
+    return RECORD_FORMAT, RECORD_SIZE
+
+
+def decode_binary(payload: bytes, labels: list | None = None) -> dict:
+    """
+    解码二进制格式的消息体
+
+    Args:
+        payload (bytes): MQTT消息内容
+        labels (list, optional): 标签名称列表，提供时输出中附带标签名称
+
+    Returns:
+        dict: 包含 client_hash、timestamp、fps 和 detections 的字典
+    """
+    if len(payload) < HEADER_SIZE:
+        raise ValueError("Payload shorter than header")
+    magic, version, flags, client_hash, timestamp, fps, count = struct.unpack_from(
+        HEADER_FORMAT, payload, 0
+    )
+    if magic != BINARY_MAGIC:
+        raise ValueError(f"Bad magic: {magic!r}")
+    if version != BINARY_VERSION:
+        raise ValueError(f"Unsupported version: {version}")
+    record_format, record_size = _record_layout(flags)
+    if len(payload) < HEADER_SIZE + count * record_size:
+        raise ValueError("Payload truncated")
+
+    detections = []
+    for i in range(count):
+        fields = struct.unpack_from(record_format, payload, HEADER_SIZE + i * record_size)
+        label_id, confidence, x, y, w, h = fields[:6]
+        detection = {
+            "label_id": label_id,
+            "confidence": confidence / CONFIDENCE_SCALE,
+            "bbox": [x, y, w, h],
+        }
+        if labels is not None:
+            detection["label"] = labels[label_id]
+        if flags & FLAG_EVENTS:
+            detection["id"] = fields[6]
+            detection["event"] = EVENT_NAMES[fields[7]]
+        detections.append(detection)
+    frame = {
+        "client_hash": client_hash,
+        "timestamp": timestamp,
+        "fps": fps / FPS_SCALE,
+        "detections": detections,
+    }
+    if flags & FLAG_EVENTS:
+        frame["keyframe"] = bool(flags & FLAG_KEYFRAME)
+    return frame
+
+
+def decode(payload: bytes, labels: list | None = None) -> dict:
+    """
+    自动识别格式并解码消息体
+
+    Args:
+        payload (bytes): MQTT消息内容
+        labels (list, optional): 标签名称列表，仅二进制格式使用
+
+    Returns:
+        dict: 统一格式的解码结果，JSON格式的结果中带 client_id
+    """
+    if payload[:2] == BINARY_MAGIC:
+        return decode_binary(payload, labels)
+
+    message = json.loads(payload)
+    if "data" in message:
+        data = message["data"]
+        frame = {
+            "client_id": message.get("client_id"),
+            "fps": data[0]["fps"] if data else 0.0,
+            "detections": [
+                {key: value for key, value in item.items() if key != "fps"}
+                for item in data
+            ],
+        }
+        if "keyframe" in message:
+            frame["keyframe"] = message["keyframe"]
+        return frame
+
+    detections = []
+    for item in message["d"]:
+        label, confidence, x, y, w, h = item[:6]
+        detection = {"label": label, "confidence": confidence, "bbox": [x, y, w, h]}
+        if len(item) > 6:
+            detection["id"] = item[6]
+            detection["event"] = item[7]
+        detections.append(detection)
+    frame = {
+        "client_id": message["c"],
+        "timestamp": message["t"],
+        "fps": message["f"],
+        "detections": detections,
+    }
+    if "k" in message:
+        frame["keyframe"] = message["k"]
+    return frame
+
+
+def decode_batch(payload: bytes, labels: list | None = None) -> list:
+    """
+    解码可能由异步发布模式合并的消息（mqtt.batch_max > 1）
+
+    只有检测结果主题的消息会被合并：单帧为一个JSON对象或一个二进制帧；
+    多帧时为JSON数组 [帧1,帧2,...]（json、json_compact）或首尾相接的二进制帧，
+    每个二进制帧的头部带有目标数，据此确定长度。日志、控制响应、截图和聚合摘要
+    等其他主题的消息总是单条发送，不需要用此函数解码。
+
+    Args:
+        payload (bytes): MQTT消息内容
+        labels (list, optional): 标签名称列表，仅二进制格式使用
+
+    Returns:
+        list: 每帧的解码结果
+    """
+    if payload[:2] == BINARY_MAGIC:
+        frames = []
+        offset = 0
+        while offset < len(payload):
+            header = struct.unpack_from(HEADER_FORMAT, payload, offset)
+            size = HEADER_SIZE + header[-1] * _record_layout(header[2])[1]
+            frames.append(decode_binary(payload[offset : offset + size], labels))
+            offset += size
+        return frames
+
+    message = json.loads(payload)
+    if isinstance(message, list):
+        return [decode(json.dumps(item).encode(), labels) for item in message]
+    return [decode(payload, labels)]
+
+
+def split_snapshot_chunks(payload: bytes) -> list:
+    """
+    拆分 "<topic>/snapshot" 主题的消息，每块的头部带有数据长度，
+    因此一条消息中首尾相接的多个分块也能拆开
+
+    Args:
+        payload (bytes): MQTT消息内容
+
+    Returns:
+        list: (snapshot_id, index, count, data) 元组列表
+
+    Raises:
+        ValueError: 分块被截断
+    """
+    chunks = []
+    offset = 0
+    while offset < len(payload):
+        if offset + CHUNK_HEADER_SIZE > len(payload):
+            raise ValueError("truncated chunk header")
+        snapshot_id, index, count, length = struct.unpack_from(
+            CHUNK_HEADER_FORMAT, payload, offset
+        )
+        offset += CHUNK_HEADER_SIZE
+        if offset + length > len(payload):
+            raise ValueError("truncated chunk data")
+        chunks.append((snapshot_id, index, count, payload[offset : offset + length]))
+        offset += length
+    return chunks
+
+
+def check() -> bool:
+    """
+    用示例检测结果对三种格式做编码-解码往返校验
+
+    Returns:
+        bool: 全部格式往返一致时返回True
+    """
+    from src.services.detections import DetectionBuffer
+    from src.services.payload import PayloadEncoder, PAYLOAD_FORMATS, client_id_hash
+    from src.services.tracker import IoUTracker
+
+    labels = ["person", "bicycle", "car"]
+    result = [
+        [12.0, 34.0, 56.0, 78.0, 0.91234, 0],
+        [-3.0, 400.0, 1919.0, 1079.0, 0.5, 2],
+    ]
+    buffer = DetectionBuffer(4, labels)
+    buffer.fill(result)
+    events = IoUTracker({}, 4, labels).update(buffer)
+
+    ok = True
+    for payload_format, frame in [(f, buffer) for f in PAYLOAD_FORMATS] + [
+        (f, events) for f in PAYLOAD_FORMATS
+    ]:
+        encoder = PayloadEncoder(payload_format, "camera-01", 4)
+        payload = encoder.encode(frame, 12.5, 1700000000)
+        if isinstance(payload, str):
+            payload = payload.encode()
+        decoded = decode(payload, labels)
+        for expected, actual in zip(result, decoded["detections"]):
+            ok &= actual["label"] == labels[int(expected[5])]
+            ok &= abs(actual["confidence"] - expected[4]) < 1e-3
+            ok &= [int(v) for v in actual["bbox"]] == [int(v) for v in expected[:4]]
+            if frame is events:
+                ok &= actual["event"] == "enter" and actual["id"] > 0
+        ok &= len(decoded["detections"]) == len(result)
+        ok &= abs(decoded["fps"] - 12.5) < 1e-2
+        if payload_format == "binary":
+            ok &= decoded["client_hash"] == client_id_hash("camera-01")
+            ok &= decoded["timestamp"] == 1700000000
+        else:
+            ok &= decoded["client_id"] == "camera-01"
+        if payload_format == "binary":
+            batch = payload + payload
+        else:
+            batch = b"[" + payload + b"," + payload + b"]"
+        ok &= decode_batch(batch, labels) == [decoded, decoded]
+        if payload_format == "json_compact":
+            # 置信度来自 float32 数组，舍入后不应带有长尾数（如 0.9123399853706360）
+            for obj in json.loads(payload)["d"]:
+                ok &= len(repr(obj[1]).split(".")[-1]) <= encoder.confidence_digits
+        kind = "events" if frame is events else "detections"
+        print(f"{payload_format:>12} {kind:>10}: {len(payload):4d} bytes")
+    jpeg = bytes(range(256)) * 40
+    joined = b"".join(
+        struct.pack(CHUNK_HEADER_FORMAT, 7, i, 3, len(jpeg[i * 4096 : (i + 1) * 4096]))
+        + jpeg[i * 4096 : (i + 1) * 4096]
+        for i in range(3)
+    )
+    chunks = split_snapshot_chunks(joined)
+    ok &= [c[1] for c in chunks] == [0, 1, 2] and b"".join(c[3] for c in chunks) == jpeg
+    print(f"{'snapshot':>12} {'chunks':>10}: {len(joined):4d} bytes")
+    print("round-trip", "OK" if ok else "FAILED")
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--labels", help="逗号分隔的标签列表，用于二进制格式")
+    parser.add_argument("--check", action="store_true", help="执行编码-解码往返校验")
+    args = parser.parse_args()
+
+    if args.check:
+        sys.path.insert(0, os.path.join(ROOT, "tools", "fakes"))
+        sys.exit(0 if check() else 1)
+
+    labels = args.labels.split(",") if args.labels else None
+    print(json.dumps(decode_batch(sys.stdin.buffer.read(), labels), indent=2))
+
+
+if __name__ == "__main__":
+    main()